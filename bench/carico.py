@@ -0,0 +1,152 @@
+# carico.py – Prova di carico del servizio di src.servizio
+#
+#   python -m bench.carico [--porta 8040] [--richieste 1000] [--metodo apertura]
+#                          [--livelli 1,2,4,...,256] [--workers 4] [--output carico.json]
+#
+# Senza --porta avvia un servizio su una porta libera e lo chiude alla fine.
+# Per ogni livello di concorrenza apre altrettante connessioni keep-alive,
+# che si dividono le richieste una dopo l'altra; si riportano p50 e p99
+# della latenza, richieste al secondo e risposte 503 (servizio saturo).
+# Ogni livello usa mani diverse, così la cache dei risultati non nasconde
+# il calcolo; con --stesse-mani si misura invece la cache calda.
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from bench.corpus import mani_casuali
+
+LIVELLI = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+METODI = ("combinazioni", "apertura", "scarto")
+
+
+def _percentile(valori, p):
+    ordinati = sorted(valori)
+    k = min(len(ordinati) - 1, int(round(p / 100 * (len(ordinati) - 1))))
+    return ordinati[k]
+
+
+def corpi(n, metodo, seed):
+    """(percorso, corpo JSON) per n richieste; con metodo "misto" si alternano i tre endpoint."""
+    richieste = []
+    for i, mano in enumerate(mani_casuali(n, seed)):
+        m = METODI[i % len(METODI)] if metodo == "misto" else metodo
+        testo = " ".join("JOLLY" if v == "JOLLY" else f"{v}{s}" for v, s in mano)
+        richieste.append((f"/{m}", json.dumps({"mano": testo}).encode()))
+    return richieste
+
+
+async def _invia(reader, writer, host, percorso, corpo):
+    """Una richiesta sulla connessione aperta: restituisce lo stato HTTP."""
+    writer.write((f"POST {percorso} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(corpo)}\r\n\r\n").encode() + corpo)
+    await writer.drain()
+    testa = await reader.readuntil(b"\r\n\r\n")
+    righe = testa.decode("latin-1").split("\r\n")
+    lunghezza = 0
+    for riga in righe[1:]:
+        if riga.lower().startswith("content-length:"):
+            lunghezza = int(riga.split(":", 1)[1])
+    await reader.readexactly(lunghezza)
+    return int(righe[0].split(" ", 2)[1])
+
+
+async def livello(host, porta, concorrenza, richieste):
+    """Misura un livello di concorrenza; restituisce il dict dei risultati."""
+    coda = iter(richieste)
+    latenze = []
+    stati = {}
+    connessioni = [await asyncio.open_connection(host, porta) for _ in range(concorrenza)]
+
+    async def client(reader, writer):
+        for percorso, corpo in coda:
+            t = time.perf_counter()
+            stato = await _invia(reader, writer, host, percorso, corpo)
+            latenze.append((time.perf_counter() - t) * 1000)
+            stati[stato] = stati.get(stato, 0) + 1
+
+    inizio = time.perf_counter()
+    try:
+        await asyncio.gather(*(client(r, w) for r, w in connessioni))
+    finally:
+        for _, writer in connessioni:
+            writer.close()
+    durata = time.perf_counter() - inizio
+    return {
+        "concorrenza": concorrenza,
+        "richieste": len(latenze),
+        "p50_ms": _percentile(latenze, 50),
+        "p99_ms": _percentile(latenze, 99),
+        "richieste_al_secondo": len(latenze) / durata if durata else 0.0,
+        "rifiutate": stati.get(503, 0),
+        "errori": sum(n for s, n in stati.items() if s not in (200, 503)),
+    }
+
+
+def avvia_servizio(workers):
+    """Avvia src.servizio su una porta libera: (processo, porta)."""
+    comando = [sys.executable, "-m", "src.servizio", "--porta", "0"]
+    if workers is not None:
+        comando += ["--workers", str(workers)]
+    radice = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processo = subprocess.Popen(comando, cwd=radice, stdout=subprocess.PIPE, text=True, encoding="utf-8")
+    riga = processo.stdout.readline()
+    trovata = re.search(r":(\d+)\s*$", riga)
+    if not trovata:
+        processo.kill()
+        raise RuntimeError(f"Il servizio non si è avviato: {riga!r}")
+    return processo, int(trovata.group(1))
+
+
+async def esegui(host, porta, livelli, n, metodo, stesse_mani):
+    risultati = []
+    for k, concorrenza in enumerate(livelli):
+        richieste = corpi(n, metodo, 0 if stesse_mani else k)
+        risultato = await livello(host, porta, concorrenza, richieste)
+        print(f"{concorrenza:>5} client  p50 {risultato['p50_ms']:8.2f} ms  p99 {risultato['p99_ms']:8.2f} ms  "
+              f"{risultato['richieste_al_secondo']:8.0f} req/s  503: {risultato['rifiutate']}", file=sys.stderr)
+        risultati.append(risultato)
+    return risultati
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prova di carico del servizio di analisi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=None, help="servizio già avviato (default: ne avvia uno)")
+    parser.add_argument("--workers", type=int, default=None, help="worker del servizio avviato qui")
+    parser.add_argument("--richieste", type=int, default=1000, help="richieste per livello")
+    parser.add_argument("--metodo", choices=METODI + ("misto",), default="apertura")
+    parser.add_argument("--livelli", default=",".join(map(str, LIVELLI)),
+                        help="livelli di concorrenza separati da virgole")
+    parser.add_argument("--stesse-mani", action="store_true", help="stesse mani a ogni livello (cache calda)")
+    parser.add_argument("--output", default=None, help="file JSON dei risultati")
+    args = parser.parse_args(argv)
+    livelli = [int(x) for x in args.livelli.split(",") if x.strip()]
+
+    processo = None
+    porta = args.porta
+    if porta is None:
+        processo, porta = avvia_servizio(args.workers)
+    try:
+        risultati = asyncio.run(esegui(args.host, porta, livelli, args.richieste, args.metodo, args.stesse_mani))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    testo = json.dumps({"metodo": args.metodo, "livelli": risultati}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(testo)
+    else:
+        print(testo)
+    return 1 if any(r["errori"] for r in risultati) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
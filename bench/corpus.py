@@ -0,0 +1,50 @@
+# corpus.py – Corpus riproducibile di mani per i benchmark
+
+import random
+from src.core import SEMI, VALORI, tutte_le_carte
+
+JOLLY_GUI = [("JOLLY", "J0-red"), ("JOLLY", "J1-black")]
+
+
+def mani_casuali(n, seed=0):
+    """Mani di 13 carte estratte da un mazzo con due jolly."""
+    rng = random.Random(seed)
+    mazzo = tutte_le_carte() + JOLLY_GUI
+    return [rng.sample(mazzo, 13) for _ in range(n)]
+
+
+def mani_avverse(n, seed=1):
+    """
+    Mani con 2 jolly e 11 carte prese da una finestra di 4 valori in 3
+    semi: moltissime scale e tris sovrapposti.
+    """
+    rng = random.Random(seed)
+    mani = []
+    for _ in range(n):
+        inizio = rng.randrange(len(VALORI) - 3)
+        semi = rng.sample(SEMI, 3)
+        griglia = [(VALORI[i], s) for s in semi for i in range(inizio, inizio + 4)]
+        mani.append(rng.sample(griglia, 11) + JOLLY_GUI)
+    return mani
+
+
+def mani_scale_lunghe(n, seed=2):
+    """Mani con una scala di 10-13 carte in un seme, completate a caso."""
+    rng = random.Random(seed)
+    mani = []
+    for _ in range(n):
+        seme = rng.choice(SEMI)
+        lunghezza = rng.randint(10, 13)
+        inizio = rng.randint(0, len(VALORI) - lunghezza)
+        mano = [(VALORI[i], seme) for i in range(inizio, inizio + lunghezza)]
+        resto = [c for c in tutte_le_carte() + JOLLY_GUI if c not in mano]
+        mani.append(mano + rng.sample(resto, 13 - lunghezza))
+    return mani
+
+
+def corpus(n=200):
+    return {
+        "casuali": mani_casuali(n),
+        "avverse": mani_avverse(n),
+        "scale_lunghe": mani_scale_lunghe(n),
+    }
@@ -0,0 +1,92 @@
+# importtime.py – Budget del tempo di import dei moduli headless
+#
+#   python -m bench.importtime [--ripetizioni 5] [--fattore 1.0]
+#
+# Ogni modulo è importato in un interprete nuovo con `python -X importtime`
+# (dopo un primo avvio che scrive i .pyc); si confronta la mediana del
+# tempo cumulativo con il budget e si verifica che Tkinter non sia caricato.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget in millisecondi del tempo cumulativo di import: circa il doppio
+# del massimo di 5 misure (ognuna la mediana di 5 import) su una macchina a
+# un core, dove due misure di fila differiscono anche del 50%. Un budget
+# superato è una regressione, non rumore; tests/test_importtime.py li controlla
+BUDGET_MS = {
+    "src.core": 5,
+    "src.tabelle": 12,
+    "src.tavolo": 5,
+    "src.punteggi": 10,
+    "src.logic": 15,
+    "src.logic_log": 15,
+    "src.aperture": 20,
+    "src.cache": 25,
+    "src.state": 15,
+    "src.strategy": 25,
+    "src.avversario": 20,
+    "src.cli": 50,
+    # asyncio da solo ne prende quasi la metà (misurati 60-97 ms)
+    "src.servizio": 200,
+}
+VIETATI = ("tkinter", "_tkinter")
+
+
+def _ambiente():
+    ambiente = dict(os.environ)
+    # Senza .pyc si misurerebbe la compilazione, non l'import
+    ambiente.pop("PYTHONDONTWRITEBYTECODE", None)
+    return ambiente
+
+
+def misura(modulo, ripetizioni=5):
+    """Mediana del tempo cumulativo di import (ms) e moduli vietati caricati."""
+    ambiente = _ambiente()
+    controllo = (f"import sys, {modulo}; "
+                 f"print(','.join(m for m in {VIETATI!r} if m in sys.modules))")
+    uscita = subprocess.run([sys.executable, "-c", controllo], cwd=RADICE, env=ambiente,
+                            capture_output=True, text=True, check=True)
+    vietati = [m for m in uscita.stdout.strip().split(",") if m]
+
+    tempi = []
+    for _ in range(ripetizioni):
+        uscita = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                                cwd=RADICE, env=ambiente, capture_output=True, text=True, check=True)
+        for riga in uscita.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parti = riga.split("|")
+            if len(parti) == 3 and parti[2].strip() == modulo:
+                tempi.append(int(parti[1]) / 1000)
+    return statistics.median(tempi), vietati
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo di import dei moduli headless")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--fattore", type=float, default=1.0,
+                        help="moltiplica i budget (macchine lente)")
+    args = parser.parse_args(argv)
+
+    violazioni = []
+    for modulo, budget in BUDGET_MS.items():
+        tempo, vietati = misura(modulo, args.ripetizioni)
+        limite = budget * args.fattore
+        esito = "ok" if tempo <= limite and not vietati else "KO"
+        print(f"{esito:2} {modulo:16} {tempo:6.1f} ms (budget {limite:.0f} ms)"
+              + (f", carica {', '.join(vietati)}" if vietati else ""))
+        if tempo > limite:
+            violazioni.append(f"{modulo}: {tempo:.1f} ms oltre il budget di {limite:.0f} ms")
+        if vietati:
+            violazioni.append(f"{modulo} carica {', '.join(vietati)}")
+    for v in violazioni:
+        print(f"⚠️ {v}", file=sys.stderr)
+    return 1 if violazioni else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
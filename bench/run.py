@@ -0,0 +1,148 @@
+# run.py – Benchmark di genera_combinazioni, scegli_apertura, suggerisci_scarto e del log reso come testo
+#
+#   python -m bench.run [--output risultati.json] [--baseline bench/baseline.json]
+#                       [--soglia 0.5] [--salva-baseline]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from src.logic import genera_combinazioni, scegli_apertura
+from src.logic_log import suggerisci_scarto
+from bench.corpus import corpus
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def scarto_con_log(carte):
+    """Scarto e log reso come testo: il costo della spiegazione per chi la legge."""
+    scarto, log = suggerisci_scarto(carte)
+    return scarto, "\n".join(log)
+
+
+def _funzioni(mani):
+    """Per ogni funzione, la lista di argomenti già pronti (fuori dal tempo misurato)."""
+    combinazioni = [genera_combinazioni(m) for m in mani]
+    rimaste = [scegli_apertura(c, m)["carte_rimaste"] or m for c, m in zip(combinazioni, mani)]
+    return {
+        "genera_combinazioni": (genera_combinazioni, [(m,) for m in mani]),
+        "scegli_apertura": (scegli_apertura, list(zip(combinazioni, mani))),
+        "suggerisci_scarto": (suggerisci_scarto, [(r,) for r in rimaste]),
+        "scarto_con_log": (scarto_con_log, [(r,) for r in rimaste]),
+    }
+
+
+def _percentile(valori, p):
+    ordinati = sorted(valori)
+    k = min(len(ordinati) - 1, int(round(p / 100 * (len(ordinati) - 1))))
+    return ordinati[k]
+
+
+def misura(funzione, argomenti, ripetizioni=3):
+    """Latenze per chiamata (µs), throughput e picco di memoria (tracemalloc)."""
+    for args in argomenti:
+        funzione(*args)  # riscaldamento
+
+    latenze = []
+    inizio = time.perf_counter()
+    for _ in range(ripetizioni):
+        for args in argomenti:
+            t = time.perf_counter_ns()
+            funzione(*args)
+            latenze.append((time.perf_counter_ns() - t) / 1000)
+    totale = time.perf_counter() - inizio
+
+    # Il picco di memoria si misura in un passaggio separato: tracemalloc rallenta
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for args in argomenti:
+        funzione(*args)
+    _, picco = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "chiamate": len(latenze),
+        "p50_us": _percentile(latenze, 50),
+        "p90_us": _percentile(latenze, 90),
+        "p99_us": _percentile(latenze, 99),
+        "max_us": max(latenze),
+        "chiamate_al_secondo": len(latenze) / totale if totale else 0.0,
+        "picco_memoria_byte": picco,
+    }
+
+
+def esegui(n=200, ripetizioni=3):
+    risultati = {}
+    for nome, mani in corpus(n).items():
+        risultati[nome] = {
+            funzione: misura(f, argomenti, ripetizioni)
+            for funzione, (f, argomenti) in _funzioni(mani).items()
+        }
+    return {
+        "python": platform.python_version(),
+        "macchina": platform.machine(),
+        "mani_per_corpus": n,
+        "risultati": risultati,
+    }
+
+
+def confronta(attuale, baseline, soglia):
+    """
+    Regressioni: p50 oltre (1 + soglia) volte la baseline. Il p99 è
+    riportato ma non confrontato, su macchine condivise è troppo rumoroso.
+    """
+    regressioni = []
+    for corpus_nome, funzioni in attuale["risultati"].items():
+        for funzione, misure in funzioni.items():
+            base = baseline.get("risultati", {}).get(corpus_nome, {}).get(funzione)
+            if not base:
+                continue
+            if misure["p50_us"] > base["p50_us"] * (1 + soglia):
+                regressioni.append(
+                    f"{corpus_nome}/{funzione} p50: {misure['p50_us']:.1f} µs "
+                    f"contro {base['p50_us']:.1f} della baseline")
+    return regressioni
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark della logica di Scala 40")
+    parser.add_argument("--mani", type=int, default=200)
+    parser.add_argument("--ripetizioni", type=int, default=3)
+    parser.add_argument("--output", default=None, help="file JSON dei risultati")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--soglia", type=float, default=0.5,
+                        help="regressione ammessa rispetto alla baseline (0.5 = +50%%)")
+    parser.add_argument("--salva-baseline", action="store_true",
+                        help="scrive i risultati come nuova baseline")
+    args = parser.parse_args(argv)
+
+    attuale = esegui(args.mani, args.ripetizioni)
+    testo = json.dumps(attuale, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(testo)
+    else:
+        print(testo)
+
+    if args.salva_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(testo + "\n")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Nessuna baseline in {args.baseline}", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressioni = confronta(attuale, baseline, args.soglia)
+    for r in regressioni:
+        print(f"⚠️ Regressione {r}", file=sys.stderr)
+    return 1 if regressioni else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,8 @@
-from src.gui import avvia_gui
+def main():
+    # La GUI (e Tkinter) si carica solo quando serve: src.logic e gli altri
+    # moduli headless non dipendono da questo file
+    from src.gui import avvia_gui
+    avvia_gui()
 
 if __name__ == "__main__":
-    avvia_gui()
+    main()
@@ -0,0 +1,456 @@
+# aperture.py – Tabella su disco delle aperture di mani canoniche
+#
+#   python -m src.aperture costruisci [--corpus MANI] [--mani 200000] [--blocco 5000] [--workers 4] [--output FILE]
+#   python -m src.aperture misura [--file FILE] [--corpus MANI] [--mani 5000] [--registra]
+#
+# L'apertura dipende solo dalla mano canonica (cache.firma_mano: semi
+# riordinati). Il costruttore prende le mani a blocchi da un corpus
+# registrato (un file di mani nel formato di src.cli, per esempio gli
+# input di produzione) oppure le estrae da seed fissi, risolve le mani
+# canoniche in parallelo e scrive un file per blocco, così un avvio
+# interrotto riprende dai blocchi mancanti; alla fine unisce i blocchi in
+# un unico file a record fissi ordinati per hash, con un indice di bucket
+# in testa. A runtime il file è mappato in memoria (mmap) e una ricerca
+# legge un bucket di pochi record.
+#
+# Le mani a 13 carte distinte sono troppe per una tabella: mani estratte a
+# caso non si ripetono quasi mai, e una ricerca mancata costa senza
+# servire. Per questo `misura --registra` scrive nell'intestazione la
+# quota di hit su mani che non sono servite a costruirla, e la tabella si
+# consulta (tabella_aperture) solo se la quota misurata arriva a
+# QUOTA_HIT_MINIMA.
+#
+# Seed (o impronta del corpus), dimensione dei blocchi e versioni del
+# risolutore e delle tabelle delle scale stanno in PARAMETRI nella
+# cartella dei blocchi e nell'intestazione del file: una ripresa con
+# parametri diversi si ferma invece di mescolare blocchi vecchi, e un file
+# di un'altra versione non viene caricato.
+
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+from src.core import N_VALORI, MASCHERA_SEME, punti_maschera
+from src.tabelle import VERSIONE as VERSIONE_TABELLE
+
+FILE_APERTURE = os.environ.get("SCALA40_APERTURE", os.path.join(os.path.dirname(__file__), "aperture.bin"))
+CARTE_MANO = 13
+
+# Da aumentare quando cambia la scelta dell'apertura (src.logic)
+VERSIONE_RISOLUTORE = 2
+PARAMETRI = "parametri.json"
+# Quota di hit su mani nuove sotto la quale la tabella non si consulta: una
+# ricerca costa pochi µs, una risoluzione qualche centinaio
+QUOTA_HIT_MINIMA = 0.05
+
+_MAGIC = b"AP40"
+_VERSIONE = 3
+# magic, versione, bit dell'indice, versione risolutore, versione tabelle,
+# seed, dimensione blocco, record, ricerche e hit dell'ultima misura
+_INTESTAZIONE = struct.Struct("<4sBBBBqIIII")
+_MISURA = struct.Struct("<II")
+# Record: maschera (jolly compresi), doppie, punti, puo_aprire, n combinazioni, 4 combinazioni
+_RECORD = struct.Struct("<QQHBB4I")
+MAX_COMBINAZIONI = 4
+_MASCHERA_64 = (1 << 64) - 1
+
+
+def _hash(maschera, doppie):
+    """Hash a 64 bit stabile tra processi (non dipende da PYTHONHASHSEED)."""
+    x = (maschera * 0x9E3779B97F4A7C15 ^ doppie * 0xC2B2AE3D27D4EB4F) & _MASCHERA_64
+    x ^= x >> 31
+    x = x * 0xBF58476D1CE4E5B9 & _MASCHERA_64
+    return x ^ x >> 29
+
+
+# Combinazione a 32 bit: tipo (1) | seme o valore (4) | carte (13 per seme,
+# 4 semi per il tris) | jolly (3) | inizio (4) | lunghezza (4)
+
+def codifica_combinazione(c):
+    maschera = c["maschera"]
+    basso = (maschera & -maschera).bit_length() - 1
+    if c["tipo"] == "scala":
+        seme = basso // N_VALORI
+        voce = seme << 1 | (maschera >> seme * N_VALORI) << 5
+        inizio = c["inizio"]
+    else:
+        valore = basso % N_VALORI
+        semi = sum(1 << s for s in range(4) if maschera >> (s * N_VALORI + valore) & 1)
+        voce = 1 | valore << 1 | semi << 5
+        inizio = 0
+    return voce | c["jolly"] << 18 | inizio << 21 | c["lunghezza"] << 25
+
+
+def decodifica_combinazione(voce):
+    jolly = voce >> 18 & 0x7
+    lunghezza = voce >> 25 & 0xF
+    if voce & 1:
+        valore = voce >> 1 & 0xF
+        maschera = sum(1 << (s * N_VALORI + valore) for s in range(4) if voce >> (5 + s) & 1)
+        tipo, inizio = "tris", None
+    else:
+        seme = voce >> 1 & 0xF
+        maschera = (voce >> 5 & MASCHERA_SEME) << seme * N_VALORI
+        tipo, inizio = "scala", voce >> 21 & 0xF
+    return {
+        "tipo": tipo,
+        "maschera": maschera,
+        "jolly": jolly,
+        "punti": punti_maschera(maschera),
+        "inizio": inizio,
+        "lunghezza": lunghezza,
+    }
+
+
+def codifica_record(maschera, doppie, apertura):
+    combinazioni = apertura["combinazioni"]
+    if len(combinazioni) > MAX_COMBINAZIONI:
+        raise ValueError(f"{len(combinazioni)} combinazioni in un record da {MAX_COMBINAZIONI}")
+    voci = [codifica_combinazione(c) for c in combinazioni]
+    voci += [0] * (MAX_COMBINAZIONI - len(voci))
+    return _RECORD.pack(maschera, doppie, apertura["punti"], apertura["puo_aprire"], len(combinazioni), *voci)
+
+
+def _decodifica_record(campi):
+    _, _, punti, puo_aprire, n, *voci = campi
+    return {
+        "puo_aprire": bool(puo_aprire),
+        "combinazioni": [decodifica_combinazione(v) for v in voci[:n]],
+        "punti": punti,
+        "statistiche": {"nodi": 0, "potati": 0},
+    }
+
+
+class TabellaAperture:
+    """
+    File della tabella mappato in sola lettura. cerca() restituisce il
+    risultato di scegli_apertura_maschera (puo_aprire, combinazioni, punti)
+    per la mano canonica, o None se la mano non c'è. quota_hit è la quota
+    di hit registrata da misura(), None se la tabella non è stata misurata.
+    """
+
+    def __init__(self, percorso=None):
+        percorso = FILE_APERTURE if percorso is None else percorso
+        self.percorso = percorso
+        with open(percorso, "rb") as f:
+            self._mappa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, versione, self.bit, risolutore, tabelle, self.seed, self.dimensione_blocco,
+         self.n_record, ricerche, hit) = _INTESTAZIONE.unpack_from(self._mappa, 0)
+        if magic != _MAGIC or versione != _VERSIONE:
+            self._mappa.close()
+            raise ValueError(f"{percorso} non è una tabella delle aperture valida")
+        if (risolutore, tabelle) != (VERSIONE_RISOLUTORE, VERSIONE_TABELLE):
+            self._mappa.close()
+            raise ValueError(f"{percorso} è stata costruita con un'altra versione del risolutore o delle tabelle")
+        self.quota_hit = hit / ricerche if ricerche else None
+        self._indice = _INTESTAZIONE.size
+        self._record = self._indice + 4 * ((1 << self.bit) + 1)
+
+    def cerca(self, maschera, doppie):
+        bucket = _hash(maschera, doppie) >> (64 - self.bit)
+        inizio, fine = struct.unpack_from("<II", self._mappa, self._indice + 4 * bucket)
+        for i in range(inizio, fine):
+            campi = _RECORD.unpack_from(self._mappa, self._record + i * _RECORD.size)
+            if campi[0] == maschera and campi[1] == doppie:
+                return _decodifica_record(campi)
+        return None
+
+    def __len__(self):
+        return self.n_record
+
+    def chiudi(self):
+        self._mappa.close()
+
+
+_TABELLA = None
+_TABELLA_LETTA = False
+
+
+def tabella_aperture():
+    """
+    La tabella di FILE_APERTURE, aperta al primo uso; None se il file manca,
+    non è valido o non ha una quota di hit misurata di almeno
+    QUOTA_HIT_MINIMA.
+    """
+    global _TABELLA, _TABELLA_LETTA
+    if not _TABELLA_LETTA:
+        _TABELLA_LETTA = True
+        try:
+            _TABELLA = TabellaAperture()
+        except (OSError, ValueError):
+            _TABELLA = None
+        if _TABELLA is not None and (_TABELLA.quota_hit or 0) < QUOTA_HIT_MINIMA:
+            _TABELLA.chiudi()
+            _TABELLA = None
+    return _TABELLA
+
+
+# === Costruzione ===
+
+def mani_del_blocco(seed, blocco, n):
+    """n mani di 13 carte (interi di src.state) estratte da un sabot con seed per (seed, blocco)."""
+    from src.state import nuovo_mazzo
+
+    rng = random.Random(f"{seed}-{blocco}")
+    mani = []
+    for _ in range(n):
+        mani.append(nuovo_mazzo(rng)[:CARTE_MANO])
+    return mani
+
+
+def mani_del_corpus(corpus, inizio=0, n=None):
+    """
+    Le mani (tuple) delle righe non vuote dalla inizio-esima (da 0) in poi,
+    al più n, di un file nel formato di input di src.cli. Solleva
+    ValueError per una riga non valida.
+    """
+    from itertools import islice
+    from src.cli import leggi_riga, righe_numerate
+
+    with open(corpus, encoding="utf-8") as f:
+        righe = islice(righe_numerate(f), inizio, None if n is None else inizio + n)
+        return [leggi_riga(riga, numero)["mano"] for numero, riga in righe]
+
+
+def conta_mani(corpus):
+    """Numero di mani (righe non vuote) di un corpus."""
+    with open(corpus, encoding="utf-8") as f:
+        return sum(1 for riga in f if riga.strip())
+
+
+def impronta(corpus):
+    """SHA-256 del file del corpus: una ripresa su un corpus diverso non riusa i blocchi."""
+    import hashlib
+
+    h = hashlib.sha256()
+    with open(corpus, "rb") as f:
+        for pezzo in iter(lambda: f.read(1 << 20), b""):
+            h.update(pezzo)
+    return h.hexdigest()
+
+
+def parametri(seed, dimensione_blocco, corpus=None):
+    """
+    Parametri che un blocco già scritto deve condividere per essere riusato;
+    corpus è l'impronta del corpus, o None per le mani estratte da seed.
+    """
+    return {"seed": seed, "dimensione_blocco": dimensione_blocco, "corpus": corpus,
+            "risolutore": VERSIONE_RISOLUTORE, "tabelle": VERSIONE_TABELLE}
+
+
+def _nome_blocco(blocco, n):
+    return f"{blocco:06d}-{n:06d}.bin"
+
+
+def risolvi_blocco(seed, blocco, n, cartella, corpus=None, dimensione_blocco=None):
+    """
+    Risolve le mani canoniche distinte del blocco e scrive i record in
+    cartella/BBBBBB-NNNNNN.bin, con indice del blocco e numero di mani
+    (prima in un file temporaneo). Le mani vengono dal file corpus, a
+    blocchi di dimensione_blocco righe, o se manca da mani_del_blocco.
+    Restituisce (blocco, record scritti).
+    """
+    from src.cache import firma_mano, maschera_canonica
+    from src.logic import itera_combinazioni_maschera, scegli_apertura_maschera
+    from src.state import mano_a_tuple
+
+    if corpus is not None:
+        mani = mani_del_corpus(corpus, blocco * dimensione_blocco, n)
+    else:
+        mani = [mano_a_tuple(m) for m in mani_del_blocco(seed, blocco, n)]
+    canoniche = dict.fromkeys(maschera_canonica(firma_mano(m)[0]) for m in mani)
+    record = []
+    for maschera, doppie in canoniche:
+        combinazioni = list(itera_combinazioni_maschera(maschera))
+        apertura = scegli_apertura_maschera(combinazioni, maschera, doppie)
+        record.append(codifica_record(maschera, doppie, apertura))
+    percorso = os.path.join(cartella, _nome_blocco(blocco, n))
+    with open(percorso + ".tmp", "wb") as f:
+        f.write(b"".join(record))
+    os.replace(percorso + ".tmp", percorso)
+    return blocco, len(record)
+
+
+def leggi_parametri(cartella):
+    """Parametri registrati nella cartella dei blocchi, o None se mancano."""
+    import json
+
+    try:
+        with open(os.path.join(cartella, PARAMETRI), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def unisci_blocchi(cartella, output):
+    """
+    Unisce i file dei blocchi, toglie i doppioni e scrive la tabella
+    indicizzata, con i parametri della cartella nell'intestazione.
+    """
+    voluti = leggi_parametri(cartella)
+    if voluti is None or voluti != parametri(voluti["seed"], voluti["dimensione_blocco"], voluti.get("corpus")):
+        raise ValueError(f"{cartella}: blocchi senza parametri o di un'altra versione del risolutore")
+    record = {}
+    for nome in sorted(os.listdir(cartella)):
+        if not nome.endswith(".bin"):
+            continue
+        with open(os.path.join(cartella, nome), "rb") as f:
+            dati = f.read()
+        for i in range(0, len(dati), _RECORD.size):
+            voce = dati[i:i + _RECORD.size]
+            maschera, doppie = struct.unpack_from("<QQ", voce)
+            record[maschera, doppie] = voce
+
+    bit = max(1, (len(record) - 1).bit_length())
+    ordinati = sorted(record.items(), key=lambda kv: (_hash(*kv[0]) >> (64 - bit), kv[0]))
+    conteggi = [0] * (1 << bit)
+    for chiave, _ in ordinati:
+        conteggi[_hash(*chiave) >> (64 - bit)] += 1
+    indice = [0]
+    for n in conteggi:
+        indice.append(indice[-1] + n)
+
+    with open(output + ".tmp", "wb") as f:
+        f.write(_INTESTAZIONE.pack(_MAGIC, _VERSIONE, bit, VERSIONE_RISOLUTORE, VERSIONE_TABELLE,
+                                   voluti["seed"], voluti["dimensione_blocco"], len(ordinati), 0, 0))
+        f.write(struct.pack(f"<{len(indice)}I", *indice))
+        for _, voce in ordinati:
+            f.write(voce)
+    os.replace(output + ".tmp", output)
+    return len(ordinati)
+
+
+def costruisci(mani=200000, dimensione_blocco=5000, seed=0, workers=None, output=FILE_APERTURE, corpus=None):
+    """
+    Costruisce la tabella dalle mani del file corpus (tutte) o, se manca,
+    da `mani` mani casuali. I blocchi già presenti nella cartella output +
+    '.blocchi' non vengono rifatti; solleva ValueError se sono stati
+    costruiti con altri parametri (seed, corpus, dimensione_blocco o
+    versioni). Con workers=0 tutto gira in questo processo. La tabella
+    scritta non è misurata: vedi misura(). Restituisce (record, byte del
+    file).
+    """
+    cartella = output + ".blocchi"
+    os.makedirs(cartella, exist_ok=True)
+    if corpus is not None:
+        mani = conta_mani(corpus)
+    voluti = parametri(seed, dimensione_blocco, impronta(corpus) if corpus is not None else None)
+    trovati = leggi_parametri(cartella)
+    if trovati is None:
+        if any(n.endswith(".bin") for n in os.listdir(cartella)):
+            raise ValueError(f"{cartella} contiene blocchi senza {PARAMETRI}: svuotarla prima di costruire")
+        import json
+
+        with open(os.path.join(cartella, PARAMETRI), "w", encoding="utf-8") as f:
+            json.dump(voluti, f)
+    elif trovati != voluti:
+        raise ValueError(f"{cartella} contiene blocchi costruiti con {trovati}, non {voluti}: "
+                         "svuotarla o usare gli stessi parametri")
+    fatti = set(os.listdir(cartella))
+    blocchi = []
+    for b, inizio in enumerate(range(0, mani, dimensione_blocco)):
+        n = min(dimensione_blocco, mani - inizio)
+        if _nome_blocco(b, n) not in fatti:
+            blocchi.append((b, n))
+
+    if blocchi and workers == 0:
+        for b, n in blocchi:
+            risolvi_blocco(seed, b, n, cartella, corpus, dimensione_blocco)
+            print(f"blocco {b} fatto", file=sys.stderr)
+    elif blocchi:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuri = [pool.submit(risolvi_blocco, seed, b, n, cartella, corpus, dimensione_blocco)
+                      for b, n in blocchi]
+            for futuro in as_completed(futuri):
+                b, n = futuro.result()
+                print(f"blocco {b} fatto ({n} mani canoniche)", file=sys.stderr)
+
+    n_record = unisci_blocchi(cartella, output)
+    return n_record, os.path.getsize(output)
+
+
+def misura(percorso=FILE_APERTURE, mani=5000, seed=1, corpus=None, registra=False):
+    """
+    Tempo medio per ricerca (µs) e quota di hit su mani nuove e su mani
+    della tabella. Le mani nuove sono le prime `mani` del file corpus, da
+    tenere fuori dalla costruzione, o altrimenti mani estratte con un seed
+    diverso da quelli dei blocchi. Con registra=True la quota sulle mani
+    nuove si scrive nell'intestazione: tabella_aperture() la usa per
+    decidere se consultare la tabella.
+    """
+    from src.cache import firma_mano, maschera_canonica
+    from src.state import mano_a_tuple
+
+    if corpus is not None:
+        mani_nuove = mani_del_corpus(corpus, 0, mani)
+    else:
+        mani_nuove = [mano_a_tuple(m) for m in mani_del_blocco(f"misura-{seed}", 0, mani)]
+    tabella = TabellaAperture(percorso)
+    nuove = [maschera_canonica(firma_mano(m)[0]) for m in mani_nuove]
+    presenti = [_RECORD.unpack_from(tabella._mappa, tabella._record + i * _RECORD.size)[:2]
+                for i in range(0, tabella.n_record, max(1, tabella.n_record // mani))][:mani]
+
+    risultati = {}
+    for nome, chiavi in (("nuove", nuove), ("presenti", presenti)):
+        inizio = time.perf_counter()
+        hit = sum(tabella.cerca(*k) is not None for k in chiavi)
+        durata = time.perf_counter() - inizio
+        risultati[nome] = {"ricerche": len(chiavi), "hit": hit, "quota_hit": hit / len(chiavi) if chiavi else 0.0,
+                           "us_per_ricerca": durata / len(chiavi) * 1e6 if chiavi else 0.0}
+    tabella.chiudi()
+
+    if registra:
+        with open(percorso, "r+b") as f:
+            f.seek(_INTESTAZIONE.size - _MISURA.size)
+            f.write(_MISURA.pack(risultati["nuove"]["ricerche"], risultati["nuove"]["hit"]))
+    return risultati
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tabella su disco delle aperture di mani canoniche")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+    p = comandi.add_parser("costruisci", help="costruisce (o riprende) la tabella")
+    p.add_argument("--corpus", default=None, help="file di mani registrate (formato di src.cli)")
+    p.add_argument("--mani", type=int, default=200000, help="mani casuali, senza --corpus")
+    p.add_argument("--blocco", type=int, default=5000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workers", type=int, default=None, help="0 = tutto in questo processo")
+    p.add_argument("--output", default=FILE_APERTURE)
+    p = comandi.add_parser("misura", help="latenza e quota di hit delle ricerche")
+    p.add_argument("--file", default=FILE_APERTURE)
+    p.add_argument("--corpus", default=None, help="mani nuove, non usate per costruire la tabella")
+    p.add_argument("--mani", type=int, default=5000)
+    p.add_argument("--registra", action="store_true",
+                   help="scrive la quota di hit sulle mani nuove nella tabella")
+    args = parser.parse_args(argv)
+
+    if args.comando == "costruisci":
+        inizio = time.perf_counter()
+        try:
+            n, dimensione = costruisci(args.mani, args.blocco, args.seed, args.workers, args.output, args.corpus)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"{e}\n")
+        print(f"{n} mani canoniche in {time.perf_counter() - inizio:.1f} s, {dimensione} byte su disco")
+    else:
+        try:
+            risultati = misura(args.file, args.mani, corpus=args.corpus, registra=args.registra)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"{e}\n")
+        for nome, r in risultati.items():
+            print(f"{nome}: {r['hit']}/{r['ricerche']} hit ({r['quota_hit']:.1%}), "
+                  f"{r['us_per_ricerca']:.1f} µs per ricerca")
+        if args.registra:
+            quota = risultati["nuove"]["quota_hit"]
+            stato = "consultata" if quota >= QUOTA_HIT_MINIMA else "non consultata"
+            print(f"quota registrata: {quota:.1%}, tabella {stato} (minimo {QUOTA_HIT_MINIMA:.0%})")
+
+
+if __name__ == "__main__":
+    main()
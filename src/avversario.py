@@ -0,0 +1,177 @@
+# avversario.py – Tracciamento delle carte viste e stima di ciò che l'avversario tiene o cerca
+
+from src.core import N_VALORI, N_CARTE
+from src.state import JOLLY_ID, N_MAZZI, N_JOLLY, CARTE_IN_MANO, POSIZIONE_ASSO_ALTO
+
+# Ogni segnale (raccolta dagli scarti, scarto) moltiplica le quote di
+# bisogno delle carte collegate per questo fattore (o lo divide)
+FATTORE_SEGNALE = 2.0
+SEGNALE_RACCOLTA = 2
+SEGNALE_SCARTO = -1
+
+
+def _posizioni(valore):
+    """Posizioni in scala del valore: l'asso sta sia in 0 sia in cima."""
+    return (0, POSIZIONE_ASSO_ALTO) if valore == 0 else (valore,)
+
+
+def _compagne(c):
+    """
+    Carte che formano combinazioni con c, con un peso: stesso valore degli
+    altri semi (tris) e vicine di scala dello stesso seme; le vicine a
+    distanza due contano la metà perché servono a riempire un buco.
+    """
+    seme, valore = divmod(c, N_VALORI)
+    compagne = {}
+    for s in range(N_CARTE // N_VALORI):
+        if s != seme:
+            compagne[s * N_VALORI + valore] = 1.0
+    for p in _posizioni(valore):
+        for distanza, peso in ((1, 1.0), (2, 0.5)):
+            for q in (p - distanza, p + distanza):
+                if 0 <= q <= POSIZIONE_ASSO_ALTO:
+                    vicina = seme * N_VALORI + q % N_VALORI
+                    if vicina != c and compagne.get(vicina, 0) < peso:
+                        compagne[vicina] = peso
+    return tuple(compagne.items())
+
+
+COMPAGNE = [_compagne(c) for c in range(N_CARTE)]
+
+
+class Tracciatore:
+    """
+    Stato delle carte di un sabot da 2×52 + 4 jolly dal punto di vista di
+    un giocatore contro un avversario. Le carte sono gli interi di
+    src.state; ogni evento aggiorna i contatori in tempo costante.
+
+    - ignote[c]: copie di c mai viste (mazzo o mano avversaria)
+    - note[c]: copie di c che l'avversario ha di sicuro (raccolte dagli scarti)
+    - segnali[c]: indizi accumulati sul fatto che all'avversario serva c
+    """
+
+    __slots__ = ("ignote", "n_ignote", "note", "n_note", "carte_avversario", "segnali")
+
+    def __init__(self, carte_avversario=CARTE_IN_MANO):
+        self.ignote = [N_MAZZI] * N_CARTE + [N_JOLLY]
+        self.n_ignote = N_MAZZI * N_CARTE + N_JOLLY
+        self.note = [0] * (N_CARTE + 1)
+        self.n_note = 0
+        self.carte_avversario = carte_avversario
+        self.segnali = [0] * N_CARTE
+
+    @classmethod
+    def da_osservazioni(cls, mano=(), scarti_avversario=(), carte_avversario=CARTE_IN_MANO):
+        """Tracciatore per una mano nota e una lista di scarti dell'avversario."""
+        tracciatore = cls(carte_avversario + len(scarti_avversario))
+        for c in mano:
+            tracciatore.vista(c)
+        for c in scarti_avversario:
+            tracciatore.scarto_avversario(c)
+        return tracciatore
+
+    def copia(self):
+        nuovo = Tracciatore.__new__(Tracciatore)
+        nuovo.ignote = self.ignote[:]
+        nuovo.n_ignote = self.n_ignote
+        nuovo.note = self.note[:]
+        nuovo.n_note = self.n_note
+        nuovo.carte_avversario = self.carte_avversario
+        nuovo.segnali = self.segnali[:]
+        return nuovo
+
+    # === Eventi ===
+
+    def _esce(self, c):
+        if self.ignote[c] > 0:
+            self.ignote[c] -= 1
+            self.n_ignote -= 1
+
+    def _segnala(self, c, delta):
+        if c == JOLLY_ID:
+            return
+        self.segnali[c] += delta
+        for compagna, _ in COMPAGNE[c]:
+            self.segnali[compagna] += delta
+
+    def vista(self, c):
+        """Una carta diventa visibile senza passare dall'avversario (mano, pescata, scarto iniziale)."""
+        self._esce(c)
+
+    def nascosta(self, c):
+        """Annulla vista(c), per esempio quando una carta viene tolta dalla mano in GUI."""
+        if self.ignote[c] < (N_JOLLY if c == JOLLY_ID else N_MAZZI):
+            self.ignote[c] += 1
+            self.n_ignote += 1
+
+    def pesca_avversario(self):
+        """L'avversario pesca dal mazzo una carta che non vediamo."""
+        self.carte_avversario += 1
+
+    def raccolta_avversario(self, c):
+        """L'avversario prende c dagli scarti: ora la tiene, e le carte collegate gli servono."""
+        self.carte_avversario += 1
+        self.note[c] += 1
+        self.n_note += 1
+        self._segnala(c, SEGNALE_RACCOLTA)
+
+    def _gioca_avversario(self, c):
+        self.carte_avversario -= 1
+        if self.note[c] > 0:
+            self.note[c] -= 1
+            self.n_note -= 1
+        else:
+            self._esce(c)
+
+    def scarto_avversario(self, c):
+        """L'avversario scarta c: non gli serve, né gli servono molto le carte collegate."""
+        self._gioca_avversario(c)
+        self._segnala(c, SEGNALE_SCARTO)
+
+    def calata_avversario(self, carte):
+        """L'avversario cala o attacca queste carte sul tavolo."""
+        for c in carte:
+            self._gioca_avversario(c)
+
+    # === Stime ===
+
+    def p_tiene(self, c):
+        """
+        Probabilità che l'avversario abbia almeno una copia di c: certa se
+        l'ha raccolta, altrimenti ipergeometrica sulle carte ignote (le sue
+        carte non note sono un campione senza reinserimento delle ignote).
+        """
+        if self.note[c]:
+            return 1.0
+        copie = self.ignote[c]
+        sconosciute = self.carte_avversario - self.n_note
+        totale = self.n_ignote
+        if copie == 0 or sconosciute <= 0 or totale <= 0:
+            return 0.0
+        nessuna = 1.0
+        for i in range(copie):
+            if totale - sconosciute - i <= 0:
+                return 1.0
+            nessuna *= (totale - sconosciute - i) / (totale - i)
+        return 1.0 - nessuna
+
+    def bisogno(self, c):
+        """
+        Probabilità che all'avversario serva c: a priori, che tenga almeno
+        una carta compagna (stesso valore o vicina di scala), poi corretta
+        in quote dai segnali osservati. Il jolly serve sempre.
+        """
+        if c == JOLLY_ID:
+            return 1.0
+        nessuna = 1.0
+        for compagna, peso in COMPAGNE[c]:
+            nessuna *= 1.0 - peso * self.p_tiene(compagna)
+        base = 1.0 - nessuna
+        if base <= 0.0 or base >= 1.0:
+            return base
+        quote = base / (1.0 - base) * FATTORE_SEGNALE ** self.segnali[c]
+        return quote / (1.0 + quote)
+
+    def copie_rimaste(self, c):
+        """Copie di c che possono ancora arrivare: ignote più quelle in mano all'avversario."""
+        return self.ignote[c] + self.note[c]
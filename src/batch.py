@@ -0,0 +1,151 @@
+# batch.py – Valutazione vettoriale (NumPy) di molte mani insieme
+
+import numpy as np
+
+from src.core import SEMI, N_VALORI, N_CARTE, PUNTI_VALORE, INDICE_VALORE, bit_carta
+from src.logic_log import FASE_PESI, COEFFICIENTI as _K
+
+# Ogni riga della matrice di occupazione ha N_CARTE colonne per le carte
+# naturali (stesso ordine dei bit in src.core) e almeno una colonna per i
+# jolly: il numero di jolly è la somma delle colonne oltre N_CARTE.
+COLONNE = N_CARTE + 2
+
+_PUNTI = np.array(PUNTI_VALORE, dtype=np.int64)
+_FASI = list(FASE_PESI)
+_PESI = np.array([[FASE_PESI[f]["valore"], FASE_PESI[f]["strategia"], FASE_PESI[f]["rischio"]] for f in _FASI])
+
+_IDX = np.arange(N_VALORI)
+_CENTRALI = (_IDX > 2) & (_IDX < 11)
+_DUE_QUATTRO = np.isin(_IDX, [INDICE_VALORE["2"], INDICE_VALORE["4"]])
+_ALTE = np.isin(_IDX, [INDICE_VALORE[v] for v in ["10", "J", "Q", "K", "A"]])
+
+
+def mani_a_matrice(mani, colonne=COLONNE):
+    """Converte una lista di mani (liste di tuple) nella matrice N×colonne di occupazione."""
+    matrice = np.zeros((len(mani), colonne), dtype=np.int8)
+    for i, mano in enumerate(mani):
+        jolly = N_CARTE
+        for carta in mano:
+            if carta[0] == "JOLLY":
+                matrice[i, jolly] += 1
+                jolly = min(jolly + 1, colonne - 1)
+            else:
+                matrice[i, bit_carta(carta)] += 1
+    return matrice
+
+
+def posizioni_in_mano(mani):
+    """
+    Matrice N×N_CARTE con la posizione della prima copia di ogni carta
+    naturale nella mano (len(mano) se assente), per gli spareggi di valuta_mani.
+    """
+    posizioni = np.zeros((len(mani), N_CARTE), dtype=np.int64)
+    for i, mano in enumerate(mani):
+        posizioni[i] = len(mano)
+        for k in range(len(mano) - 1, -1, -1):
+            if mano[k][0] != "JOLLY":
+                posizioni[i, bit_carta(mano[k])] = k
+    return posizioni
+
+
+def _pesi_fase(fase, n):
+    """Pesi (valore, strategia, rischio) come colonne N×1×1 per il broadcast."""
+    if isinstance(fase, str):
+        indici = np.full(n, _FASI.index(fase) if fase in FASE_PESI else _FASI.index("centrale"))
+    else:
+        indici = np.array([_FASI.index(f) if f in FASE_PESI else _FASI.index("centrale") for f in fase])
+    pesi = _PESI[indici]
+    return pesi[:, 0, None, None], pesi[:, 1, None, None], pesi[:, 2, None, None]
+
+
+def valuta_mani(batch, giocate=None, fase="centrale", posizioni=None):
+    """
+    Valuta in blocco N mani date come matrice di occupazione N×COLONNE
+    (conteggi per carta, quindi anche mani con doppioni).
+    - giocate: matrice N×52 (o N×COLONNE) delle carte giocate dall'avversario
+    - fase: nome della fase, oppure sequenza di N nomi
+    - posizioni: matrice di posizioni_in_mano(mani); a parità di punteggio lo
+      scarto è la carta che viene prima nella mano, come in
+      logic_log.suggerisci_scarto. Senza, la matrice non conosce l'ordine e
+      vince la carta col bit più basso.
+    Restituisce un dict di array:
+        'tris': candidati tris/poker per mano (valori con >=3 semi, o 2 con jolly)
+        'scale': finestre di 3 valori consecutivi complete, o con un buco se c'è un jolly
+        'limite_apertura': limite superiore dei punti di apertura
+        'punteggi': N×4×13 punteggi di scarto come logic_log.suggerisci_scarto (nan se assente)
+        'scarto': colonna della carta da scartare (-1 se non ci sono carte naturali)
+    """
+    batch = np.asarray(batch)
+    n = batch.shape[0]
+    conteggi = batch[:, :N_CARTE].reshape(n, len(SEMI), N_VALORI).astype(np.int64)
+    jolly = batch[:, N_CARTE:].sum(axis=1)
+    presenti = conteggi > 0
+    con_jolly = (jolly > 0)[:, None, None]
+
+    # === TRIS ===
+    semi_per_valore = presenti.sum(axis=1)
+    ok_tris = (semi_per_valore >= 3) | ((semi_per_valore == 2) & (jolly > 0)[:, None])
+    tris = ok_tris.sum(axis=1)
+
+    # === SCALE === (posizione 13 = asso alto, niente giro K-A-2)
+    esteso = np.concatenate([presenti, presenti[:, :, :1]], axis=2).astype(np.int64)
+    finestre = esteso[:, :, :-2] + esteso[:, :, 1:-1] + esteso[:, :, 2:]
+    ok_scala = (finestre == 3) | ((finestre == 2) & con_jolly)
+    scale = ok_scala.sum(axis=(1, 2))
+
+    # Carte coperte da almeno un candidato: nessuna combinazione può usarne altre
+    coperte = np.zeros_like(esteso, dtype=bool)
+    for k in range(3):
+        coperte[:, :, k:k + ok_scala.shape[2]] |= ok_scala
+    coperte = coperte[:, :, :N_VALORI] | np.concatenate(
+        [coperte[:, :, N_VALORI:], np.zeros_like(coperte[:, :, 1:N_VALORI])], axis=2)
+    coperte |= ok_tris[:, None, :]
+    coperte &= presenti
+    limite_apertura = (conteggi * coperte * _PUNTI).sum(axis=(1, 2))
+
+    # === SCARTO === stessa sequenza di operazioni di logic_log.suggerisci_scarto
+    p_valore, p_strategia, p_rischio = _pesi_fase(fase, n)
+    base = _PUNTI[None, None, :]
+    score = base * p_valore
+    score = score + np.where((p_valore < 1) & (base >= 10), _K["alta_iniziale"], 0)
+
+    sinistra = np.zeros_like(presenti)
+    sinistra[:, :, 1:] = presenti[:, :, :-1]
+    destra = np.zeros_like(presenti)
+    destra[:, :, :-1] = presenti[:, :, 1:]
+    vicini = sinistra.astype(np.int64) + destra
+    score = score - (_K["vicino"] * vicini) * p_strategia
+
+    senza_tre = ~presenti[:, :, INDICE_VALORE["3"]][:, :, None]
+    score = score - np.where(_DUE_QUATTRO & senza_tre, _K["attacco_jolly"] * p_strategia, 0)
+    score = score - np.where(_CENTRALI, _K["intermedio"] * p_strategia, 0)
+
+    per_valore = conteggi.sum(axis=1)[:, None, :]
+    score = score - np.where(per_valore > 1, _K["tris"] * (per_valore - 1) * p_strategia, 0)
+
+    if giocate is not None:
+        giocate = np.asarray(giocate)[:, :N_CARTE].reshape(n, len(SEMI), N_VALORI)
+        num_giocate = giocate.sum(axis=1)[:, None, :]
+        score = score + num_giocate * _K["giocata"] * p_rischio
+
+    isolate = (per_valore == 1) & (vicini == 0)
+    score = score + np.where(isolate, np.where(_ALTE, _K["isolata_alta"], _K["isolata"]), 0)
+
+    punteggi = np.where(presenti, score, np.nan)
+    piatti = punteggi.reshape(n, N_CARTE)
+    ha_carte = presenti.reshape(n, N_CARTE).any(axis=1)
+    piatti = np.where(np.isnan(piatti), -np.inf, piatti)
+    if posizioni is None:
+        migliori = np.argmax(piatti, axis=1)
+    else:
+        massimi = piatti.max(axis=1, keepdims=True)
+        migliori = np.argmin(np.where(piatti == massimi, np.asarray(posizioni), np.iinfo(np.int64).max), axis=1)
+    scarto = np.where(ha_carte, migliori, -1)
+
+    return {
+        "tris": tris,
+        "scale": scale,
+        "limite_apertura": limite_apertura,
+        "punteggi": punteggi,
+        "scarto": scarto,
+    }
@@ -0,0 +1,290 @@
+# cache.py – Cache delle analisi di mano con firma canonica per semi
+
+import sys
+import time
+from array import array
+from collections import OrderedDict, Counter
+from src.core import (
+    SEMI, N_VALORI, MASCHERA_SEME, JOLLY, carte_a_maschere,
+    maschera_seme, maschera_jolly, maschera_a_carte, bit_carta,
+)
+from src.logic import itera_combinazioni_maschera, scegli_apertura_maschera, combinazione_a_carte
+from src import logic_log, punteggi
+from src.aperture import tabella_aperture
+
+
+class CacheAnalisi:
+    """
+    Cache LRU limitata per numero di voci e, opzionalmente, per memoria
+    stimata in byte. Tiene i contatori di hit, miss ed evizioni.
+    """
+
+    def __init__(self, max_voci=4096, memoria_max=None):
+        self.max_voci = max_voci
+        self.memoria_max = memoria_max
+        self._voci = OrderedDict()
+        self.memoria = 0
+        self.hit = 0
+        self.miss = 0
+        self.evizioni = 0
+
+    def get(self, chiave):
+        voce = self._voci.get(chiave)
+        if voce is None:
+            self.miss += 1
+            return None
+        self._voci.move_to_end(chiave)
+        self.hit += 1
+        return voce[0]
+
+    def put(self, chiave, valore):
+        if chiave in self._voci:
+            self.memoria -= self._voci.pop(chiave)[1]
+        dimensione = _dimensione(chiave) + _dimensione(valore)
+        self._voci[chiave] = (valore, dimensione)
+        self.memoria += dimensione
+        while self._voci and (
+            len(self._voci) > self.max_voci
+            or (self.memoria_max is not None and self.memoria > self.memoria_max)
+        ):
+            _, (_, dim) = self._voci.popitem(last=False)
+            self.memoria -= dim
+            self.evizioni += 1
+
+    def svuota(self):
+        self._voci.clear()
+        self.memoria = 0
+
+    def statistiche(self):
+        return {
+            "hit": self.hit,
+            "miss": self.miss,
+            "evizioni": self.evizioni,
+            "voci": len(self._voci),
+            "memoria": self.memoria,
+        }
+
+
+def _dimensione(obj):
+    """Stima grossolana della memoria occupata da un oggetto annidato."""
+    dimensione = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        dimensione += sum(_dimensione(k) + _dimensione(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        dimensione += sum(_dimensione(x) for x in obj)
+    return dimensione
+
+
+# Cache condivisa usata quando il chiamante non ne passa una
+CACHE = CacheAnalisi()
+
+
+def firma_mano(mano):
+    """
+    Firma canonica della mano, invariante per ordine delle carte e per
+    permutazione dei semi: i semi sono riordinati per maschera decrescente
+    (a parità, per maschera delle carte doppie).
+    Restituisce (firma, permutazione, jolly) dove firma è (maschere, n_jolly)
+    con una coppia (carte, doppie) per seme, permutazione[k] è il seme reale
+    del k-esimo seme canonico e jolly sono le tuple originali dei jolly.
+    """
+    maschera, doppie, jolly = carte_a_maschere(mano)
+    maschere = [(maschera_seme(maschera, s), maschera_seme(doppie, s)) for s in range(len(SEMI))]
+    permutazione = sorted(range(len(SEMI)), key=lambda s: (-maschere[s][0], -maschere[s][1]))
+    firma = (tuple(maschere[s] for s in permutazione), len(jolly))
+    return firma, permutazione, jolly
+
+
+def maschera_canonica(firma):
+    """(maschera, doppie) della mano canonica."""
+    maschere, n_jolly = firma
+    maschera = 0
+    doppie = 0
+    for k, (m, d) in enumerate(maschere):
+        maschera |= m << (k * N_VALORI)
+        doppie |= d << (k * N_VALORI)
+    return maschera | maschera_jolly(n_jolly), doppie
+
+
+def _a_semi_reali(maschera, permutazione):
+    """Riporta una maschera canonica sui semi reali."""
+    reale = 0
+    for k, s in enumerate(permutazione):
+        reale |= ((maschera >> (k * N_VALORI)) & MASCHERA_SEME) << (s * N_VALORI)
+    return reale
+
+
+def analizza_apertura(mano, cache=None, traccia=None, **opzioni):
+    """
+    Equivale a scegli_apertura(genera_combinazioni(mano), mano), con il
+    risultato memorizzato per firma canonica: mani uguali a meno di ordine
+    e semi condividono la stessa voce. Tra aperture equivalenti viene
+    restituita quella trovata sulla mano canonica.
+    Con una traccia (src.traccia.Traccia) registra tempi di firma,
+    generazione, risoluzione e ricostruzione, candidati, nodi e hit.
+    Senza opzioni, le mani che mancano dalla cache si cercano prima nella
+    tabella su disco di src.aperture, se c'è e la sua quota di hit misurata
+    la ripaga (aperture.tabella_aperture), e poi si risolvono.
+    """
+    if traccia is not None:
+        t = time.perf_counter()
+    cache = CACHE if cache is None else cache
+    firma, permutazione, jolly = firma_mano(mano)
+    chiave = ("apertura", firma, tuple(sorted(opzioni.items())))
+
+    canonico = cache.get(chiave)
+    if traccia is not None:
+        t = traccia.segna("firma", t)
+        traccia.conta("cache_apertura_hit" if canonico is not None else "cache_apertura_miss")
+    if canonico is None and not opzioni:
+        tabella = tabella_aperture()
+        if tabella is not None:
+            canonico = tabella.cerca(*maschera_canonica(firma))
+            if traccia is not None:
+                t = traccia.segna("tabella_aperture", t)
+                traccia.conta("tabella_aperture_hit" if canonico is not None else "tabella_aperture_miss")
+            if canonico is not None:
+                cache.put(chiave, canonico)
+    if canonico is None:
+        maschera, doppie = maschera_canonica(firma)
+        combinazioni = list(itera_combinazioni_maschera(maschera, **opzioni))
+        if traccia is not None:
+            t = traccia.segna("combinazioni", t)
+            traccia.conta("candidati", len(combinazioni))
+        canonico = scegli_apertura_maschera(combinazioni, maschera, doppie)
+        if traccia is not None:
+            t = traccia.segna("apertura", t)
+            traccia.unisci(canonico["statistiche"], "apertura_")
+        cache.put(chiave, canonico)
+
+    if not canonico["puo_aprire"]:
+        return {
+            "puo_aprire": False,
+            "combinazioni": [],
+            "punti": 0,
+            "carte_rimaste": list(mano),
+            "statistiche": canonico["statistiche"]
+        }
+
+    combinazioni = []
+    usate = usate_due = 0
+    jolly_usati = 0
+    for c in canonico["combinazioni"]:
+        reale = dict(c, maschera=_a_semi_reali(c["maschera"], permutazione))
+        usate_due |= usate & reale["maschera"]
+        usate |= reale["maschera"]
+        combinazioni.append({
+            "tipo": c["tipo"],
+            "carte": combinazione_a_carte(reale, jolly[jolly_usati:]),
+            "punti": c["punti"]
+        })
+        jolly_usati += c["jolly"]
+
+    carte_rimaste = []
+    for c in mano:
+        if c[0] == "JOLLY":
+            if c not in jolly[:jolly_usati]:
+                carte_rimaste.append(c)
+            continue
+        b = 1 << bit_carta(c)
+        if usate_due & b:
+            usate_due ^= b
+        elif usate & b:
+            usate ^= b
+        else:
+            carte_rimaste.append(c)
+
+    if traccia is not None:
+        traccia.segna("ricostruzione", t)
+    return {
+        "puo_aprire": True,
+        "combinazioni": combinazioni,
+        "punti": canonico["punti"],
+        "carte_rimaste": carte_rimaste,
+        "statistiche": canonico["statistiche"]
+    }
+
+
+def suggerisci_scarto(carte_rimaste, combinazioni_possibili=None, carte_giocate=None, fase="centrale", cache=None,
+                      tracciatore=None, traccia=None, tavolo=None, spiega=True):
+    """
+    Equivale a logic_log.suggerisci_scarto, con le valutazioni per carta
+    memorizzate per firma canonica. Ordine della mano, spareggi e
+    intestazioni del log sono ricostruiti sulle carte reali. Con un
+    tracciatore si memorizzano solo le caratteristiche delle carte
+    (src.punteggi) e il rischio, che dipende dai semi, si aggiunge sulle
+    carte reali; con un tavolo nulla passa dalla cache.
+    Con una traccia registra il tempo di "scarto" e gli hit della cache.
+    Con spiega=False il log è None, come in logic_log.
+    """
+    if traccia is not None:
+        t = time.perf_counter()
+    if not carte_rimaste or tavolo is not None:
+        risultato = logic_log.suggerisci_scarto(carte_rimaste, carte_giocate=carte_giocate, fase=fase,
+                                                tracciatore=tracciatore, tavolo=tavolo, spiega=spiega)
+        if traccia is not None:
+            traccia.segna("scarto", t)
+        return risultato
+
+    cache = CACHE if cache is None else cache
+    firma, permutazione, _ = firma_mano(carte_rimaste)
+    inversa = {SEMI[s]: SEMI[k] for k, s in enumerate(permutazione)}
+
+    def canonica(carta):
+        return JOLLY if carta[0] == "JOLLY" else (carta[0], inversa[carta[1]])
+
+    carte = [c for c in carte_rimaste if c[0] != "JOLLY"] or list(carte_rimaste)
+    if tracciatore is not None:
+        risultato = _scarto_con_tracciatore(carte, firma, canonica, fase, cache, tracciatore, traccia, spiega)
+        if traccia is not None:
+            traccia.segna("scarto", t)
+        return risultato
+
+    # logic_log usa solo i valori delle carte giocate
+    giocate = tuple(sorted(Counter(v for v, _ in carte_giocate or []).items()))
+    chiave = ("scarto", firma, fase, giocate)
+
+    per_carta = cache.get(chiave)
+    if traccia is not None:
+        traccia.conta("cache_scarto_hit" if per_carta is not None else "cache_scarto_miss")
+    if per_carta is None:
+        maschera, doppie = maschera_canonica(firma)
+        mano_canonica = maschera_a_carte(maschera, doppie=doppie)
+        per_carta = {
+            carta: (score, spiegazione)
+            for carta, score, spiegazione in logic_log.valuta_carte(mano_canonica, carte_giocate, fase)
+        }
+        cache.put(chiave, per_carta)
+
+    valutazioni = []
+    for carta in carte:
+        score, spiegazione = per_carta[canonica(carta)]
+        valutazioni.append((carta, score, spiegazione.con_carta(carta) if spiega else None))
+    if spiega:
+        risultato = logic_log.componi_scarto(valutazioni)
+    else:
+        risultato = punteggi.scegli(carte, [score for _, score, _ in valutazioni], massimo=True), None
+    if traccia is not None:
+        traccia.segna("scarto", t)
+    return risultato
+
+
+def _scarto_con_tracciatore(carte, firma, canonica, fase, cache, tracciatore, traccia, spiega):
+    """Scarto col rischio del tracciatore, sulle caratteristiche memorizzate per firma."""
+    chiave = ("caratteristiche", firma)
+    per_carta = cache.get(chiave)
+    if traccia is not None:
+        traccia.conta("cache_scarto_hit" if per_carta is not None else "cache_scarto_miss")
+    if per_carta is None:
+        maschera, doppie = maschera_canonica(firma)
+        mano_canonica = [c for c in maschera_a_carte(maschera, doppie=doppie) if c[0] != "JOLLY"] or [JOLLY]
+        righe = punteggi.estrai(mano_canonica)
+        n = punteggi.N_CARATTERISTICHE
+        per_carta = {carta: righe[i * n:(i + 1) * n].tobytes() for i, carta in enumerate(mano_canonica)}
+        cache.put(chiave, per_carta)
+
+    righe = array("b", b"".join(per_carta[canonica(c)] for c in carte))
+    valutazioni = logic_log.valuta_righe(carte, righe, fase, tracciatore, spiega=spiega)
+    if spiega:
+        return logic_log.componi_scarto(valutazioni)
+    return punteggi.scegli(carte, [score for _, score, _ in valutazioni], massimo=True), None
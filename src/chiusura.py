@@ -0,0 +1,306 @@
+# chiusura.py – Pianificatore della chiusura: quali carte pescare per chiudere prima
+#
+#   python -m src.chiusura "7♥ 8♥ 9♥ ..." [--tavolo "5♣ 6♣ 7♣"] [--aperto]
+#
+# Per chiudere si calano (o si attaccano) tutte le carte tranne lo scarto
+# finale. Ogni turno si pesca una carta e se ne scarta una: se per chiudere
+# servono k carte pescate, le carte della mano che finiscono negli scarti
+# sono esattamente k. Il piano è quindi un insieme di carte da pescare più
+# una copertura della mano risultante che lascia fuori k carte.
+#
+# La ricerca è un A* sugli insiemi di carte aggiunte: il costo di una carta
+# è l'attesa in turni per pescarla (carte ignote / sue copie ignote), gli
+# stati sono le mani compatte (maschera, doppie, jolly) e una tabella delle
+# trasposizioni scarta gli ordini diversi dello stesso insieme.
+
+import heapq
+from collections import Counter
+from math import ceil
+
+from src.core import N_VALORI, N_CARTE
+from src.logic import tris_del_valore, scale_del_seme
+from src.state import JOLLY_ID
+from src.tavolo import Tavolo
+from src.avversario import COMPAGNE, Tracciatore
+
+MAX_AGGIUNTE = 4
+MAX_NODI = 2000
+SOGLIA_APERTURA = 40
+
+# Maschera delle compagne di ogni carta (stesso valore, vicine di scala fino a due)
+MASCHERA_COMPAGNE = [sum(1 << compagna for compagna, _ in COMPAGNE[c]) for c in range(N_CARTE)]
+
+
+def _togli(maschera, doppie, carte):
+    """Toglie una copia di ogni carta di `carte` dalla mano (maschera, doppie)."""
+    return maschera & ~(carte & ~doppie), doppie & ~carte
+
+
+def _aggiungi(maschera, doppie, c):
+    b = 1 << c
+    return maschera | b, doppie | (maschera & b)
+
+
+def _maschera_a_carte(maschera, jolly=0):
+    carte = []
+    while maschera:
+        basso = maschera & -maschera
+        carte.append(basso.bit_length() - 1)
+        maschera ^= basso
+    return carte + [JOLLY_ID] * jolly
+
+
+class _Copertura:
+    """
+    Verifica se una mano si cala tutta lasciando fuori esattamente
+    `scarti` carte, con almeno `soglia` punti calati. Si prende sempre la carta più
+    bassa e la si scarta, la si attacca al tavolo o la si cala in una
+    combinazione che la contiene; i sottoproblemi sono memorizzati.
+    """
+
+    __slots__ = ("soglia", "memo", "nodi")
+
+    def __init__(self, soglia):
+        self.soglia = soglia
+        self.memo = {}
+        self.nodi = 0
+
+    def risolvi(self, maschera, doppie, jolly, scarti, attacchi, spazio=False):
+        """
+        (punti, passi) della copertura migliore, o None. I passi sono
+        ("scarto", c), ("attacco", c) o ("combinazione", maschera, jolly); i
+        jolly in più attaccati a una combinazione sono ("attacco", JOLLY_ID).
+        Arrivati alla soglia ci si ferma: i punti sono allora un minimo.
+        """
+        chiave = (maschera, doppie, jolly, scarti, attacchi, spazio)
+        if chiave in self.memo:
+            return self.memo[chiave]
+        self.nodi += 1
+        if not maschera:
+            # Gli scarti rimasti sono jolly, gli altri jolly vanno in una combinazione con posto
+            if scarti <= jolly and (spazio or scarti == jolly):
+                risultato = (0, (("scarto", JOLLY_ID),) * scarti + (("attacco", JOLLY_ID),) * (jolly - scarti))
+            else:
+                risultato = None
+            self.memo[chiave] = risultato
+            return risultato
+
+        basso = maschera & -maschera
+        c = basso.bit_length() - 1
+        migliore = None
+
+        def prova(sotto, punti, passo):
+            nonlocal migliore
+            if sotto is not None and (migliore is None or sotto[0] + punti > migliore[0]):
+                migliore = (sotto[0] + punti, (passo,) + sotto[1])
+            return migliore is not None and migliore[0] >= self.soglia
+
+        resto = _togli(maschera, doppie, basso)
+        if attacchi & basso:
+            if prova(self.risolvi(*resto, jolly, scarti, attacchi & ~basso, True), 0, ("attacco", c)):
+                return self._salva(chiave, migliore)
+        seme, valore = divmod(c, N_VALORI)
+        for combo in (*scale_del_seme(maschera, seme, jolly), *tris_del_valore(maschera, valore, jolly)):
+            if not combo["maschera"] & basso:
+                continue
+            con_posto = spazio or combo["tipo"] == "scala" or combo["lunghezza"] < 4
+            sotto = self.risolvi(*_togli(maschera, doppie, combo["maschera"]), jolly - combo["jolly"],
+                                 scarti, attacchi, con_posto)
+            if prova(sotto, combo["punti"], ("combinazione", combo["maschera"], combo["jolly"])):
+                return self._salva(chiave, migliore)
+        if scarti:
+            prova(self.risolvi(*resto, jolly, scarti - 1, attacchi, spazio), 0, ("scarto", c))
+        return self._salva(chiave, migliore)
+
+    def _salva(self, chiave, risultato):
+        self.memo[chiave] = risultato
+        return risultato
+
+
+def _isolate(maschera, doppie, attacchi):
+    """Copie di carte senza compagne in mano (stesso valore o vicine di scala) né attaccabili."""
+    isolate = 0
+    naturali = maschera & ~attacchi
+    while naturali:
+        basso = naturali & -naturali
+        if not maschera & MASCHERA_COMPAGNE[basso.bit_length() - 1]:
+            isolate += 2 if doppie & basso else 1
+        naturali ^= basso
+    return isolate
+
+
+def _isolate_con(maschera, doppie, isolate, c, attacchi):
+    """_isolate dopo l'aggiunta della carta naturale c, da quello prima."""
+    vicine = maschera & MASCHERA_COMPAGNE[c] & ~attacchi
+    while vicine:
+        basso = vicine & -vicine
+        if not maschera & MASCHERA_COMPAGNE[basso.bit_length() - 1]:
+            isolate -= 2 if doppie & basso else 1
+        vicine ^= basso
+    if not (attacchi >> c & 1 or maschera & MASCHERA_COMPAGNE[c]):
+        isolate += 1
+    return isolate
+
+
+def carte_mancanti_minime(isolate, jolly, aggiunte):
+    """
+    Minimo di altre carte da pescare, ammissibile per l'A*. Una carta
+    isolata o finisce negli scarti (che sono tanti quante le carte
+    pescate) o in una combinazione con almeno una carta vicina ancora da
+    pescare o un jolly, e due isolate non condividono la stessa vicina.
+    """
+    return max(0, ceil((isolate - aggiunte - jolly) / 2))
+
+
+def pianifica_chiusura(mano, tavolo=(), aperto=False, tracciatore=None,
+                       max_aggiunte=MAX_AGGIUNTE, max_nodi=MAX_NODI):
+    """
+    Piano più rapido per chiudere con la mano data (interi di src.state).
+
+    tavolo sono le combinazioni calate (src.tavolo.Tavolo o lista); se
+    aperto le carte possono attaccarsi a quelle, altrimenti la chiusura
+    deve valere almeno SOGLIA_APERTURA punti. tracciatore
+    (src.avversario.Tracciatore) dà le copie ancora ignote di ogni carta;
+    senza, si considerano viste solo la mano e il tavolo.
+
+    Restituisce un dict con 'chiudibile', le carte da pescare ('aggiunte'),
+    quelle della mano risultante da scartare ('scarti'), 'combinazioni' e
+    'attacchi' della chiusura, 'turni_attesi' (somma delle attese delle
+    carte da pescare, 1 se basta il prossimo turno) e 'statistiche'.
+    """
+    if tracciatore is None:
+        tracciatore = Tracciatore()
+        for c in mano:
+            tracciatore.vista(c)
+        for combo in tavolo:
+            for c in combo["carte"]:
+                tracciatore.vista(c)
+
+    maschera = doppie = 0
+    jolly = 0
+    for c in mano:
+        if c == JOLLY_ID:
+            jolly += 1
+        else:
+            maschera, doppie = _aggiungi(maschera, doppie, c)
+
+    attacchi = 0
+    if aperto:
+        for c in (tavolo if isinstance(tavolo, Tavolo) else Tavolo(tavolo)).attacchi:
+            attacchi |= 1 << c
+    copertura = _Copertura(0 if aperto else SOGLIA_APERTURA)
+    ignote = tracciatore.ignote
+    totale = max(tracciatore.n_ignote, 1)
+    attesa_minima = totale / max(ignote) if max(ignote) else float("inf")
+
+    def attesa(c, aggiunte):
+        disponibili = ignote[c] - aggiunte[c]
+        return totale / disponibili if disponibili > 0 else None
+
+    def candidate(maschera):
+        """Carte utili da pescare: compagne di carte in mano, attaccabili e jolly."""
+        utili = attacchi
+        naturali = maschera
+        while naturali:
+            basso = naturali & -naturali
+            utili |= MASCHERA_COMPAGNE[basso.bit_length() - 1]
+            naturali ^= basso
+        return _maschera_a_carte(utili) + [JOLLY_ID]
+
+    inizio = (maschera, doppie, jolly)
+    isolate = _isolate(maschera, doppie, attacchi)
+    contatore = 0
+    h = carte_mancanti_minime(isolate, jolly, 0) * attesa_minima
+    frontiera = [(h, 0.0, contatore, inizio, isolate, ())]
+    migliori = {inizio: 0.0}
+    nodi = trasposizioni = 0
+    soluzione = None
+
+    while frontiera and nodi < max_nodi:
+        _, g, _, stato, isolate, aggiunte = heapq.heappop(frontiera)
+        if g > migliori.get(stato, float("inf")):
+            continue
+        nodi += 1
+        m, d, j = stato
+        copertura_stato = copertura.risolvi(m, d, j, len(aggiunte), attacchi)
+        if copertura_stato is not None and copertura_stato[0] >= copertura.soglia:
+            soluzione = (g, aggiunte, copertura_stato[1])
+            break
+        if len(aggiunte) >= max_aggiunte:
+            continue
+        contate = Counter(aggiunte)
+        for c in candidate(m):
+            costo = attesa(c, contate)
+            if costo is None:
+                continue
+            if c == JOLLY_ID:
+                figlio = (m, d, j + 1)
+            elif d >> c & 1:
+                continue  # già due copie in mano
+            else:
+                figlio = (*_aggiungi(m, d, c), j)
+            g_figlio = g + costo
+            if g_figlio >= migliori.get(figlio, float("inf")):
+                trasposizioni += 1
+                continue
+            migliori[figlio] = g_figlio
+            isolate_figlio = isolate if c == JOLLY_ID else _isolate_con(m, d, isolate, c, attacchi)
+            mancanti = carte_mancanti_minime(isolate_figlio, figlio[2], len(aggiunte) + 1)
+            if len(aggiunte) + 1 + mancanti > max_aggiunte:
+                continue
+            contatore += 1
+            heapq.heappush(frontiera, (g_figlio + mancanti * attesa_minima, g_figlio, contatore,
+                                       figlio, isolate_figlio, tuple(sorted(aggiunte + (c,)))))
+
+    statistiche = {"nodi": nodi, "trasposizioni": trasposizioni, "coperture": copertura.nodi}
+    if soluzione is None:
+        return {"chiudibile": False, "aggiunte": [], "scarti": [], "combinazioni": [], "attacchi": [],
+                "turni_attesi": None, "statistiche": statistiche}
+
+    g, aggiunte, passi = soluzione
+    combinazioni = [_maschera_a_carte(p[1], p[2]) for p in passi if p[0] == "combinazione"]
+    return {
+        "chiudibile": True,
+        "aggiunte": list(aggiunte),
+        "scarti": [p[1] for p in passi if p[0] == "scarto"],
+        "combinazioni": combinazioni,
+        "attacchi": [p[1] for p in passi if p[0] == "attacco"],
+        "turni_attesi": round(g, 2) if aggiunte else 1.0,
+        "statistiche": statistiche,
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    from src.core import carte_da_testo
+    from src.state import carta_a_tupla, combinazione_da_tuple, tupla_a_carta
+
+    parser = argparse.ArgumentParser(description="Carte da pescare per chiudere prima possibile")
+    parser.add_argument("mano", help='mano nel formato "7♥ 8♥ 9♥ JOLLY ..."')
+    parser.add_argument("--tavolo", action="append", default=[], help="combinazione calata (ripetibile)")
+    parser.add_argument("--aperto", action="store_true", help="il giocatore ha già aperto")
+    parser.add_argument("--max-aggiunte", type=int, default=MAX_AGGIUNTE)
+    args = parser.parse_args(argv)
+
+    mano = [tupla_a_carta(c) for c in carte_da_testo(args.mano)]
+    tavolo = [combinazione_da_tuple(carte_da_testo(t)) for t in args.tavolo]
+    piano = pianifica_chiusura(mano, tavolo, args.aperto, max_aggiunte=args.max_aggiunte)
+
+    def testo(carte):
+        return " ".join("JOLLY" if c == JOLLY_ID else "".join(carta_a_tupla(c)) for c in carte)
+
+    if not piano["chiudibile"]:
+        print(f"Nessuna chiusura entro {args.max_aggiunte} carte pescate")
+    else:
+        print(f"Pescare: {testo(piano['aggiunte']) or '-'} (attesa {piano['turni_attesi']} turni)")
+        for combo in piano["combinazioni"]:
+            print(f"  cala {testo(combo)}")
+        if piano["attacchi"]:
+            print(f"  attacca {testo(piano['attacchi'])}")
+        print(f"  scarta {testo(piano['scarti']) or '-'}")
+    print(piano["statistiche"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# cli.py – Analisi in blocco di mani registrate, senza interfaccia grafica
+#
+#   python -m src.cli [mani.jsonl | -] [--output risultati.jsonl] [--workers 4]
+#
+# Ogni riga di input è una mano, in JSON oppure nel formato compatto
+# "7♥ 8♥ 9♥ JOLLY ...". In JSON la mano è una stringa in quel formato o una
+# lista di carte ("7♥" oppure ["7", "♥"]), con campi facoltativi "id",
+# "fase" e "giocate". L'output è una riga JSON per mano, nello stesso ordine.
+# Come nel mazzo di src.state, una mano ha al più MAX_CARTE carte, due
+# copie di ogni carta e quattro jolly.
+
+import json
+import sys
+import time
+from collections import Counter, deque
+from itertools import islice
+
+from src.core import carte_da_testo
+from src.cache import analizza_apertura, suggerisci_scarto
+from src.state import CARTE_IN_MANO, N_JOLLY, N_MAZZI
+from src.traccia import Traccia, aggiungi_opzioni_profilo, profila
+
+FASI = ("inizio", "centrale", "finale")
+DIMENSIONE_BLOCCO = 64
+# Blocchi in volo per worker: limita la memoria quando l'input è più
+# veloce dell'analisi
+BLOCCHI_PER_WORKER = 4
+# Le carte date più quella pescata
+MAX_CARTE = CARTE_IN_MANO + 1
+
+
+def leggi_carte(valore, massimo=MAX_CARTE):
+    """
+    Carte da una stringa "7♥ 8♥ JOLLY" o da una lista di carte ("7♥"
+    oppure ["7", "♥"]); lo usa anche src.servizio. Solleva ValueError per
+    tipi o carte non validi, più di `massimo` carte (None: nessun limite),
+    più di N_MAZZI copie di una carta o più di N_JOLLY jolly.
+    """
+    if isinstance(valore, (list, tuple)):
+        testi = []
+        for carta in valore:
+            if isinstance(carta, (list, tuple)) and len(carta) == 2 and all(isinstance(x, str) for x in carta):
+                carta = "".join(carta)
+            if not isinstance(carta, str):
+                raise ValueError(f"Carta non valida: {carta!r}")
+            testi.append(carta)
+        valore = " ".join(testi)
+    elif not isinstance(valore, str):
+        raise ValueError("Le carte devono essere una stringa o una lista")
+    carte = carte_da_testo(valore)
+    if massimo is not None and len(carte) > massimo:
+        raise ValueError(f"Troppe carte: {len(carte)}, al più {massimo}")
+    copie = Counter(c for c in carte if c[0] != "JOLLY")
+    if len(carte) - sum(copie.values()) > N_JOLLY:
+        raise ValueError(f"Più di {N_JOLLY} jolly")
+    for (v, s), n in copie.items():
+        if n > N_MAZZI:
+            raise ValueError(f"{v}{s} compare {n} volte, al più {N_MAZZI}")
+    return carte
+
+
+def leggi_riga(riga, numero):
+    """
+    Riga di input -> dict {'id', 'mano', 'fase', 'giocate'}.
+    Solleva ValueError se la riga non è valida.
+    """
+    riga = riga.strip()
+    if riga.startswith("{"):
+        try:
+            dati = json.loads(riga)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON non valido: {e}") from None
+        if "mano" not in dati:
+            raise ValueError("Campo 'mano' mancante")
+        voce = {
+            "id": dati.get("id", numero),
+            "mano": leggi_carte(dati["mano"]),
+            "fase": dati.get("fase", "centrale"),
+            "giocate": [c for c in leggi_carte(dati.get("giocate", []), massimo=None) if c[0] != "JOLLY"],
+        }
+    else:
+        voce = {"id": numero, "mano": leggi_carte(riga), "fase": "centrale", "giocate": []}
+    if voce["fase"] not in FASI:
+        raise ValueError(f"Fase sconosciuta: {voce['fase']}")
+    if not voce["mano"]:
+        raise ValueError("Mano vuota")
+    return voce
+
+
+def _testo(carta):
+    return "JOLLY" if carta[0] == "JOLLY" else f"{carta[0]}{carta[1]}"
+
+
+def analizza_riga(numero, riga, log=False, traccia=False):
+    """
+    Analizza una riga e restituisce il dict di output (con 'errore' se non
+    valida); con traccia=True aggiunge tempi e contatori dell'analisi.
+    """
+    try:
+        voce = leggi_riga(riga, numero)
+    except ValueError as e:
+        return {"id": numero, "errore": str(e)}
+    t = Traccia() if traccia else None
+    apertura = analizza_apertura(voce["mano"], traccia=t)
+    scarto, righe_log = suggerisci_scarto(apertura["carte_rimaste"], carte_giocate=voce["giocate"],
+                                          fase=voce["fase"], traccia=t, spiega=log)
+    risultato = {
+        "id": voce["id"],
+        "puo_aprire": apertura["puo_aprire"],
+        "punti": apertura["punti"],
+        "combinazioni": [[_testo(c) for c in comb["carte"]] for comb in apertura["combinazioni"]],
+        "carte_rimaste": [_testo(c) for c in apertura["carte_rimaste"]],
+        "scarto": _testo(scarto) if scarto is not None else None,
+    }
+    if log:
+        risultato["log"] = list(righe_log)
+    if t is not None:
+        risultato["traccia"] = t.come_dict()
+    return risultato
+
+
+def analizza_blocco(blocco, log=False, traccia=False):
+    """Analizza un blocco di (numero, riga); restituisce coppie (riga JSON di output, valida)."""
+    risultati = []
+    for numero, riga in blocco:
+        risultato = analizza_riga(numero, riga, log, traccia)
+        risultati.append((json.dumps(risultato, ensure_ascii=False), "errore" not in risultato))
+    return risultati
+
+
+def righe_numerate(sorgente):
+    """(numero, riga) per ogni riga non vuota, numerate da 1 come nel file."""
+    for numero, riga in enumerate(sorgente, 1):
+        if riga.strip():
+            yield numero, riga
+
+
+def blocchi(righe, dimensione=DIMENSIONE_BLOCCO):
+    righe = iter(righe)
+    while True:
+        blocco = list(islice(righe, dimensione))
+        if not blocco:
+            return
+        yield blocco
+
+
+def elabora(sorgente, workers=0, log=False, dimensione_blocco=DIMENSIONE_BLOCCO, traccia=False):
+    """
+    Generatore di coppie (riga JSON di output, valida) nell'ordine dell'input. Con
+    workers > 0 i blocchi vanno a un ProcessPoolExecutor, con al più
+    workers × BLOCCHI_PER_WORKER blocchi in volo.
+    """
+    sorgente_blocchi = blocchi(righe_numerate(sorgente), dimensione_blocco)
+    if not workers:
+        for blocco in sorgente_blocchi:
+            yield from analizza_blocco(blocco, log, traccia)
+        return
+
+    # Importato qui: multiprocessing da solo raddoppia il tempo di avvio
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_volo = deque()
+        for blocco in sorgente_blocchi:
+            in_volo.append(pool.submit(analizza_blocco, blocco, log, traccia))
+            if len(in_volo) >= workers * BLOCCHI_PER_WORKER:
+                yield from in_volo.popleft().result()
+        while in_volo:
+            yield from in_volo.popleft().result()
+
+
+def esegui(args):
+    """Esegue l'analisi con gli argomenti già letti da main()."""
+    try:
+        ingresso = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+        try:
+            uscita = sys.stdout if args.output is None else open(args.output, "w", encoding="utf-8")
+        except OSError:
+            if ingresso is not sys.stdin:
+                ingresso.close()
+            raise
+    except OSError as e:
+        # Come un argomento non valido per argparse: messaggio e codice 2
+        print(f"⚠️ {e.filename}: {e.strerror}", file=sys.stderr)
+        return 2
+    mani = errori = 0
+    inizio = time.perf_counter()
+    try:
+        for riga, valida in elabora(ingresso, args.workers, args.log, args.blocco, args.traccia):
+            uscita.write(riga + "\n")
+            mani += 1
+            errori += not valida
+    finally:
+        if ingresso is not sys.stdin:
+            ingresso.close()
+        if uscita is not sys.stdout:
+            uscita.close()
+        else:
+            uscita.flush()
+
+    durata = time.perf_counter() - inizio
+    velocita = mani / durata if durata else 0.0
+    print(f"📊 {mani} mani ({errori} non valide) in {durata:.2f} s, {velocita:.0f} mani/s",
+          file=sys.stderr)
+    return 1 if errori else 0
+
+
+def main(argv=None):
+    import argparse  # solo per la riga di comando, non per chi usa elabora()
+
+    parser = argparse.ArgumentParser(description="Apertura e scarto per mani in JSONL o testo")
+    parser.add_argument("input", nargs="?", default="-", help="file di mani, '-' per stdin")
+    parser.add_argument("--output", default=None, help="file JSONL dei risultati (default stdout)")
+    parser.add_argument("--workers", type=int, default=0, help="processi di analisi (0 = nessun pool)")
+    parser.add_argument("--blocco", type=int, default=DIMENSIONE_BLOCCO, help="mani per blocco")
+    parser.add_argument("--log", action="store_true", help="include la spiegazione dello scarto")
+    parser.add_argument("--traccia", action="store_true", help="include tempi e contatori per mano")
+    aggiungi_opzioni_profilo(parser)
+    args = parser.parse_args(argv)
+    if args.profilo:
+        # Il profilatore vede solo questo processo: niente pool
+        args.workers = 0
+        return profila(esegui, args, modalita=args.profilo, output=args.profilo_output)
+    return esegui(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,4 +11,168 @@ def tutte_le_carte():
     return carte
 
 # Jolly rappresentato come valore "JOLLY" e seme None
-JOLLY = ("JOLLY", None)
\ No newline at end of file
+JOLLY = ("JOLLY", None)
+
+# Forme testuali accettate per il jolly in carte_da_testo
+TESTI_JOLLY = ("JOLLY", "★", "*")
+
+def carte_da_testo(testo, rigoroso=True):
+    """
+    Legge carte nel formato compatto "7♥ 8♥ 9♥ JOLLY": valore seguito dal
+    seme, separate da spazi. I jolly diventano ("JOLLY", "J0"), ("JOLLY",
+    "J1"), ... Con rigoroso=False i token non validi sono ignorati,
+    altrimenti sollevano ValueError.
+    """
+    carte = []
+    k = 0
+    for token in testo.split():
+        if token.upper() in TESTI_JOLLY:
+            carte.append(("JOLLY", f"J{k}"))
+            k += 1
+        elif len(token) >= 2 and token[:-1] in VALORI and token[-1] in SEMI:
+            carte.append((token[:-1], token[-1]))
+        elif rigoroso:
+            raise ValueError(f"Carta non valida: {token!r}")
+    return carte
+
+# === Codifica compatta a bit ===
+# Ogni carta naturale occupa il bit seme * 13 + valore (0..51); i jolly sono
+# contati in unario nei bit 52..55. Una mano o una combinazione diventa così
+# un intero: la disgiunzione è un AND, i punti sono lookup su tabelle.
+
+INDICE_VALORE = {v: i for i, v in enumerate(VALORI)}
+INDICE_SEME = {s: i for i, s in enumerate(SEMI)}
+PUNTI_VALORE = [11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10]
+
+N_VALORI = len(VALORI)
+N_CARTE = len(SEMI) * N_VALORI
+BIT_JOLLY = N_CARTE
+MAX_JOLLY = 4
+
+MASCHERA_SEME = (1 << N_VALORI) - 1
+MASCHERA_CARTE = (1 << N_CARTE) - 1
+MASCHERA_JOLLY = ((1 << MAX_JOLLY) - 1) << BIT_JOLLY
+
+# Tabelle per bit: valore, seme e punti della carta
+VALORE_BIT = [b % N_VALORI for b in range(N_CARTE)]
+SEME_BIT = [b // N_VALORI for b in range(N_CARTE)]
+PUNTI_BIT = [PUNTI_VALORE[v] for v in VALORE_BIT] + [0] * MAX_JOLLY
+
+# Maschera di tutte le carte di un valore (una per seme)
+MASCHERA_VALORE = [
+    sum(1 << (s * N_VALORI + v) for s in range(len(SEMI))) for v in range(N_VALORI)
+]
+
+# Punti per ogni byte della maschera: 7 lookup coprono i 56 bit. Ogni voce
+# è quella senza il bit più basso più i punti di quel bit, così la
+# costruzione costa poco all'import.
+def _tabella_byte(k):
+    punti_bit = [PUNTI_BIT[k * 8 + b] if k * 8 + b < len(PUNTI_BIT) else 0 for b in range(8)]
+    tabella = [0] * 256
+    for x in range(1, 256):
+        basso = x & -x
+        tabella[x] = tabella[x ^ basso] + punti_bit[basso.bit_length() - 1]
+    return tabella
+
+_PUNTI_BYTE = [_tabella_byte(k) for k in range((BIT_JOLLY + MAX_JOLLY + 7) // 8)]
+
+
+def conta_bit(maschera):
+    """Numero di bit a 1 della maschera."""
+    return bin(maschera).count("1")
+
+
+def punti_carta(carta):
+    """Punti di una singola carta (il jolly vale 0)."""
+    valore = carta[0]
+    if valore == "JOLLY":
+        return 0
+    return PUNTI_VALORE[INDICE_VALORE[valore]]
+
+
+def punti_maschera(maschera):
+    """Somma dei punti delle carte della maschera tramite tabelle per byte."""
+    punti = 0
+    for tabella in _PUNTI_BYTE:
+        if not maschera:
+            break
+        punti += tabella[maschera & 0xFF]
+        maschera >>= 8
+    return punti
+
+
+def bit_carta(carta):
+    """Indice del bit di una carta naturale."""
+    valore, seme = carta
+    return INDICE_SEME[seme] * N_VALORI + INDICE_VALORE[valore]
+
+
+def maschera_jolly(n):
+    """Maschera unaria con n jolly."""
+    return ((1 << n) - 1) << BIT_JOLLY
+
+
+def jolly_in_maschera(maschera):
+    """Numero di jolly contenuti nella maschera."""
+    return conta_bit(maschera & MASCHERA_JOLLY)
+
+
+def maschera_seme(maschera, seme):
+    """Maschera a 13 bit dei valori presenti nel seme (indice) dato."""
+    return (maschera >> (seme * N_VALORI)) & MASCHERA_SEME
+
+
+def carte_a_maschera(carte):
+    """
+    Converte una lista di tuple (valore, seme) in maschera.
+    I jolly vengono contati; restituisce (maschera, lista_jolly) dove
+    lista_jolly conserva le tuple originali dei jolly nell'ordine incontrato.
+    """
+    maschera = 0
+    jolly = []
+    for carta in carte:
+        if carta[0] == "JOLLY":
+            jolly.append(carta)
+        else:
+            maschera |= 1 << bit_carta(carta)
+    return maschera | maschera_jolly(len(jolly)), jolly
+
+
+def carte_a_maschere(carte):
+    """
+    Come carte_a_maschera per mani con doppioni (due mazzi): restituisce
+    (maschera, doppie, lista_jolly) dove doppie ha a 1 i bit delle carte
+    presenti in due copie.
+    """
+    maschera = 0
+    doppie = 0
+    jolly = []
+    for carta in carte:
+        if carta[0] == "JOLLY":
+            jolly.append(carta)
+        else:
+            b = 1 << bit_carta(carta)
+            doppie |= maschera & b
+            maschera |= b
+    return maschera | maschera_jolly(len(jolly)), doppie, jolly
+
+
+def maschera_a_carte(maschera, jolly=None, doppie=0):
+    """
+    Converte una maschera in lista di tuple (valore, seme), ordinate per seme
+    e valore; le carte in `doppie` compaiono due volte. I jolly in coda
+    usano le tuple di `jolly` (se fornite) oppure JOLLY.
+    """
+    carte = []
+    naturali = maschera & MASCHERA_CARTE
+    while naturali:
+        basso = naturali & -naturali
+        b = basso.bit_length() - 1
+        carta = (VALORI[VALORE_BIT[b]], SEMI[SEME_BIT[b]])
+        carte.append(carta)
+        if doppie & basso:
+            carte.append(carta)
+        naturali ^= basso
+    for i in range(jolly_in_maschera(maschera)):
+        carte.append(jolly[i] if jolly and i < len(jolly) else JOLLY)
+    return carte
@@ -2,18 +2,20 @@
 
 import tkinter as tk
 from tkinter import messagebox
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.core import SEMI, VALORI
-from src.logic import genera_combinazioni, scegli_apertura
-from src.logic_log import suggerisci_scarto
+from src.core import SEMI, VALORI, carte_da_testo
+from src.cache import analizza_apertura, suggerisci_scarto
+from src.avversario import Tracciatore
+from src.traccia import Traccia
+from src.state import N_MAZZI, tupla_a_carta
 from tkinter import ttk
 
-from collections import defaultdict
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
 
 MAX_CARTE = 13
+POLLING_MS = 30
+ATTESA_ANALISI_MS = 150
 CARD_WIDTH = 60
 CARD_HEIGHT = 85
 
@@ -57,6 +59,40 @@ def tutte_le_carte_ordinate_con_jolly():
         righe.append((carte, colore, seme))
     return righe
 
+def analizza_mano(mano, fase, tracciatore, annullata=lambda: False, profilo=False):
+    """
+    Apertura e scarto per la mano; gira nel thread di analisi. Restituisce
+    None se la richiesta è stata annullata tra un passo e l'altro. Con
+    profilo=True l'ultimo elemento è la Traccia dell'analisi, altrimenti None.
+    """
+    traccia = Traccia() if profilo else None
+    apertura = analizza_apertura(mano, traccia=traccia)
+    if annullata():
+        return None
+    scarto, log = suggerisci_scarto(apertura["carte_rimaste"], fase=fase, tracciatore=tracciatore,
+                                    traccia=traccia)
+    return apertura, scarto, log, traccia
+
+def componi_messaggio(apertura, scarto, log, traccia=None):
+    msg = ""
+
+    if not apertura["puo_aprire"]:
+        msg += "Non è possibile aprire con la mano attuale."
+
+    else:
+        msg += f"✅ Apertura consigliata ({apertura['punti']} punti):"
+        for c in apertura["combinazioni"]:
+            tipo = "Scala" if c["tipo"] == "scala" else "Tris"
+            descrizione = ", ".join([f"{v}{s}" if v != "JOLLY" else "★" for v, s in c["carte"]])
+            msg += f" - {tipo}: {descrizione}"
+
+    if scarto is not None:
+        msg += f"\n🗑️ Scarto consigliato: {scarto[0]}{scarto[1]}\n\n"
+    msg += "\n".join(log)
+    if traccia is not None:
+        msg += "\n\n" + "\n".join(traccia.righe())
+    return msg
+
 def avvia_gui():
     root = tk.Tk()
     root.title("Scala 40 – Seleziona la tua mano")
@@ -64,7 +100,10 @@ def avvia_gui():
     root.configure(bg=COLOR_BG)
 
     fase_var = tk.StringVar(value="centrale")
-    carte_giocate = []
+    profilo_var = tk.BooleanVar(value=False)
+    # Carte viste (la mano) e scarti dell'avversario: la mano lo aggiorna a
+    # ogni clic, la conferma delle giocate lo ricostruisce
+    tracciatore = Tracciatore()
 
     frame_fase = tk.LabelFrame(root, text="Fase della partita", bg=COLOR_FRAME, fg=COLOR_TEXT,
                                 font=("Segoe UI", 11, "bold"))
@@ -75,6 +114,11 @@ def avvia_gui():
                        bg=COLOR_FRAME, fg=COLOR_TEXT, font=("Segoe UI", 10),
                        activebackground=COLOR_FRAME, activeforeground=COLOR_TEXT, selectcolor=COLOR_BG).pack(side="left", padx=10)
 
+    tk.Checkbutton(frame_fase, text="Mostra profilo", variable=profilo_var,
+                   bg=COLOR_FRAME, fg=COLOR_TEXT, font=("Segoe UI", 10),
+                   activebackground=COLOR_FRAME, activeforeground=COLOR_TEXT, selectcolor=COLOR_BG,
+                   command=lambda: pianifica_analisi()).pack(side="right", padx=10)
+
     frame_giocate = tk.LabelFrame(root, text="Carte giocate dall'avversario", bg=COLOR_FRAME, fg=COLOR_TEXT,
                                   font=("Segoe UI", 11, "bold"))
     frame_giocate.pack(padx=20, pady=5, fill="x")
@@ -83,18 +127,13 @@ def avvia_gui():
     entry_giocate.pack(side="left", padx=10)
 
     def aggiorna_giocate():
-        nonlocal carte_giocate
+        nonlocal tracciatore
         testo = entry_giocate.get()
         try:
-            giocate = testo.strip().split()
-            nuove = []
-            for g in giocate:
-                if len(g) >= 2:
-                    v = g[:-1]
-                    s = g[-1]
-                    if v in VALORI and s in [s for s, _ in SEMI_ALTERNATI]:
-                        nuove.append((v, s))
-            carte_giocate = nuove
+            nuove = [c for c in carte_da_testo(testo, rigoroso=False) if c[0] != "JOLLY"]
+            tracciatore = Tracciatore.da_osservazioni([tupla_a_carta(c) for c in mano],
+                                                      [tupla_a_carta(c) for c in nuove])
+            pianifica_analisi()
             messagebox.showinfo("Aggiornato", "Carte giocate aggiornate correttamente.")
         except Exception as e:
             messagebox.showerror("Errore", f"Formato non valido: {e}")
@@ -114,15 +153,23 @@ def avvia_gui():
                                 font=("Segoe UI", 11, "bold"))
     frame_info.pack(padx=20, pady=5, fill="both")
 
+    progresso = ttk.Progressbar(frame_info, mode="indeterminate")
+    progresso.pack(fill="x", padx=5, pady=(5, 0))
+
     text_info = tk.Text(frame_info, height=10, bg=COLOR_BG, fg=COLOR_TEXT, font=("Segoe UI", 10), wrap="word")
     text_info.pack(fill="both", padx=5, pady=5)
     text_info.config(state="disabled")
 
     righe_info = tutte_le_carte_ordinate_con_jolly()
     mano = []
+    # Ogni carta ha un widget nella sua riga, mostrato o nascosto con grid,
+    # e uno per copia nella mano (si gioca con due mazzi), creati al primo
+    # uso e poi mostrati o nascosti con pack. Le prime copie_in_mano[carta]
+    # voci di carte_mano_map[carta] sono quelle visibili.
     carte_gui_map = {}
+    carte_mano_map = {}
+    copie_in_mano = Counter()
     righe_frame = []
-    righe_carte = []
 
     def aggiorna_info(msg):
         text_info.config(state="normal")
@@ -130,80 +177,101 @@ def avvia_gui():
         text_info.insert(tk.END, msg)
         text_info.config(state="disabled")
 
+    def copie_massime(carta):
+        # I jolly hanno già un widget ciascuno nelle righe
+        return 1 if carta[0] == "JOLLY" else N_MAZZI
+
     def aggiungi_a_mano(carta, widget_gui):
-        if carta in mano:
+        copie = copie_in_mano[carta]
+        if copie >= copie_massime(carta):
             return
         if len(mano) >= MAX_CARTE:
             messagebox.showwarning("Limite raggiunto", f"Puoi selezionare al massimo {MAX_CARTE} carte.")
             return
         mano.append(carta)
-        righe_carte_rimuovi(carta)
-        ridisegna_mano()
-        rigenera_righe()
+        copie_in_mano[carta] = copie + 1
+        tracciatore.vista(tupla_a_carta(carta))
+        if copie + 1 == copie_massime(carta):
+            carte_gui_map[carta].grid_remove()
+        widget_mano = carte_mano_map.setdefault(carta, [])
+        if len(widget_mano) <= copie:
+            widget_mano.append(CartaGUI(frame_mano, carta[0], carta[1], rimuovi_da_mano))
+        widget_mano[copie].pack(side=tk.LEFT, padx=5, pady=5)
+        pianifica_analisi()
 
     def rimuovi_da_mano(carta, widget_gui):
-        if carta in mano:
-            mano.remove(carta)
-            righe_carte_aggiungi(carta)
-            ridisegna_mano()
-            rigenera_righe()
-
-    def righe_carte_rimuovi(carta):
-        for riga in righe_carte:
-            if carta in riga:
-                riga.remove(carta)
-
-    def righe_carte_aggiungi(carta):
-        valore, seme = carta
-        if valore == "JOLLY":
-            riga_index = int(seme.split("-")[0][1])
-            righe_carte[riga_index].append(carta)
-        else:
-            for idx, (_, _, seme_riga) in enumerate(righe_info):
-                if seme == seme_riga:
-                    righe_carte[idx].append(carta)
-
-    def rigenera_righe():
-        for idx, frame in enumerate(righe_frame):
-            for widget in frame.winfo_children():
-                widget.destroy()
-            carte_ordinate = sorted(righe_carte[idx], key=lambda c: (99 if c[0] == "JOLLY" else VALORI.index(c[0])))
-            for valore, seme in carte_ordinate:
-                carta = CartaGUI(frame, valore, seme, aggiungi_a_mano)
-                carta.pack(side=tk.LEFT, padx=3, pady=3)
-                carte_gui_map[(valore, seme)] = carta
-
-    def ridisegna_mano():
-        for widget in frame_mano.winfo_children():
-            widget.destroy()
-        for valore, seme in mano:
-            carta = CartaGUI(frame_mano, valore, seme, lambda c, w=None, v=valore, s=seme: rimuovi_da_mano((v, s), None))
-            carta.pack(side=tk.LEFT, padx=5, pady=5)
+        if not copie_in_mano[carta]:
+            return
+        mano.remove(carta)
+        copie_in_mano[carta] -= 1
+        tracciatore.nascosta(tupla_a_carta(carta))
+        widget_mano = carte_mano_map[carta]
+        widget = widget_gui if widget_gui in widget_mano else widget_mano[copie_in_mano[carta]]
+        widget.pack_forget()
+        # Il widget nascosto va in coda, dopo quelli visibili
+        widget_mano.remove(widget)
+        widget_mano.append(widget)
+        # grid ricorda riga e colonna: la carta torna al suo posto
+        carte_gui_map[carta].grid()
+        pianifica_analisi()
+
+    # === Analisi in background ===
+    # Un solo worker: la cache delle analisi non è condivisa tra thread.
+    # Ogni richiesta ha un id; i risultati di richieste superate (la mano è
+    # cambiata nel frattempo) vengono scartati.
+    esecutore = ThreadPoolExecutor(max_workers=1)
+    analisi = {"id": 0, "futuro": None, "pianificata": None}
+
+    def avvia_analisi():
+        analisi["pianificata"] = None
+        analisi["id"] += 1
+        id_richiesta = analisi["id"]
+        if analisi["futuro"] is not None:
+            analisi["futuro"].cancel()
+        futuro = esecutore.submit(analizza_mano, list(mano), fase_var.get(), tracciatore.copia(),
+                                  lambda: analisi["id"] != id_richiesta, profilo_var.get())
+        analisi["futuro"] = futuro
+        progresso.start(10)
+        root.after(POLLING_MS, controlla_analisi, id_richiesta, futuro)
+
+    def controlla_analisi(id_richiesta, futuro):
+        if id_richiesta != analisi["id"]:
+            return  # richiesta superata da una più recente
+        if not futuro.done():
+            root.after(POLLING_MS, controlla_analisi, id_richiesta, futuro)
+            return
+        progresso.stop()
+        try:
+            risultato = futuro.result()
+        except Exception as e:
+            aggiorna_info(f"⚠️ Errore durante l'analisi: {e}")
+            return
+        if risultato is not None:
+            aggiorna_info(componi_messaggio(*risultato))
+
+    def pianifica_analisi():
+        """Suggerimenti mentre si costruisce la mano: ricalcolo dopo una breve pausa."""
+        if analisi["pianificata"] is not None:
+            root.after_cancel(analisi["pianificata"])
+            analisi["pianificata"] = None
+        if not mano:
+            analisi["id"] += 1
+            progresso.stop()
+            aggiorna_info("")
+            return
+        analisi["pianificata"] = root.after(ATTESA_ANALISI_MS, avvia_analisi)
 
     def suggerisci():
         if len(mano) != MAX_CARTE:
             messagebox.showerror("Errore", "Devi selezionare esattamente 13 carte.")
             return
+        avvia_analisi()
 
-        combinazioni = genera_combinazioni(mano)
-        apertura = scegli_apertura(combinazioni, mano)
-        msg = ""
+    def chiudi():
+        esecutore.shutdown(wait=False, cancel_futures=True)
+        root.destroy()
 
-        if not apertura["puo_aprire"]:
-            msg += "Non è possibile aprire con la mano attuale."
-
-        else:
-            msg += f"✅ Apertura consigliata ({apertura['punti']} punti):"
-            for c in apertura["combinazioni"]:
-                tipo = "Scala" if c["tipo"] == "scala" else "Tris"
-                descrizione = ", ".join([f"{v}{s}" if v != "JOLLY" else "★" for v, s in c["carte"]])
-                msg += f" - {tipo}: {descrizione}"
-
-        fase = fase_var.get()
-        scarto, log = suggerisci_scarto(apertura["carte_rimaste"], fase=fase, carte_giocate=carte_giocate)
-        msg += f"\n🗑️ Scarto consigliato: {scarto[0]}{scarto[1]}\n\n"
-        msg += "\n".join(log)
-        aggiorna_info(msg)
+    root.protocol("WM_DELETE_WINDOW", chiudi)
 
     for riga_index, (carte, colore, seme_riga) in enumerate(righe_info):
         frame_riga = tk.Frame(frame_disponibili, bg=COLOR_ROW_UNIFORM)
@@ -213,9 +281,11 @@ def avvia_gui():
         lista_carte = carte[:]
         seme_fittizio = f"J{riga_index}-{colore}"
         lista_carte.append(("JOLLY", seme_fittizio))
-        righe_carte.append(lista_carte)
-
-    rigenera_righe()
+        # Colonna fissa per carta: il jolly dopo il K
+        for colonna, (valore, seme) in enumerate(lista_carte):
+            carta = CartaGUI(frame_riga, valore, seme, aggiungi_a_mano)
+            carta.grid(row=0, column=colonna, padx=3, pady=3)
+            carte_gui_map[(valore, seme)] = carta
 
     btn_frame = tk.Frame(root, bg=COLOR_BG)
     btn_frame.pack(pady=10)
@@ -225,3 +295,7 @@ def avvia_gui():
               relief="flat", padx=10, pady=5).pack()
 
     root.mainloop()
+
+
+if __name__ == "__main__":
+    avvia_gui()
@@ -1,8 +1,15 @@
 # logic.py – Parsing e generazione combinazioni valide dalla mano
 
-from itertools import combinations, groupby
+from itertools import chain, combinations, groupby
 from collections import defaultdict
-from src.core import SEMI, VALORI, JOLLY
+from src.core import (
+    SEMI, VALORI, JOLLY, INDICE_VALORE, N_VALORI, MASCHERA_CARTE,
+    MASCHERA_VALORE, conta_bit, punti_carta, punti_maschera, maschera_jolly,
+    jolly_in_maschera, maschera_seme, bit_carta, SEME_BIT, VALORE_BIT, carte_a_maschera, maschera_a_carte,
+    MASCHERA_SEME, carte_a_maschere,
+)
+from src import punteggi
+from src.tabelle import tabella_scale, scale_seme
 
 def parse_mano(mano):
     """
@@ -25,7 +32,7 @@ def parse_mano(mano):
 
     # Ordina le carte nei semi per ordine nominale
     for seme in carte_per_seme:
-        carte_per_seme[seme].sort(key=lambda v: VALORI.index(v))
+        carte_per_seme[seme].sort(key=INDICE_VALORE.__getitem__)
 
     return {
         "per_seme": dict(carte_per_seme),
@@ -33,7 +40,110 @@ def parse_mano(mano):
         "jolly": jolly
     }
 
-def genera_combinazioni(mano):
+class Mano:
+    """
+    Mano incrementale: add/remove in O(1) aggiornano conteggi per carta,
+    maschera (indice per seme e per valore) e jolly. Le combinazioni sono
+    in cache per valore (tris) e per seme (scale): cambiare una carta
+    ricalcola solo il suo valore e il suo seme. Le funzioni di questo
+    modulo accettano una Mano al posto della lista di tuple.
+    """
+
+    __slots__ = ("_conteggi", "_n", "maschera", "doppie", "jolly", "_tris", "_scale")
+
+    def __init__(self, carte=()):
+        self._conteggi = {}  # carta -> copie, in ordine di inserimento
+        self._n = 0
+        self.maschera = 0
+        self.doppie = 0  # carte presenti in due copie
+        self.jolly = []
+        self._tris = [None] * N_VALORI
+        self._scale = [None] * len(SEMI)
+        for carta in carte:
+            self.add(carta)
+
+    def add(self, carta):
+        copie = self._conteggi.get(carta, 0)
+        self._conteggi[carta] = copie + 1
+        self._n += 1
+        if carta[0] == "JOLLY":
+            self.jolly.append(carta)
+            self.maschera = (self.maschera & MASCHERA_CARTE) | maschera_jolly(len(self.jolly))
+        elif copie:
+            # La seconda copia non cambia le combinazioni, solo quante se ne possono calare
+            self.doppie |= 1 << bit_carta(carta)
+        else:
+            self._aggiorna(carta, True)
+
+    def remove(self, carta):
+        copie = self._conteggi.get(carta, 0)
+        if not copie:
+            raise ValueError(f"{carta} non è nella mano")
+        if copie == 1:
+            del self._conteggi[carta]
+        else:
+            self._conteggi[carta] = copie - 1
+        self._n -= 1
+        if carta[0] == "JOLLY":
+            self.jolly.remove(carta)
+            self.maschera = (self.maschera & MASCHERA_CARTE) | maschera_jolly(len(self.jolly))
+        elif copie == 1:
+            self._aggiorna(carta, False)
+        elif copie == 2:
+            self.doppie &= ~(1 << bit_carta(carta))
+
+    def _aggiorna(self, carta, presente):
+        b = bit_carta(carta)
+        if presente:
+            self.maschera |= 1 << b
+        else:
+            self.maschera &= ~(1 << b)
+        # Solo il valore e il seme della carta cambiano combinazioni
+        self._tris[VALORE_BIT[b]] = None
+        self._scale[SEME_BIT[b]] = None
+
+    def __iter__(self):
+        for carta, copie in self._conteggi.items():
+            for _ in range(copie):
+                yield carta
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, carta):
+        return carta in self._conteggi
+
+    def copie(self, carta):
+        return self._conteggi.get(carta, 0)
+
+    def segmenti(self, seme):
+        """Sequenze consecutive di indici di valore presenti nel seme (indice)."""
+        valori = maschera_seme(self.maschera, seme)
+        segmenti = []
+        while valori:
+            basso = (valori & -valori).bit_length() - 1
+            # x ^ (x + 1) ha un bit in più degli 1 finali di x
+            lunghezza = ((valori >> basso) ^ ((valori >> basso) + 1)).bit_length() - 1
+            segmenti.append(list(range(basso, basso + lunghezza)))
+            valori &= ~(((1 << lunghezza) - 1) << basso)
+        return segmenti
+
+    def gruppi_combinazioni(self, max_jolly=1, superflui=False):
+        """Liste di combinazioni per valore e per seme, ricalcolate solo se invalidate."""
+        max_jolly = min(max_jolly, len(self.jolly))
+        chiave = (max_jolly, superflui)
+        for v in range(N_VALORI):
+            voce = self._tris[v]
+            if voce is None or voce[0] != chiave:
+                voce = self._tris[v] = (chiave, list(tris_del_valore(self.maschera, v, max_jolly, superflui)))
+            yield voce[1]
+        for s in range(len(SEMI)):
+            voce = self._scale[s]
+            if voce is None or voce[0] != chiave:
+                voce = self._scale[s] = (chiave, list(scale_del_seme(self.maschera, s, max_jolly, superflui)))
+            yield voce[1]
+
+def genera_combinazioni(mano, **opzioni):
     """
     Genera tutte le combinazioni valide (scale, tris, poker), con e senza jolly.
     Restituisce una lista di dict:
@@ -42,58 +152,180 @@ def genera_combinazioni(mano):
             'carte': [(valore, seme), ...],
             'punti': int
         }
+    Le opzioni sono quelle di itera_combinazioni_maschera.
+    """
+    return list(itera_combinazioni(mano, **opzioni))
+
+def itera_combinazioni(mano, **opzioni):
+    """
+    Versione lazy di genera_combinazioni: adattatore su
+    itera_combinazioni_maschera che restituisce le carte come tuple.
+    Nelle scale il jolly compare nella posizione che occupa.
+    """
+    if isinstance(mano, Mano):
+        maschera, jolly = mano, mano.jolly
+    else:
+        maschera, jolly = carte_a_maschera(mano)
+    for c in itera_combinazioni_maschera(maschera, **opzioni):
+        yield {
+            "tipo": c["tipo"],
+            "carte": combinazione_a_carte(c, jolly),
+            "punti": c["punti"]
+        }
+
+def combinazione_a_carte(combinazione, jolly):
+    """
+    Converte una combinazione a maschera in lista di tuple; i jolly usano,
+    in ordine, le tuple di `jolly`.
+    """
+    if combinazione["tipo"] != "scala":
+        return maschera_a_carte(combinazione["maschera"] | maschera_jolly(combinazione["jolly"]), jolly)
+    maschera = combinazione["maschera"]
+    seme = SEMI[SEME_BIT[(maschera & -maschera).bit_length() - 1]]
+    carte = []
+    usati = 0
+    for p in range(combinazione["inizio"], combinazione["inizio"] + combinazione["lunghezza"]):
+        carta = (VALORI[p % N_VALORI], seme)
+        if maschera >> bit_carta(carta) & 1:
+            carte.append(carta)
+        else:
+            carte.append(jolly[usati] if usati < len(jolly) else JOLLY)
+            usati += 1
+    return carte
+
+def genera_combinazioni_maschera(maschera, **opzioni):
+    """
+    Come genera_combinazioni, ma lavora sulla maschera della mano.
+    Restituisce la lista prodotta da itera_combinazioni_maschera.
+    """
+    return list(itera_combinazioni_maschera(maschera, **opzioni))
+
+def itera_combinazioni_maschera(maschera, max_jolly=1, superflui=False, filtro=None, limite=None, memo=None):
+    """
+    Generatore di tutte le combinazioni legali della mano codificata a maschera
+    (o di una Mano, che riusa le combinazioni in cache).
+    Ogni combinazione è un dict:
+        {
+            'tipo': 'tris' | 'scala',
+            'maschera': int (solo carte naturali),
+            'jolly': int (jolly usati),
+            'punti': int,
+            'inizio': posizione della prima carta (solo scale, 13 = asso alto),
+            'lunghezza': numero di carte
+        }
+    - Tris e poker: ogni sottoinsieme di semi presenti, completato da jolly.
+    - Scale: ogni finestra di valori consecutivi (anche Q-K-A) con almeno
+      due carte naturali, come i tris, e i jolly nei buchi interni o agli
+      estremi (in coda se c'è posto); una finestra prende tutte le carte
+      naturali che contiene, le varianti che sostituiscono una carta in mano
+      con un jolly sarebbero dominate.
+    - max_jolly: jolly ammessi per combinazione (al massimo quelli in mano).
+    - superflui: se False scarta le combinazioni con jolly non necessari
+      (es. 5-6-7 + jolly), equivalenti a quelle senza.
+    - filtro: funzione dict -> bool, le combinazioni scartate non contano.
+    - limite: numero massimo di combinazioni restituite.
+    - memo: dict in cui tenere le combinazioni di ogni valore e di ogni seme
+      tra una chiamata e l'altra (per esempio tra i turni di una partita):
+      un valore o un seme con le stesse carte non si rigenera. Va svuotato
+      dal chiamante se cresce troppo.
+    Combinazioni equivalenti (stesso tipo, carte naturali e jolly) escono una
+    volta. I dict possono essere condivisi con la cache di una Mano: non vanno
+    modificati.
     """
-    parsed = parse_mano(mano)
-    combinazioni = []
-
-    # === TRIS e POKER ===
-    for valore, semi in parsed["per_valore"].items():
-        if len(semi) >= 3:
-            tris = [(valore, s) for s in semi[:3]]
-            combinazioni.append({
-                "tipo": "tris",
-                "carte": tris,
-                "punti": calcola_punti_combinazione(tris)
-            })
-        if len(semi) == 4:
-            poker = [(valore, s) for s in semi]
-            combinazioni.append({
-                "tipo": "tris",
-                "carte": poker,
-                "punti": calcola_punti_combinazione(poker)
-            })
-        elif len(semi) == 2 and parsed["jolly"]:
-            tris = [(valore, s) for s in semi] + [parsed["jolly"][0]]
-            combinazioni.append({
-                "tipo": "tris",
-                "carte": tris,
-                "punti": calcola_punti_combinazione(tris)
-            })
-
-    # === SCALE ===
-    for seme, valori in parsed["per_seme"].items():
-        indici = [VALORI.index(v) for v in valori]
-        indici = sorted(set(indici))
-        sequenze = estrai_sequenze_consecutive(indici)
-
-        for seq in sequenze:
-            if len(seq) >= 3:
-                carte = [(VALORI[i], seme) for i in seq]
-                combinazioni.append({
-                    "tipo": "scala",
-                    "carte": carte,
-                    "punti": calcola_punti_combinazione(carte)
-                })
-            # con jolly (max uno)
-            elif len(seq) == 2 and parsed["jolly"]:
-                carte = [(VALORI[i], seme) for i in seq] + [parsed["jolly"][0]]
-                combinazioni.append({
-                    "tipo": "scala",
-                    "carte": carte,
-                    "punti": calcola_punti_combinazione(carte)
-                })
-
-    return combinazioni
+    if isinstance(maschera, Mano):
+        gruppi = maschera.gruppi_combinazioni(max_jolly, superflui)
+    else:
+        max_jolly = min(max_jolly, jolly_in_maschera(maschera))
+        # Solo i valori presenti in almeno due semi e i semi con almeno due
+        # carte possono dare combinazioni
+        semi = [maschera_seme(maschera, s) for s in range(len(SEMI))]
+        doppi = 0
+        for a, b in combinations(semi, 2):
+            doppi |= a & b
+        if memo is not None:
+            gruppi = _gruppi_memo(maschera, semi, doppi, max_jolly, superflui, memo)
+        else:
+            gruppi = chain(
+                (tris_del_valore(maschera, v, max_jolly, superflui) for v in range(N_VALORI) if doppi >> v & 1),
+                (scale_del_seme(maschera, s, max_jolly, superflui)
+                 for s in range(len(SEMI)) if semi[s] & (semi[s] - 1)),
+            )
+
+    prodotte = 0
+    for gruppo in gruppi:
+        for combinazione in gruppo:
+            if filtro is not None and not filtro(combinazione):
+                continue
+            yield combinazione
+            prodotte += 1
+            if limite is not None and prodotte >= limite:
+                return
+
+def _gruppi_memo(maschera, semi, doppi, max_jolly, superflui, memo):
+    """I gruppi di itera_combinazioni_maschera, presi da memo quando ci sono."""
+    for v in range(N_VALORI):
+        if doppi >> v & 1:
+            chiave = ("tris", v, maschera & MASCHERA_VALORE[v], max_jolly, superflui)
+            gruppo = memo.get(chiave)
+            if gruppo is None:
+                gruppo = memo[chiave] = list(tris_del_valore(maschera, v, max_jolly, superflui))
+            yield gruppo
+    for s in range(len(SEMI)):
+        if semi[s] & (semi[s] - 1):
+            chiave = ("scala", s, semi[s], max_jolly, superflui)
+            gruppo = memo.get(chiave)
+            if gruppo is None:
+                gruppo = memo[chiave] = list(scale_del_seme(maschera, s, max_jolly, superflui))
+            yield gruppo
+
+def _combinazione(tipo, carte, jolly, inizio, lunghezza):
+    return {
+        "tipo": tipo,
+        "maschera": carte,
+        "jolly": jolly,
+        "punti": punti_maschera(carte),
+        "inizio": inizio,
+        "lunghezza": lunghezza
+    }
+
+def tris_del_valore(maschera, v, max_jolly, superflui=False):
+    """Tris e poker del valore di indice v (vedi itera_combinazioni_maschera)."""
+    presenti = maschera & MASCHERA_VALORE[v]
+    if not presenti & (presenti - 1):
+        return  # meno di due semi: nessun tris possibile
+    semi = [b for b in (1 << (s * N_VALORI + v) for s in range(len(SEMI))) if presenti & b]
+    for n in range(len(semi), 1, -1):
+        for sottoinsieme in combinations(semi, n):
+            carte = sum(sottoinsieme)
+            minimo = max(0, 3 - n)
+            massimo = min(max_jolly, 4 - n) if superflui else minimo
+            for j in range(minimo, massimo + 1):
+                if j <= max_jolly:
+                    yield _combinazione("tris", carte, j, None, n + j)
+
+def scale_del_seme(maschera, s, max_jolly, superflui=False):
+    """
+    Scale del seme di indice s (vedi itera_combinazioni_maschera), lette
+    dalla tabella precalcolata per la maschera del seme.
+    """
+    valori = maschera_seme(maschera, s)
+    if not valori & (valori - 1):
+        return  # meno di due carte nel seme
+    spostamento = s * N_VALORI
+    tabella = tabella_scale(max_jolly, superflui)
+    if tabella is None:
+        for carte, jolly, inizio, lunghezza in scale_seme(valori, max_jolly, superflui):
+            yield _combinazione("scala", carte << spostamento, jolly, inizio, lunghezza)
+        return
+    for voce in tabella.scale(valori):
+        yield {
+            "tipo": "scala",
+            "maschera": (voce & MASCHERA_SEME) << spostamento,
+            "jolly": voce >> 13 & 0x7,
+            "punti": voce >> 24,
+            "inizio": voce >> 16 & 0xF,
+            "lunghezza": voce >> 20 & 0xF,
+        }
 
 def estrai_sequenze_consecutive(indici):
     """
@@ -110,20 +342,76 @@ def calcola_punti_combinazione(combinazione):
     """
     Calcola i punti totali per una scala o tris (con jolly)
     """
-    punti = 0
-    for valore, seme in combinazione:
-        if valore == "JOLLY":
-            continue
-        if valore == "A":
-            punti += 11
-        elif valore in ["J", "Q", "K"]:
-            punti += 10
-        else:
-            punti += int(valore)
-    return punti
+    return sum(punti_carta(carta) for carta in combinazione)
 
 
-from itertools import combinations as combo_set
+def _risolvi_apertura(candidati, n_jolly, doppie=0):
+    """
+    Branch-and-bound esatto sul miglior insieme di combinazioni disgiunte.
+    `candidati` è una lista di tuple (indice, maschera, punti, jolly);
+    `doppie` è la maschera delle carte presenti in due copie, che possono
+    stare in due combinazioni (anche due volte la stessa).
+    Restituisce (chiave, indici_scelti, statistiche); chiave è None se
+    nessun insieme raggiunge 40 punti.
+
+    Il limite superiore di un ramo è la somma dei punti delle copie ancora
+    libere delle carte coperte dalle combinazioni rimanenti.
+    """
+    # Prima i candidati più ricchi: trovano presto una buona soluzione
+    candidati = sorted(candidati, key=lambda x: (-x[2], x[0]))
+    n = len(candidati)
+
+    # Unione delle carte coperte dai candidati da i in poi
+    copertura = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        copertura[i] = copertura[i + 1] | candidati[i][1]
+
+    stats = {"nodi": 0, "potati": 0}
+    migliore = {"chiave": None, "scelta": ()}
+
+    def chiave(punti, scelta, jolly):
+        return (-punti, len(scelta), jolly, tuple(sorted(candidati[k][0] for k in scelta)))
+
+    # usate: carte con almeno una copia usata; usate_due: con entrambe usate
+    def esplora(inizio, usate, usate_due, punti, jolly, scelta):
+        stats["nodi"] += 1
+        if scelta and punti >= 40:
+            k = chiave(punti, scelta, jolly)
+            if migliore["chiave"] is None or k < migliore["chiave"]:
+                migliore["chiave"] = k
+                migliore["scelta"] = tuple(scelta)
+
+        for j in range(inizio, n):
+            limite = punti + punti_maschera(copertura[j] & ~usate)
+            if doppie:
+                limite += punti_maschera(copertura[j] & doppie & ~usate_due)
+            soglia = 40 if migliore["chiave"] is None else -migliore["chiave"][0]
+            if limite < soglia or (
+                migliore["chiave"] is not None
+                and limite == soglia
+                and len(scelta) + 1 > migliore["chiave"][1]
+            ):
+                # La copertura decresce con j: anche i rami successivi sono peggiori
+                stats["potati"] += 1
+                break
+            _, maschera, punti_c, jolly_c = candidati[j]
+            if jolly + jolly_c > n_jolly:
+                continue
+            comuni = maschera & usate
+            # Le carte già usate devono essere doppie e non ancora usate due volte
+            if comuni and comuni & (usate_due | ~doppie):
+                continue
+            scelta.append(j)
+            # Con tutte le carte doppie la stessa combinazione può ripetersi
+            successivo = j if doppie and not maschera & ~doppie & MASCHERA_CARTE else j + 1
+            esplora(successivo, usate | maschera, usate_due | (usate & maschera),
+                    punti + punti_c, jolly + jolly_c, scelta)
+            scelta.pop()
+
+    esplora(0, 0, 0, 0, 0, [])
+    scelti = sorted(candidati[k][0] for k in migliore["scelta"])
+    return migliore["chiave"], scelti, stats
+
 
 def scegli_apertura(combinazioni, mano):
     """
@@ -131,272 +419,156 @@ def scegli_apertura(combinazioni, mano):
     Preferisce combinazioni che:
         - non usano carte in comune
         - totalizzano >= 40 punti
-        - usano meno combinazioni possibili
-        - usano meno jolly possibili
-        - massimizzano il punteggio (in caso di parità)
+        - massimizzano il punteggio
+        - usano meno combinazioni possibili (in caso di parità)
+        - usano meno jolly possibili (in caso di ulteriore parità)
+    Nel risultato "statistiche" riporta nodi esplorati e potati della ricerca.
     """
-    migliori = []
-    max_punti = 0
-
-    # Genera tutte le combinazioni di gruppi di combinazioni
-    for r in range(1, len(combinazioni)+1):
-        for gruppo in combo_set(combinazioni, r):
-            carte_usate = []
-            jolly_usati = 0
-            punti = 0
-            valido = True
-
-            for c in gruppo:
-                for carta in c["carte"]:
-                    if carta in carte_usate:
-                        valido = False
-                        break
-                    if carta[0] == "JOLLY":
-                        jolly_usati += 1
-                        if jolly_usati > len([c for c in mano if c[0] == "JOLLY"]):
-                            valido = False
-                            break
-                    carte_usate.append(carta)
-                if not valido:
-                    break
-                punti += c["punti"]
-
-            if valido and punti >= 40:
-                if (
-                    not migliori or
-                    punti > max_punti or
-                    (punti == max_punti and len(gruppo) < len(migliori))
-                ):
-                    migliori = gruppo
-                    max_punti = punti
-
-    if not migliori:
+    _, doppie, jolly_mano = carte_a_maschere(mano)
+    n_jolly = len(jolly_mano)
+
+    candidati = []
+    for i, c in enumerate(combinazioni):
+        maschera, jolly = carte_a_maschera(c["carte"])
+        maschera &= MASCHERA_CARTE
+        # Una carta ripetuta nella stessa combinazione la rende non valida
+        if conta_bit(maschera) + len(jolly) != len(c["carte"]) or len(jolly) > n_jolly:
+            continue
+        candidati.append((i, maschera, c["punti"], len(jolly)))
+
+    chiave, scelti, stats = _risolvi_apertura(candidati, n_jolly, doppie)
+
+    if chiave is None:
         return {
             "puo_aprire": False,
             "combinazioni": [],
             "punti": 0,
-            "carte_rimaste": mano
+            "carte_rimaste": list(mano),
+            "statistiche": stats
         }
 
-    # Calcola le carte rimaste in mano dopo l'apertura
-    carte_apertura = set()
-    for c in migliori:
-        for carta in c["carte"]:
-            carte_apertura.add(carta)
-
-    carte_rimaste = [c for c in mano if c not in carte_apertura]
+    # Ogni jolly della mano va in una sola combinazione: se due combinazioni
+    # citano la stessa tupla, la seconda riceve un altro jolly libero
+    jolly_usati = []
+    jolly_liberi = jolly_mano
+    migliori = []
+    for i in scelti:
+        c = combinazioni[i]
+        if any(carta[0] == "JOLLY" and (carta in jolly_usati or carta not in jolly_liberi)
+               for carta in c["carte"]):
+            c = dict(c, carte=list(c["carte"]))
+        for k, carta in enumerate(c["carte"]):
+            if carta[0] != "JOLLY":
+                continue
+            if carta in jolly_usati or carta not in jolly_liberi:
+                carta = next(j for j in jolly_liberi if j not in jolly_usati)
+                c["carte"][k] = carta
+            jolly_usati.append(carta)
+        migliori.append(c)
+
+    # Calcola le carte rimaste in mano dopo l'apertura: ogni copia usata
+    # toglie un bit, prima dalle carte usate due volte
+    maschere = {c[0]: c[1] for c in candidati}
+    usate = usate_due = 0
+    for i in scelti:
+        usate_due |= usate & maschere[i]
+        usate |= maschere[i]
+
+    carte_rimaste = []
+    for c in mano:
+        if c[0] == "JOLLY":
+            if c not in jolly_usati:
+                carte_rimaste.append(c)
+            continue
+        b = 1 << bit_carta(c)
+        if usate_due & b:
+            usate_due ^= b
+        elif usate & b:
+            usate ^= b
+        else:
+            carte_rimaste.append(c)
 
     return {
         "puo_aprire": True,
-        "combinazioni": list(migliori),
-        "punti": max_punti,
-        "carte_rimaste": carte_rimaste
+        "combinazioni": migliori,
+        "punti": -chiave[0],
+        "carte_rimaste": carte_rimaste,
+        "statistiche": stats
     }
 
 
-def suggerisci_scarto(carte_rimaste, combinazioni_possibili=None):
+def scegli_apertura_maschera(combinazioni, maschera, doppie=0):
     """
-    Suggerisce la miglior carta da scartare:
-    - non jolly
-    - non utile per future scale/tris
-    - minimizza punti
-    - evita di lasciare carte potenzialmente utili all'avversario
+    Come scegli_apertura, ma su combinazioni e mano codificate a maschera
+    (vedi genera_combinazioni_maschera); `doppie` marca le carte presenti
+    in due copie. Restituisce "maschera_rimasta" (carte con almeno una copia
+    rimasta) e "doppie_rimaste" (carte con due copie rimaste) al posto di
+    "carte_rimaste". Una combinazione può comparire due volte se tutte le
+    sue carte sono doppie.
     """
-    if not carte_rimaste:
-        return None
-
-    # Non scartare jolly
-    carte = [c for c in carte_rimaste if c[0] != "JOLLY"]
-    if not carte:
-        return None  # solo jolly rimasti
-
-    # Costruisci dizionari d'appoggio
-    per_seme = defaultdict(list)
-    per_valore = defaultdict(list)
-    for valore, seme in carte:
-        per_seme[seme].append(valore)
-        per_valore[valore].append(seme)
-
-    rischi = {}
-    for carta in carte:
-        valore, seme = carta
-        score = 0
-
-        idx = VALORI.index(valore)
-
-        # Punteggio nominale (più alto = peggio tenerla)
-        if valore == "A":
-            score += 11
-        elif valore in ["J", "Q", "K"]:
-            score += 10
-        else:
-            score += int(valore)
-
-        # Penalità se la carta è "in mezzo" a una possibile scala (es: 5 con 4 e 6 presenti)
-        vicini = []
-        if idx > 0:
-            vicini.append(VALORI[idx - 1])
-        if idx < len(VALORI) - 1:
-            vicini.append(VALORI[idx + 1])
-
-        vicini_presenti = sum(1 for v in vicini if v in per_seme[seme])
-        score -= 5 * vicini_presenti  # più vicini = più utile = meno desiderabile scartarla
-
-        # Bonus se è una carta "solitaria" (non aiuta in nulla)
-        if len(per_valore[valore]) == 1 and len(per_seme[seme]) == 1:
-            score -= 3
+    if isinstance(maschera, Mano):
+        maschera, doppie = maschera.maschera, maschera.doppie
+    n_jolly = jolly_in_maschera(maschera)
+    candidati = [
+        (i, c["maschera"], c["punti"], c["jolly"])
+        for i, c in enumerate(combinazioni)
+        if c["jolly"] <= n_jolly
+    ]
+
+    chiave, scelti, stats = _risolvi_apertura(candidati, n_jolly, doppie)
+
+    if chiave is None:
+        return {
+            "puo_aprire": False,
+            "combinazioni": [],
+            "punti": 0,
+            "maschera_rimasta": maschera,
+            "doppie_rimaste": doppie,
+            "statistiche": stats
+        }
 
-        rischi[carta] = score
+    usate = usate_due = 0
+    for i in scelti:
+        usate_due |= usate & combinazioni[i]["maschera"]
+        usate |= combinazioni[i]["maschera"]
 
-    # Ordina per punteggio crescente
-    migliori = sorted(rischi.items(), key=lambda x: x[1])
-    return migliori[0][0]  # carta con punteggio più basso
+    return {
+        "puo_aprire": True,
+        "combinazioni": [combinazioni[i] for i in scelti],
+        "punti": -chiave[0],
+        "maschera_rimasta": (
+            ((maschera & MASCHERA_CARTE & ~usate) | (doppie & ~usate_due))
+            | maschera_jolly(n_jolly - chiave[2])
+        ),
+        "doppie_rimaste": doppie & ~usate,
+        "statistiche": stats
+    }
 
 
 def suggerisci_scarto(carte_rimaste, combinazioni_possibili=None):
     """
-    Suggerisce lo scarto ottimale valutando:
-    - punti nominali (più alti = più pericolosi)
-    - rischio di completamento scala (propria o avversaria)
-    - utilità nei tris
-    - isolamento (nessuna carta vicina o stesso valore)
-    - valore strategico (carte centrali più flessibili)
-    - evita jolly
+    Suggerisce sempre una carta da scartare, anche nei casi estremi: quella
+    col punteggio più basso secondo punteggi.TERMINI_LOGIC (punti, vicini di
+    scala, valori centrali, tris, isolamento, scala lunga). I jolly si
+    valutano solo se non resta altro.
     """
     if not carte_rimaste:
         return None
 
     carte = [c for c in carte_rimaste if c[0] != "JOLLY"]
     if not carte:
-        return None  # solo jolly rimasti
-
-    score_map = {}
-    per_seme = defaultdict(list)
-    per_valore = defaultdict(list)
-
-    for valore, seme in carte:
-        per_seme[seme].append(valore)
-        per_valore[valore].append(seme)
-
-    for carta in carte:
-        valore, seme = carta
-        idx = VALORI.index(valore)
-        score = 0
-
-        # === BASE: punti carta ===
-        if valore == "A":
-            score += 11
-        elif valore in ["J", "Q", "K"]:
-            score += 10
-        else:
-            score += int(valore)
-
-        # === BONUS negativo (cioè penalità per l'eliminazione) ===
-        # ➤ potenziale scala
-        vicini = []
-        if idx > 0:
-            vicini.append(VALORI[idx - 1])
-        if idx < len(VALORI) - 1:
-            vicini.append(VALORI[idx + 1])
-
-        vicini_presenti = sum(1 for v in vicini if v in per_seme[seme])
-        score -= 7 * vicini_presenti  # forte penalità se vicini presenti
-
-        # ➤ valore centrale in possibili scale (es. 6, 7, 8)
-        if 2 < idx < 11:
-            score -= 2
-
-        # ➤ parte di coppia o tris potenziale
-        if len(per_valore[valore]) > 1:
-            score -= 4 * (len(per_valore[valore]) - 1)
-
-        # ➤ carta isolata (nessun altro stesso valore o seme vicino)
-        if len(per_valore[valore]) == 1 and vicini_presenti == 0:
-            score += 2  # è sacrificabile
-
-        # === PROTEZIONE strategica ===
-        # Penalizza se è l'unico valore basso in una scala che ha già 2 elementi
-        if valore in VALORI[1:-1]:
-            idx_v = VALORI.index(valore)
-            if (
-                idx_v > 1 and VALORI[idx_v - 2] in per_seme[seme] and VALORI[idx_v - 1] in per_seme[seme]
-            ) or (
-                idx_v < len(VALORI) - 2 and VALORI[idx_v + 1] in per_seme[seme] and VALORI[idx_v + 2] in per_seme[seme]
-            ):
-                score -= 5
-
-        score_map[carta] = score
-
-    ordinata = sorted(score_map.items(), key=lambda x: x[1])
-    return ordinata[0][0]
+        carte = list(carte_rimaste)
+    return punteggi.scegli(carte, punteggi.valuta(punteggi.estrai(carte), punteggi.TERMINI_LOGIC))
 
 
-def suggerisci_scarto(carte_rimaste, combinazioni_possibili=None):
+def suggerisci_scarto_semplice(carte_rimaste, combinazioni_possibili=None):
     """
-    Suggerisce sempre una carta da scartare, anche nei casi estremi.
-    Basato su logica strategica e statistica.
+    La prima regola di scarto di questo modulo, per confronto: la carta col
+    punteggio più basso secondo punteggi.TERMINI_LOGIC_SEMPLICE (punti,
+    vicini di scala, carte solitarie). Non scarta mai un jolly: con soli
+    jolly restituisce None.
     """
-    if not carte_rimaste:
-        return None
-
-    # Evita jolly: li tiene fuori dalla valutazione
     carte = [c for c in carte_rimaste if c[0] != "JOLLY"]
     if not carte:
-        carte = carte_rimaste[:]  # Se ho solo jolly, li valuto comunque (caso limite)
-
-    score_map = {}
-    per_seme = defaultdict(list)
-    per_valore = defaultdict(list)
-
-    for valore, seme in carte:
-        per_seme[seme].append(valore)
-        per_valore[valore].append(seme)
-
-    for carta in carte:
-        valore, seme = carta
-        idx = VALORI.index(valore)
-        score = 0
-
-        # Punti nominali
-        if valore == "A":
-            score += 11
-        elif valore in ["J", "Q", "K"]:
-            score += 10
-        else:
-            score += int(valore)
-
-        # Rischio scala
-        vicini = []
-        if idx > 0:
-            vicini.append(VALORI[idx - 1])
-        if idx < len(VALORI) - 1:
-            vicini.append(VALORI[idx + 1])
-        vicini_presenti = sum(1 for v in vicini if v in per_seme[seme])
-        score -= 7 * vicini_presenti
-
-        # Valori centrali
-        if 2 < idx < 11:
-            score -= 2
-
-        # Parte di tris
-        if len(per_valore[valore]) > 1:
-            score -= 4 * (len(per_valore[valore]) - 1)
-
-        # Carta isolata
-        if len(per_valore[valore]) == 1 and vicini_presenti == 0:
-            score += 2
-
-        # Scala lunga potenziale
-        if valore in VALORI[1:-1]:
-            idx_v = VALORI.index(valore)
-            if (
-                idx_v > 1 and VALORI[idx_v - 2] in per_seme[seme] and VALORI[idx_v - 1] in per_seme[seme]
-            ) or (
-                idx_v < len(VALORI) - 2 and VALORI[idx_v + 1] in per_seme[seme] and VALORI[idx_v + 2] in per_seme[seme]
-            ):
-                score -= 5
-
-        score_map[carta] = score
-
-    ordinata = sorted(score_map.items(), key=lambda x: x[1])
-    return ordinata[0][0]  # Sempre una carta
+        return None
+    return punteggi.scegli(carte, punteggi.valuta(punteggi.estrai(carte), punteggi.TERMINI_LOGIC_SEMPLICE))
@@ -1,6 +1,8 @@
-from collections import defaultdict, Counter
+from collections import namedtuple
+from collections.abc import Sequence
 
-VALORI = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+from src import punteggi
+from src.core import bit_carta
 
 FASE_PESI = {
     "inizio": {"valore": 0.5, "strategia": 1.2, "rischio": 1.0},
@@ -8,98 +10,328 @@ FASE_PESI = {
     "finale": {"valore": 1.5, "strategia": 0.8, "rischio": 1.2},
 }
 
-def suggerisci_scarto(carte_rimaste, combinazioni_possibili=None, carte_giocate=None, fase="centrale"):
+# Coefficienti delle regole di scarto, moltiplicati per i pesi della fase
+# (src.taratura li cerca automaticamente)
+COEFFICIENTI = {
+    "vicino": 7,          # per vicino di scala nello stesso seme
+    "attacco_jolly": 5,   # 2 o 4 senza il 3: si attacca con jolly o 3
+    "intermedio": 2,      # valori dal 4 al J
+    "tris": 4,            # per altra carta dello stesso valore
+    "giocata": 3,         # per carta dello stesso valore già giocata
+    "alta_iniziale": 5,   # carta da 10 punti in su a inizio partita
+    "isolata_alta": 4,    # carta isolata da 10 punti in su
+    "isolata": 1,         # altra carta isolata
+}
+
+# Penalità massima (probabilità 1) per lo scarto di una carta che serve all'avversario
+PESO_PERICOLO = 10
+# Penalità per lo scarto di una carta che l'avversario attacca subito al tavolo
+PESO_ATTACCO = 8
+
+# Regola della spiegazione per ogni caratteristica di src.punteggi
+REGOLE = {
+    punteggi.JOLLY: "jolly",
+    punteggi.PUNTI: "valore",
+    punteggi.ALTA: "alta_iniziale",
+    punteggi.VICINI: "vicino",
+    punteggi.BASSA_SENZA_TRE: "attacco_jolly",
+    punteggi.CENTRALE: "intermedio",
+    punteggi.COMPAGNE: "tris",
+    punteggi.PERICOLO: "pericolo",
+    punteggi.GIOCATE: "giocata",
+    punteggi.ATTACCABILE: "attaccabile",
+    punteggi.LIBERA_JOLLY: "libera_jolly",
+    punteggi.ISOLATA_ALTA: "isolata_alta",
+    punteggi.ISOLATA_BASSA: "isolata",
+}
+
+# Una regola applicata a una carta: delta è il contributo con segno al
+# punteggio, peso il peso di fase usato (None se non pesata), quantita il
+# valore della caratteristica (punti, vicini, probabilità, ...)
+Voce = namedtuple("Voce", "regola carta delta peso quantita")
+
+def suggerisci_scarto(carte_rimaste, combinazioni_possibili=None, carte_giocate=None, fase="centrale",
+                      tracciatore=None, tavolo=None, fase_pesi=None, coefficienti=None, spiega=True):
+    """
+    Restituisce (scarto, log). Il log è un LogScarto: si legge come la lista
+    delle righe di testo, ma le compone solo quando serve. Con spiega=False
+    non si prepara alcuna spiegazione e log è None.
+    """
     if not carte_rimaste:
-        return None, ["⚠️ Nessuna carta in mano"]
+        return None, ["⚠️ Nessuna carta in mano"] if spiega else None
+
+    valutazioni = valuta_carte(carte_rimaste, carte_giocate, fase, tracciatore, tavolo,
+                               fase_pesi, coefficienti, spiega)
+    if not spiega:
+        carte = [carta for carta, _, _ in valutazioni]
+        return punteggi.scegli(carte, [score for _, score, _ in valutazioni], massimo=True), None
+    return componi_scarto(valutazioni)
+
+def intestazione_carta(carta, fase):
+    return f"🔍 Valutazione {carta[0]}{carta[1]} (fase: {fase}):"
+
+# Termini già costruiti per (pesi, coefficienti, con tracciatore): le
+# chiamate su mani corte non ripagano la costruzione a ogni scarto
+_TERMINI = {}
+
+def termini_fase(pesi, k, tracciatore=None):
+    """
+    Termini di src.punteggi della politica pesata per fase, nell'ordine
+    delle regole: pesi è la voce di FASE_PESI, k i COEFFICIENTI. La tupla
+    restituita è condivisa tra le chiamate con gli stessi dict, che quindi
+    non vanno modificati sul posto.
+    """
+    chiave = (id(pesi), id(k), tracciatore is not None)
+    voce = _TERMINI.get(chiave)
+    if voce is None or voce[0] is not pesi or voce[1] is not k:
+        if len(_TERMINI) > 64:
+            _TERMINI.clear()
+        # I dict restano nella voce, così i loro id non possono essere riusati
+        voce = _TERMINI[chiave] = (pesi, k, tuple(_costruisci_termini(pesi, k, tracciatore is not None)))
+    return voce[2]
+
+def _costruisci_termini(pesi, k, con_pericolo):
+    termini = [
+        (punteggi.JOLLY, 100, None, 1, False),
+        (punteggi.PUNTI, 1, pesi["valore"], 1, False),
+    ]
+    if pesi["valore"] < 1:
+        termini.append((punteggi.ALTA, k["alta_iniziale"], None, 1, False))
+    termini += [
+        (punteggi.VICINI, k["vicino"], pesi["strategia"], -1, False),
+        (punteggi.BASSA_SENZA_TRE, k["attacco_jolly"], pesi["strategia"], -1, False),
+        (punteggi.CENTRALE, k["intermedio"], pesi["strategia"], -1, False),
+        (punteggi.COMPAGNE, k["tris"], pesi["strategia"], -1, False),
+    ]
+    if con_pericolo:
+        termini.append((punteggi.PERICOLO, PESO_PERICOLO, pesi["rischio"], -1, True))
+    else:
+        termini.append((punteggi.GIOCATE, k["giocata"], pesi["rischio"], 1, False))
+    termini += [
+        (punteggi.ATTACCABILE, PESO_ATTACCO, pesi["rischio"], -1, False),
+        (punteggi.LIBERA_JOLLY, PESO_ATTACCO, pesi["rischio"], -1, False),
+        (punteggi.ISOLATA_ALTA, k["isolata_alta"], None, 1, False),
+        (punteggi.ISOLATA_BASSA, k["isolata"], None, 1, False),
+    ]
+    return termini
 
-    log = []
+def valuta_carte(carte_rimaste, carte_giocate=None, fase="centrale", tracciatore=None, tavolo=None,
+                 fase_pesi=None, coefficienti=None, spiega=True):
+    """
+    Punteggio di scarto e spiegazione per ogni carta valutata.
+    Restituisce una lista di (carta, score, Spiegazione) nell'ordine della
+    mano; con spiega=False la spiegazione è None.
+
+    Con un tracciatore (src.avversario.Tracciatore) il rischio è la
+    probabilità che la carta serva all'avversario e carte_giocate è ignorato.
+    Con un tavolo (src.tavolo.Tavolo) su cui l'avversario ha aperto, le
+    carte che può attaccare o con cui può prendere un jolly sono penalizzate.
+    fase_pesi e coefficienti sostituiscono FASE_PESI e COEFFICIENTI.
+    """
     carte = [c for c in carte_rimaste if c[0] != "JOLLY"]
     if not carte:
-        carte = carte_rimaste[:]
-
-    score_map = {}
-    per_seme = defaultdict(list)
-    per_valore = defaultdict(list)
-
-    for valore, seme in carte:
-        if valore in VALORI:
-            per_seme[seme].append(valore)
-            per_valore[valore].append(seme)
-
-    conteggio_giocate = Counter()
-    if carte_giocate:
-        for v, s in carte_giocate:
-            conteggio_giocate[v] += 1
-
-    pesi = FASE_PESI.get(fase, FASE_PESI["centrale"])
-
-    for carta in carte:
-        valore, seme = carta
-        score = 0
-        riga_log = [f"🔍 Valutazione {valore}{seme} (fase: {fase}):"]
-
-        if valore not in VALORI:
-            riga_log.append("  - È un jolly (scarto mai consigliato)")
-            score += 100
-            score_map[carta] = score
-            log.append("\n".join(riga_log))
-            continue
-
-        idx = VALORI.index(valore)
-
-        valore_punti = {"A": 11, "J": 10, "Q": 10, "K": 10}
-        base = valore_punti.get(valore, 10 if valore in ["J", "Q", "K"] else int(valore))
-        score += base * pesi["valore"]
-        riga_log.append(f"  - Valore in mano secondo regolamento (+{base}×{pesi['valore']}={base * pesi['valore']})")
-
-        if pesi["valore"] < 1 and base >= 10:
-            penalita_alta = 5
-            score += penalita_alta
-            riga_log.append(f"  - Penalità carta alta iniziale (+{penalita_alta})")
-
-        vicini = []
-        if idx > 0:
-            vicini.append(VALORI[idx - 1])
-        if idx < len(VALORI) - 1:
-            vicini.append(VALORI[idx + 1])
-        vicini_presenti = sum(1 for v in vicini if v in per_seme[seme])
-        bonus_scala = 7 * vicini_presenti * pesi["strategia"]
-        if vicini_presenti:
-            score -= bonus_scala
-            riga_log.append(f"  - Vicini nella scala trovati: {vicini_presenti} (–{bonus_scala})")
-        else:
-            riga_log.append("  - Nessun vicino di scala")
-
-        if valore in ["2", "4"] and "3" not in per_seme[seme]:
-            potenziale_attacco = 5 * pesi["strategia"]
-            score -= potenziale_attacco
-            riga_log.append(f"  - Potenziale attacco con JOLLY o 3 (–{potenziale_attacco})")
-
-        if 2 < idx < 11:
-            bonus_intermedio = 2 * pesi["strategia"]
-            score -= bonus_intermedio
-            riga_log.append(f"  - Valore intermedio (–{bonus_intermedio})")
-
-        if len(per_valore[valore]) > 1:
-            bonus_tris = 4 * (len(per_valore[valore]) - 1) * pesi["strategia"]
-            score -= bonus_tris
-            riga_log.append(f"  - Possibile tris con altri {len(per_valore[valore]) - 1} (–{bonus_tris})")
-
-        num_giocate = conteggio_giocate[valore]
-        penalita_giocate = num_giocate * 3 * pesi["rischio"]
-        if num_giocate > 0:
-            score += penalita_giocate
-            riga_log.append(f"  - {num_giocate} carta/e già giocate con questo valore (+{penalita_giocate})")
-
-        if len(per_valore[valore]) == 1 and vicini_presenti == 0:
-            penalita_isolata = 4 if valore in ["10", "J", "Q", "K", "A"] else 1
-            score += penalita_isolata
-            riga_log.append(f"  - Carta isolata (+{penalita_isolata})")
-
-        riga_log.append(f"  => Punteggio finale: {score:.1f}")
-        log.append("\n".join(riga_log))
-        score_map[carta] = score
-
-    scarto = max(score_map.items(), key=lambda x: x[1])[0]
-    log.insert(0, f"🗑️ Carta consigliata da scartare: {scarto[0]}{scarto[1]}")
-    return scarto, log
+        carte = list(carte_rimaste)
+    righe = punteggi.estrai(carte, carte_giocate if tracciatore is None else None, tavolo)
+    return valuta_righe(carte, righe, fase, tracciatore, fase_pesi, coefficienti, spiega)
+
+def valuta_righe(carte, righe, fase="centrale", tracciatore=None, fase_pesi=None, coefficienti=None,
+                 spiega=True):
+    """
+    Come valuta_carte, per carte già filtrate dai jolly e con le
+    caratteristiche già estratte da punteggi.estrai (src.cache le riusa tra
+    mani uguali a meno dei semi). Il tracciatore aggiunge il rischio per carta.
+    """
+    fase_pesi = FASE_PESI if fase_pesi is None else fase_pesi
+    k = COEFFICIENTI if coefficienti is None else coefficienti
+    pesi = fase_pesi.get(fase, fase_pesi["centrale"])
+
+    pericoli = None
+    if tracciatore is not None:
+        pericoli = [tracciatore.bisogno(bit_carta(c)) if c[0] != "JOLLY" else 0.0 for c in carte]
+    termini = termini_fase(pesi, k, tracciatore)
+    scores = punteggi.valuta(righe, termini, pericoli)
+
+    if not spiega:
+        return [(carta, score, None) for carta, score in zip(carte, scores)]
+    n = punteggi.N_CARATTERISTICHE
+    return [
+        (carta, scores[i], Spiegazione(carta, fase, righe[i * n:(i + 1) * n],
+                                       pericoli[i] if pericoli is not None else None, termini, scores[i]))
+        for i, carta in enumerate(carte)
+    ]
+
+# Righe già composte dopo l'intestazione; vedi Spiegazione._corpo
+_CORPI = {}
+_MAX_CORPI = 4096
+
+class Spiegazione:
+    """
+    Perché una carta ha il suo punteggio: tiene le caratteristiche e i
+    termini usati e ne ricava su richiesta le voci (Voce), le righe di testo
+    o un dict per JSON.
+    """
+
+    __slots__ = ("carta", "fase", "riga", "pericolo", "termini", "score", "_righe")
+
+    def __init__(self, carta, fase, riga, pericolo, termini, score):
+        self.carta = carta
+        self.fase = fase
+        self.riga = riga
+        self.pericolo = pericolo
+        self.termini = termini
+        self.score = score
+        self._righe = None
+
+    def con_carta(self, carta):
+        """La stessa spiegazione per un'altra carta con le stesse caratteristiche."""
+        return Spiegazione(carta, self.fase, self.riga, self.pericolo, self.termini, self.score)
+
+    def _applicate(self):
+        """(caratteristica, delta, peso, quantita) delle regole applicate, in ordine."""
+        applicate = []
+        riga = self.riga
+        jolly = riga[punteggi.JOLLY]
+        for caratteristica, coefficiente, peso, segno, arrotonda in self.termini:
+            if jolly and caratteristica != punteggi.JOLLY:
+                continue
+            if caratteristica == punteggi.PERICOLO:
+                x = self.pericolo
+            else:
+                x = riga[caratteristica]
+                if not x:
+                    # L'assenza di vicini si dice comunque, senza contributo
+                    if caratteristica == punteggi.VICINI:
+                        applicate.append((caratteristica, 0, peso, 0))
+                    continue
+            valore = punteggi.termine(coefficiente, x, peso, arrotonda)
+            applicate.append((caratteristica, valore if segno > 0 else -valore, peso, x))
+        return applicate
+
+    def voci(self):
+        """Le regole applicate, nell'ordine del punteggio."""
+        return [Voce(REGOLE[c], self.carta, delta, peso, x) for c, delta, peso, x in self._applicate()]
+
+    def righe(self):
+        """
+        Righe di testo: l'intestazione, una per regola e il punteggio finale.
+        Si compongono una volta sola; la lista restituita è condivisa.
+        """
+        if self._righe is None:
+            self._righe = [intestazione_carta(self.carta, self.fase)]
+            self._righe.extend(self._corpo()[0])
+        return self._righe
+
+    def testo(self):
+        """Le righe unite in un blocco di testo, come nel log."""
+        corpo = self._corpo()[1]
+        intestazione = intestazione_carta(self.carta, self.fase)
+        return f"{intestazione}\n{corpo}" if corpo else intestazione
+
+    def _corpo(self):
+        """
+        (righe, testo) dopo l'intestazione: dipendono solo da caratteristiche,
+        pericolo, termini e punteggio, quindi si compongono una volta per
+        tutte le carte che li condividono.
+        """
+        chiave = (id(self.termini), bytes(self.riga), self.pericolo, self.score)
+        voce = _CORPI.get(chiave)
+        if voce is None or voce[0] is not self.termini:
+            corpo = [_testo(c, delta, peso, x) for c, delta, peso, x in self._applicate()]
+            if not self.riga[punteggi.JOLLY]:
+                corpo.append(f"  => Punteggio finale: {self.score:.1f}")
+            if len(_CORPI) >= _MAX_CORPI:
+                _CORPI.clear()
+            # Si tengono anche i termini, così il loro id non può essere riusato
+            voce = _CORPI[chiave] = (self.termini, tuple(corpo), "\n".join(corpo))
+        return voce[1], voce[2]
+
+    def come_dict(self):
+        return {
+            "carta": f"{self.carta[0]}{self.carta[1]}",
+            "punteggio": self.score,
+            "voci": [{"regola": v.regola, "delta": v.delta or 0, "peso": v.peso, "quantita": v.quantita}
+                     for v in self.voci()],
+        }
+
+# Testo di ogni regola, come nel log storico: d è il contributo con segno,
+# n il suo opposto, x la quantità e peso il peso di fase
+_TESTI = {
+    punteggi.JOLLY: "  - È un jolly (scarto mai consigliato)",
+    punteggi.PUNTI: "  - Valore in mano secondo regolamento (+{x}×{peso}={d})",
+    punteggi.ALTA: "  - Penalità carta alta iniziale (+{d})",
+    punteggi.VICINI: "  - Vicini nella scala trovati: {x} (–{n})",
+    punteggi.BASSA_SENZA_TRE: "  - Potenziale attacco con JOLLY o 3 (–{n})",
+    punteggi.CENTRALE: "  - Valore intermedio (–{n})",
+    punteggi.COMPAGNE: "  - Possibile tris con altri {x} (–{n})",
+    punteggi.PERICOLO: "  - Probabilità che serva all'avversario: {x:.0%} (–{n})",
+    punteggi.GIOCATE: "  - {x} carta/e già giocate con questo valore (+{d})",
+    punteggi.ATTACCABILE: "  - Attaccabile al tavolo dall'avversario (–{n})",
+    punteggi.LIBERA_JOLLY: "  - Libera un jolly sul tavolo dall'avversario (–{n})",
+    punteggi.ISOLATA_ALTA: "  - Carta isolata (+{d})",
+    punteggi.ISOLATA_BASSA: "  - Carta isolata (+{d})",
+}
+_CARATTERISTICA = {regola: c for c, regola in REGOLE.items()}
+
+def _testo(caratteristica, delta, peso, x):
+    if caratteristica == punteggi.VICINI and not x:
+        return "  - Nessun vicino di scala"
+    return _TESTI[caratteristica].format(d=delta, n=-delta, peso=peso, x=x)
+
+def testo_voce(v):
+    """Riga di testo di una voce, come nel log storico."""
+    return _testo(_CARATTERISTICA[v.regola], v.delta, v.peso, v.quantita)
+
+class LogScarto(Sequence):
+    """
+    Log di uno scarto: si usa come la lista delle righe di testo (la prima è
+    la carta consigliata, poi un blocco per carta), composte alla prima
+    lettura. come_dict() dà la stessa spiegazione in forma strutturata.
+    """
+
+    __slots__ = ("scarto", "valutazioni", "intestazione", "_righe")
+
+    def __init__(self, scarto, valutazioni, intestazione):
+        self.scarto = scarto
+        self.valutazioni = valutazioni
+        self.intestazione = intestazione
+        self._righe = None
+
+    def righe(self):
+        if self._righe is None:
+            self._righe = [self.intestazione]
+            self._righe.extend(s.testo() for _, _, s in self.valutazioni)
+        return self._righe
+
+    def __getitem__(self, indice):
+        return self.righe()[indice]
+
+    def __iter__(self):
+        return iter(self.righe())
+
+    def __len__(self):
+        return len(self.valutazioni) + 1
+
+    def __eq__(self, altro):
+        if isinstance(altro, Sequence) and not isinstance(altro, str):
+            return self.righe() == list(altro)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.righe())
+
+    def come_dict(self):
+        return {
+            "scarto": f"{self.scarto[0]}{self.scarto[1]}",
+            "carte": [s.come_dict() for _, _, s in self.valutazioni],
+        }
+
+def componi_scarto(valutazioni):
+    """Sceglie lo scarto dalle valutazioni (carta, score, Spiegazione); il log è un LogScarto."""
+    # Prima carta col punteggio più alto; le copie di una carta hanno lo stesso punteggio
+    scarto, migliore, _ = valutazioni[0]
+    for carta, score, _ in valutazioni:
+        if score > migliore:
+            scarto, migliore = carta, score
+    return scarto, LogScarto(scarto, valutazioni, f"🗑️ Carta consigliata da scartare: {scarto[0]}{scarto[1]}")
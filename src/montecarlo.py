@@ -0,0 +1,136 @@
+# montecarlo.py – Consiglio di scarto con simulazioni Monte Carlo a tempo
+
+import math
+import random
+import time
+
+from src import logic, logic_log
+from src.core import N_CARTE
+from src.state import (
+    JOLLY_ID, N_MAZZI, N_JOLLY, CARTE_IN_MANO, Partita, gioca_turno, tupla_a_carta,
+)
+from src.strategy import StrategiaBase
+
+PREMIO_CHIUSURA = 100
+ORIZZONTE = 8
+
+
+def carte_sconosciute(note):
+    """Carte del sabot (2×52 + 4 jolly) non ancora viste, come lista di interi."""
+    copie = [N_MAZZI] * N_CARTE + [N_JOLLY]
+    for c in note:
+        if copie[c] > 0:
+            copie[c] -= 1
+    return [c for c, n in enumerate(copie) for _ in range(n)]
+
+
+def _simula(mano, avversario, mazzo, scarto, seed, orizzonte, strategie):
+    """Gioca dallo scarto in poi e restituisce il valore per il giocatore 0."""
+    partita = Partita.da_mani([mano, avversario], mazzo, [scarto], giocatore=1,
+                              rng=random.Random(seed))
+    while not partita.finita and partita.turno < orizzonte:
+        gioca_turno(partita, strategie[partita.giocatore])
+    residui = partita.risultato()["punti_residui"]
+    valore = residui[1] - residui[0]
+    if partita.vincitore == 0:
+        valore += PREMIO_CHIUSURA
+    elif partita.vincitore == 1:
+        valore -= PREMIO_CHIUSURA
+    return valore
+
+
+def suggerisci_scarto(carte_rimaste, carte_giocate=None, budget_ms=200, fase="centrale",
+                      orizzonte=ORIZZONTE, carte_avversario=CARTE_IN_MANO, seed=None):
+    """
+    Sceglie lo scarto simulando, per ogni carta candidata, il seguito della
+    partita su mondi estratti dalle carte non viste. Ogni mondo è giocato
+    per tutte le candidate (numeri casuali comuni), a turno, finché il
+    budget in millisecondi non scade; un mondo interrotto dalla scadenza
+    non conta. La risposta migliore finora è sempre disponibile, e senza
+    alcun mondo completo coincide con logic_log.
+
+    Restituisce (scarto, log, stime) dove log ha il formato di
+    logic_log.suggerisci_scarto e stime è un dict
+    carta -> {'media', 'ic95', 'simulazioni'}.
+    """
+    inizio = time.perf_counter()
+    scadenza = inizio + budget_ms / 1000
+
+    scarto_base, log_base = logic_log.suggerisci_scarto(
+        carte_rimaste, carte_giocate=carte_giocate, fase=fase)
+    if scarto_base is None:
+        return None, log_base, {}
+
+    mano = [tupla_a_carta(c) for c in carte_rimaste]
+    solo_jolly = all(c == JOLLY_ID for c in mano)
+    # Candidate: una per carta distinta, con la tupla originale della mano
+    originali = {}
+    for c, carta in zip(mano, carte_rimaste):
+        if c not in originali and (c != JOLLY_ID or solo_jolly):
+            originali[c] = carta
+    candidate = list(originali)
+
+    note = mano + [tupla_a_carta(c) for c in carte_giocate or []]
+    ignote = carte_sconosciute(note)
+    rng = random.Random(seed)
+    strategie = [StrategiaBase(scarto=logic.suggerisci_scarto), StrategiaBase(scarto=logic.suggerisci_scarto)]
+
+    somme = {c: 0.0 for c in candidate}
+    quadrati = {c: 0.0 for c in candidate}
+    conteggi = {c: 0 for c in candidate}
+    mondi = 0
+
+    while time.perf_counter() < scadenza and len(ignote) > carte_avversario:
+        rng.shuffle(ignote)
+        avversario = ignote[:carte_avversario]
+        mazzo = ignote[carte_avversario:]
+        seed_mondo = rng.random()
+        valori = []
+        for c in candidate:
+            if time.perf_counter() >= scadenza:
+                break
+            resto = mano[:]
+            resto.remove(c)
+            valori.append(_simula(resto, avversario, mazzo, c, seed_mondo, orizzonte, strategie))
+        if len(valori) < len(candidate):
+            break  # mondo interrotto: darebbe un campione in più solo alle prime candidate
+        for c, valore in zip(candidate, valori):
+            somme[c] += valore
+            quadrati[c] += valore * valore
+            conteggi[c] += 1
+        mondi += 1
+
+    stime = {}
+    for c in candidate:
+        n = conteggi[c]
+        if not n:
+            continue
+        media = somme[c] / n
+        varianza = max(0.0, quadrati[c] / n - media * media) * n / (n - 1) if n > 1 else 0.0
+        stime[originali[c]] = {
+            "media": media,
+            "ic95": 1.96 * math.sqrt(varianza / n),
+            "simulazioni": n,
+        }
+
+    # Contano solo i mondi completi: tutte le candidate hanno gli stessi campioni
+    if mondi:
+        scarto = originali[max(candidate, key=lambda c: somme[c])]
+    else:
+        scarto = scarto_base
+
+    blocchi = {riga.split("\n", 1)[0]: riga for riga in log_base[1:]}
+    log = [f"🗑️ Carta consigliata da scartare: {scarto[0]}{scarto[1]}"]
+    for c in candidate:
+        carta = originali[c]
+        stima = stime.get(carta)
+        if stima:
+            riga = (f"🎲 {carta[0]}{carta[1]}: valore atteso {stima['media']:.1f} "
+                    f"± {stima['ic95']:.1f} su {stima['simulazioni']} simulazioni")
+        else:
+            riga = f"🎲 {carta[0]}{carta[1]}: nessuna simulazione nel tempo disponibile"
+        blocco = blocchi.get(logic_log.intestazione_carta(carta, fase))
+        log.append(riga + ("\n" + blocco if blocco else ""))
+    tempo = (time.perf_counter() - inizio) * 1000
+    log.append(f"⏱️ {mondi} mondi simulati in {tempo:.0f} ms")
+    return scarto, log, stime
@@ -0,0 +1,235 @@
+# punteggi.py – Caratteristiche delle carte e politiche di scarto come vettori di pesi
+#
+# Una sola passata sulla mano calcola per ogni carta le caratteristiche che
+# usano le regole di scarto (punti, vicini nel seme, compagne di tris,
+# scala lunga, carte giocate dello stesso valore, ...) in un array di byte,
+# una riga per carta. Una politica di scarto è una sequenza di termini
+# (caratteristica, coefficiente, peso, segno, arrotonda): il punteggio di
+# una carta somma i termini nell'ordine dato, con le stesse operazioni in
+# virgola mobile delle regole scritte a mano, quindi con gli stessi
+# risultati al bit. Le spiegazioni si costruiscono a parte, solo se servono.
+
+from array import array
+
+from src.core import INDICE_SEME, INDICE_VALORE, N_CARTE, N_VALORI, PUNTI_VALORE
+
+# Colonne di una riga di caratteristiche
+PUNTI = 0             # punti della carta
+ALTA = 1              # 1 se vale 10 punti o più
+VICINI = 2            # valori adiacenti presenti nello stesso seme (0-2)
+BASSA_SENZA_TRE = 3   # 1 per un 2 o un 4 senza il 3 dello stesso seme
+CENTRALE = 4          # 1 per i valori dal 4 al J
+COMPAGNE = 5          # altre carte dello stesso valore (tris possibile)
+GIOCATE = 6           # carte dello stesso valore già giocate
+ATTACCABILE = 7       # 1 se si attacca a una combinazione del tavolo
+LIBERA_JOLLY = 8      # 1 se non si attacca ma prende un jolly dal tavolo
+ISOLATA_ALTA = 9      # 1 se isolata (né compagne né vicini) e alta
+ISOLATA_BASSA = 10    # 1 se isolata e sotto i 10 punti
+SCALA_LUNGA = 11      # 1 se prolunga due carte consecutive dello stesso seme
+SOLITARIA = 12        # 1 se unica del suo valore e unica del suo seme
+JOLLY = 13            # 1 per un jolly
+N_CARATTERISTICHE = 14
+# Caratteristica fuori dall'array: probabilità che la carta serva
+# all'avversario, passata a valuta() come lista a parte
+PERICOLO = N_CARATTERISTICHE
+
+
+def _riga_valore(v):
+    """Parte di una riga che dipende solo dal valore."""
+    riga = bytearray(N_CARATTERISTICHE)
+    punti = PUNTI_VALORE[v]
+    riga[PUNTI] = punti
+    riga[ALTA] = punti >= 10
+    riga[CENTRALE] = 2 < v < 11
+    return bytes(riga)
+
+
+_RIGHE_VALORE = [_riga_valore(v) for v in range(N_VALORI)]
+_RIGA_JOLLY = bytes(c == JOLLY for c in range(N_CARATTERISTICHE))
+_NESSUNA_GIOCATA = (0,) * N_VALORI
+
+
+def estrai(carte, carte_giocate=None, tavolo=None):
+    """
+    Array di len(carte) × N_CARATTERISTICHE byte, una riga per carta
+    nell'ordine della mano. carte_giocate conta per valore; con un tavolo
+    (src.tavolo.Tavolo) si segnano le carte che vi si attaccano o che
+    liberano un jolly.
+    """
+    giocate = _NESSUNA_GIOCATA
+    if carte_giocate:
+        giocate = [0] * N_VALORI
+        for carta in carte_giocate:
+            v = INDICE_VALORE.get(carta[0])
+            if v is not None:
+                giocate[v] += 1
+    bit = [INDICE_SEME[s] * N_VALORI + INDICE_VALORE[v] if v in INDICE_VALORE else N_CARTE for v, s in carte]
+    return estrai_bit(bit, giocate, tavolo)
+
+
+def estrai_bit(bit, giocate, tavolo=None):
+    """
+    Come estrai, per carte già date come indici di bit (N_CARTE per i
+    jolly, come gli interi di src.state) e con le carte giocate già contate
+    per valore (lista di N_VALORI conteggi).
+    """
+    semi = [0, 0, 0, 0]
+    nel_seme = [0, 0, 0, 0]
+    per_valore = [0] * N_VALORI
+    for b in bit:
+        if b < N_CARTE:
+            s, v = divmod(b, N_VALORI)
+            semi[s] |= 1 << v
+            nel_seme[s] += 1
+            per_valore[v] += 1
+
+    righe = bytearray()
+    for b in bit:
+        if b >= N_CARTE:
+            righe += _RIGA_JOLLY
+            continue
+        s, v = divmod(b, N_VALORI)
+        m = semi[s]
+        # Si scrivono solo le colonne non nulle della riga del valore
+        riga = bytearray(_RIGHE_VALORE[v])
+        vicini = ((m >> (v - 1)) & 1 if v else 0) + ((m >> (v + 1)) & 1)
+        if vicini:
+            riga[VICINI] = vicini
+        if (v == 1 or v == 3) and not m & 4:
+            riga[BASSA_SENZA_TRE] = 1
+        n = per_valore[v]
+        if n > 1:
+            riga[COMPAGNE] = n - 1
+        elif not vicini:
+            riga[ISOLATA_ALTA if PUNTI_VALORE[v] >= 10 else ISOLATA_BASSA] = 1
+        if giocate[v]:
+            riga[GIOCATE] = giocate[v]
+        if 0 < v < N_VALORI - 1 and (
+                (v > 1 and (m >> (v - 2)) & 3 == 3) or (v < N_VALORI - 2 and (m >> (v + 1)) & 3 == 3)):
+            riga[SCALA_LUNGA] = 1
+        if n == 1 and nel_seme[s] == 1:
+            riga[SOLITARIA] = 1
+        if tavolo is not None:
+            if tavolo.attaccabili(b):
+                riga[ATTACCABILE] = 1
+            elif tavolo.recuperabili(b):
+                riga[LIBERA_JOLLY] = 1
+        righe += riga
+    return array("b", righe)
+
+
+def termine(coefficiente, x, peso, arrotonda):
+    """Valore (sempre positivo) di un termine per la caratteristica x."""
+    valore = coefficiente * x
+    if peso is not None:
+        valore = valore * peso
+    if arrotonda:
+        valore = round(valore, 1)
+    return valore
+
+
+# Per sequenza di termini: i valori con segno di ogni termine per x = 0..127
+# (le caratteristiche sono byte con segno) e i punteggi delle righe già
+# viste senza PERICOLO; vedi _tabelle
+_TABELLE = {}
+_MAX_RIGHE_NOTE = 4096
+
+
+def _tabelle(termini):
+    """
+    (tabelle, note): per ogni termine (caratteristica, tabella), dove
+    tabella[x] è il valore già con il segno oppure None per PERICOLO, che
+    non è intero; note è il dict riga (bytes) -> punteggio. Sommare -v
+    equivale al bit a sottrarre v, quindi i punteggi non cambiano.
+    """
+    voce = _TABELLE.get(id(termini))
+    if voce is not None and voce[0] is termini:
+        return voce[1], voce[2]
+    tabelle = []
+    for caratteristica, coefficiente, peso, segno, arrotonda in termini:
+        if caratteristica >= N_CARATTERISTICHE:
+            tabelle.append((caratteristica, None))
+            continue
+        valori = [termine(coefficiente, x, peso, arrotonda) for x in range(128)]
+        tabelle.append((caratteristica, tuple(v if segno > 0 else -v for v in valori)))
+    if len(_TABELLE) > 64:
+        _TABELLE.clear()
+    # Si tiene anche la sequenza, così il suo id non può essere riusato
+    _TABELLE[id(termini)] = (termini, tabelle, {})
+    return tabelle, _TABELLE[id(termini)][2]
+
+
+def valuta(righe, termini, pericoli=None):
+    """
+    Punteggio di ogni carta: i termini con caratteristica non nulla, sommati
+    (segno > 0) o sottratti nell'ordine. pericoli serve solo ai termini su
+    PERICOLO, un valore per carta. Conviene passare sempre la stessa
+    sequenza di termini (una tupla): i valori per termine si calcolano una
+    volta sola e, senza pericoli, il punteggio di una riga già vista si
+    rilegge.
+    """
+    tabelle, note = _tabelle(termini)
+    punteggi = []
+    if pericoli is None:
+        for o in range(0, len(righe), N_CARATTERISTICHE):
+            riga = righe[o:o + N_CARATTERISTICHE].tobytes()
+            score = note.get(riga)
+            if score is None:
+                score = 0
+                for caratteristica, tabella in tabelle:
+                    if tabella is not None:
+                        x = riga[caratteristica]
+                        if x:
+                            score += tabella[x]
+                if len(note) >= _MAX_RIGHE_NOTE:
+                    note.clear()
+                note[riga] = score
+            punteggi.append(score)
+        return punteggi
+    for i, o in enumerate(range(0, len(righe), N_CARATTERISTICHE)):
+        riga = righe[o:o + N_CARATTERISTICHE]
+        score = 0
+        for k, (caratteristica, tabella) in enumerate(tabelle):
+            if tabella is not None:
+                x = riga[caratteristica]
+                if x:
+                    score += tabella[x]
+                continue
+            x = pericoli[i]
+            if x:
+                _, coefficiente, peso, segno, arrotonda = termini[k]
+                valore = termine(coefficiente, x, peso, arrotonda)
+                score = score + valore if segno > 0 else score - valore
+        punteggi.append(score)
+    return punteggi
+
+
+def scegli(carte, punteggi, massimo=False):
+    """Prima carta col punteggio più basso (o più alto con massimo=True)."""
+    segno = -1 if massimo else 1
+    migliore = 0
+    for i in range(1, len(punteggi)):
+        if segno * punteggi[i] < segno * punteggi[migliore]:
+            migliore = i
+    return carte[migliore]
+
+
+# === Politiche storiche di src.logic (si scarta il punteggio più basso) ===
+
+# Quella in uso: punti, vicini, valori centrali, tris, isolamento e scala lunga
+TERMINI_LOGIC = (
+    (PUNTI, 1, None, 1, False),
+    (VICINI, 7, None, -1, False),
+    (CENTRALE, 2, None, -1, False),
+    (COMPAGNE, 4, None, -1, False),
+    (ISOLATA_ALTA, 2, None, 1, False),
+    (ISOLATA_BASSA, 2, None, 1, False),
+    (SCALA_LUNGA, 5, None, -1, False),
+)
+
+# La prima versione: solo punti, vicini e carte solitarie
+TERMINI_LOGIC_SEMPLICE = (
+    (PUNTI, 1, None, 1, False),
+    (VICINI, 5, None, -1, False),
+    (SOLITARIA, 3, None, -1, False),
+)
@@ -0,0 +1,440 @@
+# servizio.py – Servizio di analisi asincrono su HTTP e WebSocket in locale
+#
+#   python -m src.servizio [--host 127.0.0.1] [--porta 8040] [--workers 4]
+#                          [--max-in-volo 8] [--max-attesa 256]
+#
+# Endpoint (JSON in entrata e in uscita):
+#   POST /combinazioni  {"mano"}                         -> genera_combinazioni
+#   POST /apertura      {"mano"}                         -> scegli_apertura
+#   POST /scarto        {"mano", "fase", "giocate", "log"} -> suggerisci_scarto
+#   GET  /stato                                          -> contatori del servizio
+#   GET  /ws            WebSocket: messaggi {"id", "metodo", ...} con metodo
+#                       "combinazioni", "apertura" o "scarto"; le risposte
+#                       {"id", "risultato"} o {"id", "errore"} arrivano
+#                       appena pronte, anche fuori ordine.
+# La mano è una stringa "7♥ 8♥ JOLLY ..." o una lista di carte, letta e
+# controllata da src.cli.leggi_carte (al più MAX_CARTE carte, due copie per
+# carta, quattro jolly): le richieste non valide ricevono 400.
+#
+# Le analisi girano in un ProcessPoolExecutor. Richieste identiche già in
+# corso aspettano lo stesso calcolo, i risultati restano in una
+# CacheAnalisi condivisa da tutti i client. Al pool vanno al più
+# max_in_volo analisi alla volta; oltre max_attesa analisi in corso o in
+# coda il servizio risponde 503 (o "occupato" sul WebSocket) invece di
+# accumulare lavoro.
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import signal
+import sys
+from http import HTTPStatus
+
+from src.logic import genera_combinazioni
+from src.cache import CacheAnalisi, analizza_apertura, suggerisci_scarto
+from src.cli import FASI, leggi_carte
+
+METODI = ("combinazioni", "apertura", "scarto")
+# Analisi passate al pool per worker: tengono i processi occupati senza
+# allungarne la coda
+IN_VOLO_PER_WORKER = 2
+MAX_ATTESA = 256
+MAX_VOCI_CACHE = 8192
+# Byte massimi di un corpo HTTP o di un messaggio WebSocket
+MAX_CORPO = 64 * 1024
+# Messaggi WebSocket in corso per connessione: oltre, non si legge il socket
+MAX_WS_IN_VOLO = 32
+# Connessioni in attesa di accept: i client di bench.carico arrivano a 256 insieme
+CODA_CONNESSIONI = 1024
+GUID_WEBSOCKET = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class Occupato(Exception):
+    """Troppe analisi in corso o in coda: il client riprovi più tardi."""
+
+
+def _testo(carta):
+    return "JOLLY" if carta[0] == "JOLLY" else f"{carta[0]}{carta[1]}"
+
+
+def leggi_richiesta(metodo, dati):
+    """
+    Richiesta JSON -> chiave (metodo, mano, fase, giocate, log), con tuple
+    al posto delle liste: identifica la richiesta per cache e
+    coalescenza ed è l'argomento di calcola(). Solleva ValueError.
+    """
+    if metodo not in METODI:
+        raise ValueError(f"Metodo sconosciuto: {metodo}")
+    if not isinstance(dati, dict) or "mano" not in dati:
+        raise ValueError("Campo 'mano' mancante")
+    mano = tuple(leggi_carte(dati["mano"]))
+    if not mano:
+        raise ValueError("Mano vuota")
+    if metodo != "scarto":
+        return metodo, mano, None, (), False
+    fase = dati.get("fase", "centrale")
+    if fase not in FASI:
+        raise ValueError(f"Fase sconosciuta: {fase}")
+    giocate = tuple(c for c in leggi_carte(dati.get("giocate", []), massimo=None) if c[0] != "JOLLY")
+    return metodo, mano, fase, giocate, bool(dati.get("log", False))
+
+
+def calcola(metodo, mano, fase, giocate, log):
+    """Esegue l'analisi (anche in un processo del pool) e restituisce il dict JSON della risposta."""
+    mano = list(mano)
+    if metodo == "combinazioni":
+        return {"combinazioni": [
+            {"tipo": c["tipo"], "carte": [_testo(x) for x in c["carte"]], "punti": c["punti"]}
+            for c in genera_combinazioni(mano)
+        ]}
+    if metodo == "apertura":
+        apertura = analizza_apertura(mano)
+        return {
+            "puo_aprire": apertura["puo_aprire"],
+            "punti": apertura["punti"],
+            "combinazioni": [[_testo(c) for c in comb["carte"]] for comb in apertura["combinazioni"]],
+            "carte_rimaste": [_testo(c) for c in apertura["carte_rimaste"]],
+        }
+    scarto, righe_log = suggerisci_scarto(mano, carte_giocate=list(giocate), fase=fase, spiega=log)
+    risultato = {"scarto": _testo(scarto) if scarto is not None else None}
+    if log:
+        risultato["log"] = list(righe_log)
+    return risultato
+
+
+class Servizio:
+    """
+    Stato condiviso dalle connessioni: pool, cache dei risultati, analisi in
+    corso per chiave e contatori. workers=0 calcola nel ciclo di eventi
+    (utile per il debug, blocca le altre richieste).
+    """
+
+    def __init__(self, workers=None, max_in_volo=None, max_attesa=MAX_ATTESA, cache=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_in_volo = max_in_volo or max(1, self.workers) * IN_VOLO_PER_WORKER
+        self.max_attesa = max_attesa
+        self.cache = CacheAnalisi(max_voci=MAX_VOCI_CACHE) if cache is None else cache
+        self.pool = None
+        self.in_corso = {}
+        self._posti = None
+        self.conteggi = {"richieste": 0, "cache": 0, "unite": 0, "calcolate": 0, "rifiutate": 0, "errori": 0}
+
+    def avvia(self):
+        if self.workers:
+            # Importati qui: multiprocessing da solo raddoppia il tempo di avvio
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Il pool crea i processi alla prima richiesta: con fork
+            # erediterebbero i socket aperti in quel momento e le connessioni
+            # chiuse qui resterebbero aperte nei worker
+            metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context(metodo))
+        self._posti = asyncio.Semaphore(self.max_in_volo)
+
+    def chiudi(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def statistiche(self):
+        return dict(self.conteggi, in_corso=len(self.in_corso), workers=self.workers,
+                    max_in_volo=self.max_in_volo, max_attesa=self.max_attesa,
+                    cache_risultati=self.cache.statistiche())
+
+    async def richiedi(self, metodo, dati):
+        """
+        Risultato di una richiesta: dalla cache, dal calcolo identico già in
+        corso o da un nuovo calcolo. Solleva ValueError per richieste non
+        valide e Occupato se il servizio è saturo.
+        """
+        chiave = leggi_richiesta(metodo, dati)
+        self.conteggi["richieste"] += 1
+        risultato = self.cache.get(chiave)
+        if risultato is not None:
+            self.conteggi["cache"] += 1
+            return risultato
+        compito = self.in_corso.get(chiave)
+        if compito is not None:
+            self.conteggi["unite"] += 1
+        else:
+            if len(self.in_corso) >= self.max_attesa:
+                self.conteggi["rifiutate"] += 1
+                raise Occupato()
+            compito = asyncio.ensure_future(self._calcola(chiave))
+            self.in_corso[chiave] = compito
+            compito.add_done_callback(lambda c: self._fine(chiave, c))
+        # Chi si disconnette non annulla il calcolo degli altri
+        return await asyncio.shield(compito)
+
+    async def _calcola(self, chiave):
+        async with self._posti:
+            if self.pool is None:
+                risultato = calcola(*chiave)
+            else:
+                risultato = await asyncio.get_running_loop().run_in_executor(self.pool, calcola, *chiave)
+        self.conteggi["calcolate"] += 1
+        self.cache.put(chiave, risultato)
+        return risultato
+
+    def _fine(self, chiave, compito):
+        del self.in_corso[chiave]
+        if not compito.cancelled() and compito.exception() is not None:
+            self.conteggi["errori"] += 1
+
+    # === Risposte ===
+
+    async def rispondi(self, metodo, dati):
+        """(stato HTTP, corpo JSON) per una richiesta di analisi."""
+        try:
+            return 200, await self.richiedi(metodo, dati)
+        except ValueError as e:
+            return 400, {"errore": str(e)}
+        except Occupato:
+            return 503, {"errore": "occupato"}
+        except Exception as e:
+            return 500, {"errore": f"{type(e).__name__}: {e}"}
+
+    async def gestisci(self, reader, writer):
+        """Una connessione: richieste HTTP in keep-alive finché il client non chiude o passa a WebSocket."""
+        try:
+            while True:
+                try:
+                    richiesta = await leggi_http(reader)
+                except ValueError as e:
+                    scrivi_http(writer, 400, {"errore": str(e)}, False)
+                    break
+                if richiesta is None:
+                    break
+                verbo, percorso, intestazioni, corpo = richiesta
+                if percorso == "/ws" and intestazioni.get("upgrade", "").lower() == "websocket":
+                    await self.websocket(reader, writer, intestazioni)
+                    break
+                stato, risposta = await self.instrada(verbo, percorso, corpo)
+                resta = intestazioni.get("connection", "").lower() != "close"
+                scrivi_http(writer, stato, risposta, resta)
+                await writer.drain()
+                if not resta:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def instrada(self, verbo, percorso, corpo):
+        if percorso == "/stato":
+            if verbo != "GET":
+                return 405, {"errore": "Usare GET"}
+            return 200, self.statistiche()
+        metodo = percorso.strip("/")
+        if metodo not in METODI:
+            return 404, {"errore": f"Percorso sconosciuto: {percorso}"}
+        if verbo != "POST":
+            return 405, {"errore": "Usare POST"}
+        try:
+            dati = json.loads(corpo or b"{}")
+        except ValueError as e:
+            return 400, {"errore": f"JSON non valido: {e}"}
+        return await self.rispondi(metodo, dati)
+
+    async def websocket(self, reader, writer, intestazioni):
+        chiave = intestazioni.get("sec-websocket-key")
+        if not chiave:
+            scrivi_http(writer, 400, {"errore": "Sec-WebSocket-Key mancante"}, False)
+            return
+        accetta = base64.b64encode(hashlib.sha1((chiave + GUID_WEBSOCKET).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accetta}\r\n\r\n").encode())
+
+        posti = asyncio.Semaphore(MAX_WS_IN_VOLO)
+        scrittura = asyncio.Lock()
+        compiti = set()
+
+        async def invia(opcode, dati):
+            async with scrittura:
+                scrivi_frame(writer, opcode, dati)
+                await writer.drain()
+
+        async def rispondi_messaggio(testo):
+            try:
+                try:
+                    messaggio = json.loads(testo)
+                    metodo = messaggio.get("metodo")
+                except (ValueError, AttributeError):
+                    messaggio, metodo = {}, None
+                stato, risposta = await self.rispondi(metodo, messaggio) if metodo is not None else (
+                    400, {"errore": "Messaggio senza 'metodo'"})
+                uscita = {"id": messaggio.get("id") if isinstance(messaggio, dict) else None}
+                uscita.update({"risultato": risposta} if stato == 200 else dict(risposta, stato=stato))
+                await invia(0x1, json.dumps(uscita, ensure_ascii=False).encode())
+            except ConnectionError:
+                pass
+            finally:
+                posti.release()
+
+        try:
+            while True:
+                opcode, dati = await leggi_frame(reader)
+                if opcode == 0x8:
+                    await invia(0x8, dati[:2])
+                    break
+                if opcode == 0x9:
+                    await invia(0xA, dati)
+                elif opcode == 0x1:
+                    # Con troppi messaggi in corso si smette di leggere:
+                    # il client rallenta per il controllo di flusso di TCP
+                    await posti.acquire()
+                    compito = asyncio.ensure_future(rispondi_messaggio(dati.decode("utf-8", "replace")))
+                    compiti.add(compito)
+                    compito.add_done_callback(compiti.discard)
+        except ValueError:
+            await invia(0x8, (1009).to_bytes(2, "big"))
+        finally:
+            for compito in compiti:
+                compito.cancel()
+
+
+# === Protocollo ===
+
+async def leggi_http(reader):
+    """
+    Legge una richiesta HTTP/1.1: (verbo, percorso, intestazioni, corpo)
+    con le intestazioni in minuscolo, None se il client ha chiuso.
+    Solleva ValueError per richieste non valide o troppo grandi.
+    """
+    try:
+        testa = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise ValueError("Richiesta incompleta") from None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Intestazioni troppo lunghe") from None
+    righe = testa.decode("latin-1").split("\r\n")
+    try:
+        verbo, percorso, _ = righe[0].split(" ", 2)
+    except ValueError:
+        raise ValueError("Riga di richiesta non valida") from None
+    intestazioni = {}
+    for riga in righe[1:]:
+        if ":" in riga:
+            nome, valore = riga.split(":", 1)
+            intestazioni[nome.strip().lower()] = valore.strip()
+    try:
+        lunghezza = int(intestazioni.get("content-length", 0))
+    except ValueError:
+        raise ValueError("Content-Length non valido") from None
+    if lunghezza > MAX_CORPO:
+        raise ValueError("Corpo troppo grande")
+    corpo = await reader.readexactly(lunghezza) if lunghezza else b""
+    return verbo.upper(), percorso.split("?", 1)[0], intestazioni, corpo
+
+
+def scrivi_http(writer, stato, risposta, resta=True):
+    corpo = json.dumps(risposta, ensure_ascii=False).encode()
+    testa = [
+        f"HTTP/1.1 {stato} {HTTPStatus(stato).phrase}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(corpo)}",
+        "Connection: keep-alive" if resta else "Connection: close",
+    ]
+    if stato == 503:
+        testa.append("Retry-After: 1")
+    writer.write(("\r\n".join(testa) + "\r\n\r\n").encode() + corpo)
+
+
+async def leggi_frame(reader):
+    """
+    Legge un messaggio WebSocket (riunendo i frammenti): (opcode, dati).
+    Solleva ValueError oltre MAX_CORPO byte.
+    """
+    opcode_messaggio = None
+    parti = []
+    totale = 0
+    while True:
+        b1, b2 = await reader.readexactly(2)
+        opcode = b1 & 0x0F
+        n = b2 & 0x7F
+        if n == 126:
+            n = int.from_bytes(await reader.readexactly(2), "big")
+        elif n == 127:
+            n = int.from_bytes(await reader.readexactly(8), "big")
+        totale += n
+        if totale > MAX_CORPO:
+            raise ValueError("Messaggio troppo grande")
+        maschera = await reader.readexactly(4) if b2 & 0x80 else None
+        dati = await reader.readexactly(n)
+        if maschera and n:
+            ripetuta = (maschera * (n // 4 + 1))[:n]
+            dati = (int.from_bytes(dati, "big") ^ int.from_bytes(ripetuta, "big")).to_bytes(n, "big")
+        if opcode >= 0x8:
+            # I frame di controllo possono stare tra i frammenti di un messaggio
+            return opcode, dati
+        if opcode_messaggio is None:
+            opcode_messaggio = opcode
+        parti.append(dati)
+        if b1 & 0x80:
+            return opcode_messaggio, b"".join(parti)
+
+
+def scrivi_frame(writer, opcode, dati):
+    n = len(dati)
+    if n < 126:
+        testa = bytes((0x80 | opcode, n))
+    elif n < 1 << 16:
+        testa = bytes((0x80 | opcode, 126)) + n.to_bytes(2, "big")
+    else:
+        testa = bytes((0x80 | opcode, 127)) + n.to_bytes(8, "big")
+    writer.write(testa + dati)
+
+
+async def servi(host="127.0.0.1", porta=8040, pronto=None, **opzioni):
+    """
+    Avvia il servizio e risponde finché non viene annullato. pronto, se
+    dato, è chiamato con la porta effettiva (utile con porta=0).
+    """
+    servizio = Servizio(**opzioni)
+    servizio.avvia()
+    try:
+        # SIGTERM (es. da bench.carico) chiude come Ctrl+C, pool compreso
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows
+    try:
+        server = await asyncio.start_server(servizio.gestisci, host, porta, limit=MAX_CORPO,
+                                            backlog=CODA_CONNESSIONI)
+        porta = server.sockets[0].getsockname()[1]
+        if pronto is not None:
+            pronto(porta)
+        async with server:
+            await server.serve_forever()
+    finally:
+        servizio.chiudi()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servizio di analisi su HTTP e WebSocket in locale")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8040, help="0 = porta libera qualsiasi")
+    parser.add_argument("--workers", type=int, default=None, help="processi di analisi (0 = nessun pool)")
+    parser.add_argument("--max-in-volo", type=int, default=None, help="analisi passate al pool insieme")
+    parser.add_argument("--max-attesa", type=int, default=MAX_ATTESA,
+                        help="analisi in corso o in coda oltre cui si risponde 503")
+    args = parser.parse_args(argv)
+
+    def pronto(porta):
+        print(f"🌐 Servizio in ascolto su http://{args.host}:{porta}", flush=True)
+
+    try:
+        asyncio.run(servi(args.host, args.porta, pronto, workers=args.workers,
+                          max_in_volo=args.max_in_volo, max_attesa=args.max_attesa))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,296 @@
-# Riservato per la gestione dello stato di gioco
+# state.py – Stato di gioco e motore headless per partite di Scala 40
+
+import random
+from src.core import SEMI, VALORI, N_VALORI, N_CARTE, PUNTI_VALORE, INDICE_VALORE, bit_carta, maschera_jolly
+from src.tavolo import Tavolo
+
+# Carte come interi: 0..51 le naturali (stesso indice dei bit in src.core),
+# JOLLY_ID per tutti i jolly. Il mazzo è 2×52 + 4 jolly.
+JOLLY_ID = N_CARTE
+N_MAZZI = 2
+N_JOLLY = 4
+CARTE_IN_MANO = 13
+PENALITA_JOLLY = 25
+MAX_TURNI = 200
+
+# Posizioni delle scale: 0..13, la 13 è l'asso alto
+POSIZIONE_ASSO_ALTO = N_VALORI
+
+
+def carta_a_tupla(c, k=0):
+    """Intero -> tupla (valore, seme); k distingue i jolly della stessa mano."""
+    if c == JOLLY_ID:
+        return ("JOLLY", f"J{k}")
+    return (VALORI[c % N_VALORI], SEMI[c // N_VALORI])
+
+
+def tupla_a_carta(carta):
+    return JOLLY_ID if carta[0] == "JOLLY" else bit_carta(carta)
+
+
+def mano_a_tuple(mano):
+    """Lista di interi -> lista di tuple, con jolly distinti."""
+    tuple_ = []
+    k = 0
+    for c in mano:
+        tuple_.append(carta_a_tupla(c, k))
+        if c == JOLLY_ID:
+            k += 1
+    return tuple_
+
+
+def mano_a_maschera(mano):
+    """Lista di interi -> (maschera, doppie) di src.core, senza passare dalle tuple."""
+    maschera = 0
+    doppie = 0
+    jolly = 0
+    for c in mano:
+        if c == JOLLY_ID:
+            jolly += 1
+        else:
+            b = 1 << c
+            doppie |= maschera & b
+            maschera |= b
+    return maschera | maschera_jolly(jolly), doppie
+
+
+def punti_residui(mano):
+    """Punti rimasti in mano a fine partita (il jolly pesa PENALITA_JOLLY)."""
+    return sum(PENALITA_JOLLY if c == JOLLY_ID else PUNTI_VALORE[c % N_VALORI] for c in mano)
+
+
+def nuovo_mazzo(rng):
+    mazzo = list(range(N_CARTE)) * N_MAZZI + [JOLLY_ID] * N_JOLLY
+    rng.shuffle(mazzo)
+    return mazzo
+
+
+def combinazione_da_tuple(carte):
+    """
+    Converte una combinazione (lista di tuple, jolly al loro posto) nella
+    forma usata sul tavolo:
+        scala: {'tipo': 'scala', 'seme': s, 'inizio': p, 'fine': p, 'carte': [...]}
+        tris:  {'tipo': 'tris', 'valore': v, 'semi': maschera semi, 'carte': [...]}
+    """
+    naturali = [(i, c) for i, c in enumerate(carte) if c[0] != "JOLLY"]
+    ids = [tupla_a_carta(c) for c in carte]
+    valori = {c[0] for _, c in naturali}
+    if len(valori) == 1 and len({c[1] for _, c in naturali}) == len(naturali) and len(naturali) > 1:
+        semi = 0
+        for _, c in naturali:
+            semi |= 1 << SEMI.index(c[1])
+        return {"tipo": "tris", "valore": INDICE_VALORE[naturali[0][1][0]], "semi": semi, "carte": ids}
+    # Scala: l'asso è alto se la scala contiene figure
+    alto = any(c[0] in ("J", "Q", "K") for _, c in naturali)
+    i, c = naturali[0]
+    p = INDICE_VALORE[c[0]]
+    if p == 0 and alto:
+        p = POSIZIONE_ASSO_ALTO
+    inizio = p - i
+    return {
+        "tipo": "scala",
+        "seme": SEMI.index(c[1]),
+        "inizio": inizio,
+        "fine": inizio + len(carte) - 1,
+        "carte": ids,
+    }
+
+
+class Partita:
+    """
+    Stato compatto di una partita a due o più giocatori. Le mani sono liste
+    di interi, il tavolo un src.tavolo.Tavolo; clona() copia solo
+    queste strutture, così le simulazioni possono partire da uno stato
+    comune senza ricreare nulla.
+    """
+
+    __slots__ = ("mazzo", "scarti", "mani", "aperto", "tavolo", "turno",
+                 "giocatore", "vincitore", "finita", "rng", "turno_apertura")
+
+    def __init__(self, n_giocatori=2, seed=None, rng=None):
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.mazzo = nuovo_mazzo(self.rng)
+        self.mani = [[self.mazzo.pop() for _ in range(CARTE_IN_MANO)] for _ in range(n_giocatori)]
+        self.scarti = [self.mazzo.pop()]
+        self.aperto = [False] * n_giocatori
+        self.turno_apertura = [None] * n_giocatori
+        self.tavolo = Tavolo()
+        self.turno = 0
+        self.giocatore = 0
+        self.vincitore = None
+        self.finita = False
+
+    @classmethod
+    def da_mani(cls, mani, mazzo, scarti, aperto=None, tavolo=None, giocatore=0, rng=None):
+        """Costruisce uno stato a partire da mani e mazzo già noti (es. per simulazioni)."""
+        partita = cls.__new__(cls)
+        partita.rng = rng if rng is not None else random.Random()
+        partita.mani = [list(m) for m in mani]
+        partita.mazzo = list(mazzo)
+        partita.scarti = list(scarti)
+        partita.aperto = list(aperto) if aperto is not None else [False] * len(mani)
+        partita.turno_apertura = [0 if a else None for a in partita.aperto]
+        partita.tavolo = Tavolo(tavolo or [])
+        partita.turno = 0
+        partita.giocatore = giocatore
+        partita.vincitore = None
+        partita.finita = False
+        return partita
+
+    def clona(self, rng=None):
+        nuova = Partita.__new__(Partita)
+        nuova.rng = rng if rng is not None else random.Random(self.rng.random())
+        nuova.mazzo = self.mazzo[:]
+        nuova.scarti = self.scarti[:]
+        nuova.mani = [m[:] for m in self.mani]
+        nuova.aperto = self.aperto[:]
+        nuova.turno_apertura = self.turno_apertura[:]
+        nuova.tavolo = self.tavolo.clona()
+        nuova.turno = self.turno
+        nuova.giocatore = self.giocatore
+        nuova.vincitore = self.vincitore
+        nuova.finita = self.finita
+        return nuova
+
+    # === Mosse ===
+
+    def pesca(self, dagli_scarti=False):
+        mano = self.mani[self.giocatore]
+        if dagli_scarti and self.scarti:
+            mano.append(self.scarti.pop())
+            return mano[-1]
+        if not self.mazzo:
+            # Si rimescolano gli scarti tranne quello in cima
+            cima = self.scarti.pop() if self.scarti else None
+            self.mazzo = self.scarti
+            self.rng.shuffle(self.mazzo)
+            self.scarti = [cima] if cima is not None else []
+        if not self.mazzo:
+            self.finita = True
+            return None
+        mano.append(self.mazzo.pop())
+        return mano[-1]
+
+    def _togli(self, carte):
+        """Toglie le carte dalla mano del giocatore di turno; False se mancano."""
+        mano = self.mani[self.giocatore]
+        tolte = []
+        for c in carte:
+            if c in mano:
+                mano.remove(c)
+                tolte.append(c)
+            else:
+                mano.extend(tolte)
+                return False
+        return True
+
+    def cala(self, combinazioni):
+        """
+        Cala le combinazioni (liste di tuple) dalla mano del giocatore di
+        turno. Se non ha ancora aperto servono almeno 40 punti. Deve restare
+        almeno una carta per lo scarto. Restituisce True se calate.
+        """
+        g = self.giocatore
+        nuove = [combinazione_da_tuple(c) for c in combinazioni]
+        ids = [c for combo in nuove for c in combo["carte"]]
+        if len(ids) >= len(self.mani[g]):
+            return False
+        if not self.aperto[g]:
+            punti = sum(PUNTI_VALORE[c % N_VALORI] for c in ids if c != JOLLY_ID)
+            if punti < 40:
+                return False
+        if not self._togli(ids):
+            return False
+        for combo in nuove:
+            self.tavolo.aggiungi(combo)
+        if not self.aperto[g]:
+            self.aperto[g] = True
+            self.turno_apertura[g] = self.turno
+        return True
+
+    def attaccabili(self, c):
+        """Indici delle combinazioni del tavolo a cui la carta naturale c si attacca."""
+        return self.tavolo.attaccabili(c)
+
+    def attacca(self, c, indice):
+        """Attacca la carta c della mano alla combinazione del tavolo indicata."""
+        mano = self.mani[self.giocatore]
+        if not self.aperto[self.giocatore] or c not in mano or len(mano) <= 1:
+            return False
+        if not self.tavolo.attacca(c, indice):
+            return False
+        mano.remove(c)
+        return True
+
+    def sostituisci_jolly(self, c, indice, posizione):
+        """Mette la carta c della mano al posto del jolly indicato del tavolo e prende il jolly."""
+        mano = self.mani[self.giocatore]
+        if not self.aperto[self.giocatore] or c not in mano:
+            return False
+        if not self.tavolo.sostituisci_jolly(c, indice, posizione):
+            return False
+        mano.remove(c)
+        mano.append(JOLLY_ID)
+        return True
+
+    def scarta(self, c):
+        """Scarta c e passa il turno; se la mano resta vuota il giocatore chiude."""
+        mano = self.mani[self.giocatore]
+        mano.remove(c)
+        self.scarti.append(c)
+        if not mano:
+            self.vincitore = self.giocatore
+            self.finita = True
+            return
+        self.giocatore = (self.giocatore + 1) % len(self.mani)
+        if self.giocatore == 0:
+            self.turno += 1
+            if self.turno >= MAX_TURNI:
+                self.finita = True
+
+    def risultato(self):
+        return {
+            "vincitore": self.vincitore,
+            "turni": self.turno,
+            "turno_apertura": self.turno_apertura[:],
+            "punti_residui": [punti_residui(m) for m in self.mani],
+        }
+
+
+def gioca_turno(partita, strategia):
+    """Gioca un turno completo del giocatore corrente con la strategia data."""
+    g = partita.giocatore
+    cima = partita.scarti[-1] if partita.scarti else None
+    dagli_scarti = (
+        cima is not None
+        and partita.aperto[g]
+        and strategia.pesca_scarto(partita, cima)
+    )
+    if partita.pesca(dagli_scarti) is None:
+        return
+
+    if not partita.aperto[g]:
+        apertura = strategia.apertura(partita)
+        if apertura:
+            partita.cala(apertura)
+    else:
+        nuove = strategia.combinazioni(partita)
+        if nuove:
+            partita.cala(nuove)
+
+    if partita.aperto[g]:
+        for c, indice in strategia.attacchi(partita):
+            partita.attacca(c, indice)
+
+    partita.scarta(strategia.scarto(partita))
+
+
+def gioca_partita(strategie, seed=None, rng=None):
+    """
+    Gioca una partita completa; strategie[i] muove per il giocatore i.
+    Restituisce il dict di Partita.risultato().
+    """
+    partita = Partita(len(strategie), seed=seed, rng=rng)
+    while not partita.finita:
+        gioca_turno(partita, strategie[partita.giocatore])
+    return partita.risultato()
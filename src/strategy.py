@@ -1 +1,161 @@
-# Riservato per le strategie di gioco
+# strategy.py – Strategie di gioco per il motore headless (src.state)
+
+from src.core import SEMI, N_VALORI, MASCHERA_CARTE, punti_maschera, jolly_in_maschera, maschera_seme
+from src.logic import genera_combinazioni_maschera, scegli_apertura_maschera, combinazione_a_carte
+from src import logic_log, punteggi
+from src.state import JOLLY_ID, carta_a_tupla, mano_a_maschera, mano_a_tuple, tupla_a_carta
+from src.tabelle import migliore_scale
+
+
+class Strategia:
+    """
+    Interfaccia delle strategie. Ogni metodo riceve la Partita e decide per
+    il giocatore di turno; le combinazioni sono liste di tuple come in
+    src.logic, le carte singole sono gli interi di src.state.
+    """
+
+    def pesca_scarto(self, partita, carta):
+        """True per prendere la carta in cima agli scarti invece del mazzo."""
+        return False
+
+    def apertura(self, partita):
+        """Combinazioni per aprire (almeno 40 punti), o lista vuota."""
+        return []
+
+    def combinazioni(self, partita):
+        """Nuove combinazioni da calare dopo l'apertura."""
+        return []
+
+    def attacchi(self, partita):
+        """Coppie (carta, indice combinazione del tavolo) da attaccare."""
+        return []
+
+    def scarto(self, partita):
+        """Carta da scartare."""
+        raise NotImplementedError
+
+
+def fase_partita(partita):
+    """Fase per FASE_PESI: inizio nei primi turni, finale se un avversario ha poche carte."""
+    g = partita.giocatore
+    if any(len(m) <= 4 for i, m in enumerate(partita.mani) if i != g):
+        return "finale"
+    if partita.turno < 5:
+        return "inizio"
+    return "centrale"
+
+
+class StrategiaBase(Strategia):
+    """
+    Strategia di riferimento: apre con scegli_apertura, cala le combinazioni
+    più ricche, attacca tutto ciò che può e scarta con `scarto`, che può
+    essere logic_log.suggerisci_scarto (default) o una delle varianti di
+    src.logic che restituiscono solo la carta. parametri (es.
+    {'fase_pesi': ..., 'coefficienti': ...}) va a logic_log.suggerisci_scarto.
+    """
+
+    # Voci di _memo oltre le quali si riparte da zero
+    MAX_MEMO = 20000
+
+    def __init__(self, scarto=None, parametri=None):
+        self.funzione_scarto = scarto or logic_log.suggerisci_scarto
+        self.parametri = parametri or {}
+        # Combinazioni per valore e per seme, riusate tra turni e partite:
+        # da un turno all'altro cambiano poche carte, quindi pochi gruppi
+        self._memo = {}
+
+    def _combinazioni(self, maschera):
+        if len(self._memo) > self.MAX_MEMO:
+            self._memo.clear()
+        return genera_combinazioni_maschera(maschera, memo=self._memo)
+
+    def pesca_scarto(self, partita, carta):
+        return bool(partita.attaccabili(carta))
+
+    def apertura(self, partita):
+        maschera, _ = mano_a_maschera(partita.mani[partita.giocatore])
+        combinazioni = self._combinazioni(maschera)
+        # Limite veloce: se anche tutte le carte coinvolte non fanno 40 punti
+        # è inutile chiamare il risolutore. Le scale contano al più il
+        # migliore valore per seme della tabella precalcolata.
+        coperte = 0
+        coperte_tris = 0
+        for c in combinazioni:
+            coperte |= c["maschera"]
+            if c["tipo"] == "tris":
+                coperte_tris |= c["maschera"]
+        n_jolly = jolly_in_maschera(maschera)
+        limite_scale = sum(migliore_scale(maschera_seme(maschera, s), n_jolly) for s in range(len(SEMI)))
+        limite = min(punti_maschera(coperte & MASCHERA_CARTE), limite_scale + punti_maschera(coperte_tris))
+        if limite < 40:
+            return []
+        apertura = scegli_apertura_maschera(combinazioni, maschera)
+        if not apertura["puo_aprire"]:
+            return []
+        jolly = [carta_a_tupla(JOLLY_ID, k) for k in range(n_jolly)]
+        scelte = []
+        usati = 0
+        for c in apertura["combinazioni"]:
+            scelte.append(combinazione_a_carte(c, jolly[usati:]))
+            usati += c["jolly"]
+        return scelte
+
+    def combinazioni(self, partita):
+        mano = partita.mani[partita.giocatore]
+        maschera, doppie = mano_a_maschera(mano)
+        # Copie libere come in logic._risolvi_apertura: libere ha le carte con
+        # almeno una copia libera, libere_due quelle con due; con due mazzi una
+        # carta doppia può servire a una seconda combinazione, anche uguale
+        libere = maschera & MASCHERA_CARTE
+        libere_due = doppie
+        jolly_liberi = jolly_in_maschera(maschera)
+        jolly = [carta_a_tupla(JOLLY_ID, k) for k in range(jolly_liberi)]
+        restanti = len(mano)
+        scelte = []
+        for c in sorted(self._combinazioni(maschera), key=lambda c: -c["punti"]):
+            carte = c["maschera"]
+            # Deve restare almeno una carta da scartare
+            while restanti > c["lunghezza"] and not carte & ~libere and c["jolly"] <= jolly_liberi:
+                scelte.append(combinazione_a_carte(c, jolly))
+                libere = libere & ~carte | libere_due & carte
+                libere_due &= ~carte
+                jolly_liberi -= c["jolly"]
+                restanti -= c["lunghezza"]
+        return scelte
+
+    def attacchi(self, partita):
+        mano = partita.mani[partita.giocatore]
+        trovato = True
+        while trovato and len(mano) > 1:
+            trovato = False
+            for c in mano:
+                if c == JOLLY_ID:
+                    continue
+                indici = partita.attaccabili(c)
+                if indici:
+                    yield c, indici[0]
+                    trovato = True
+                    break
+
+    def scarto(self, partita):
+        g = partita.giocatore
+        carte = [c for c in partita.mani[g] if c != JOLLY_ID]
+        if not carte:
+            return JOLLY_ID  # solo jolly: le varianti di src.logic non li valutano
+        if self.funzione_scarto is logic_log.suggerisci_scarto:
+            # Come logic_log.suggerisci_scarto(spiega=False), ma sugli interi
+            # della partita: niente conversioni in tuple a ogni turno
+            giocate = [0] * N_VALORI
+            for c in partita.scarti:
+                if c != JOLLY_ID:
+                    giocate[c % N_VALORI] += 1
+            # Il tavolo conta solo se un avversario può già attaccarci
+            avversario_aperto = any(a for i, a in enumerate(partita.aperto) if i != g)
+            righe = punteggi.estrai_bit(carte, giocate, partita.tavolo if avversario_aperto else None)
+            valutazioni = logic_log.valuta_righe(carte, righe, fase_partita(partita), spiega=False,
+                                                 **self.parametri)
+            return punteggi.scegli(carte, [score for _, score, _ in valutazioni], massimo=True)
+        carta = self.funzione_scarto(mano_a_tuple(partita.mani[g]))
+        if isinstance(carta[0], tuple):
+            carta = carta[0]
+        return tupla_a_carta(carta)
@@ -0,0 +1,280 @@
+# tabelle.py – Tabelle precalcolate delle scale per configurazione di seme
+#
+#   python -m src.tabelle    rigenera src/tabelle_scale.bin e stampa tempi e memoria
+#
+# Le scale di un seme dipendono solo dai 13 bit dei valori presenti e dai
+# jolly ammessi: per ogni (jolly, superflui) una tabella elenca, per ognuna
+# delle 8192 maschere, le scale già pronte e il miglior punteggio ottenibile
+# con scale disgiunte del seme.
+
+import array
+import os
+import sys
+import time
+import zlib
+
+from src.core import N_VALORI, MASCHERA_SEME, punti_maschera
+
+N_MASCHERE = 1 << N_VALORI
+MAX_JOLLY_TABELLA = 2
+FILE_TABELLE = os.path.join(os.path.dirname(__file__), "tabelle_scale.bin")
+# Nel file vanno le tabelle usate di default (max_jolly=1, o 0 senza jolly in
+# mano); le altre si costruiscono al primo uso
+TABELLE_SALVATE = ((0, False), (1, False), (2, False))
+
+_MAGIC = b"SC40"
+# Anche src.aperture la registra: le aperture dipendono dalle scale generate
+VERSIONE = 2
+
+# Voce a 32 bit: carte (13) | jolly (3) | inizio (4) | lunghezza (4) | punti (8)
+_BIT_JOLLY = 13
+_BIT_INIZIO = 16
+_BIT_LUNGHEZZA = 20
+_BIT_PUNTI = 24
+
+
+def codifica(carte, jolly, inizio, lunghezza, punti):
+    return (carte | jolly << _BIT_JOLLY | inizio << _BIT_INIZIO
+            | lunghezza << _BIT_LUNGHEZZA | punti << _BIT_PUNTI)
+
+
+def decodifica(voce):
+    """Voce -> (carte a 13 bit, jolly, inizio, lunghezza, punti)."""
+    return (
+        voce & MASCHERA_SEME,
+        voce >> _BIT_JOLLY & 0x7,
+        voce >> _BIT_INIZIO & 0xF,
+        voce >> _BIT_LUNGHEZZA & 0xF,
+        voce >> _BIT_PUNTI,
+    )
+
+
+def scale_seme(valori, max_jolly, superflui=False):
+    """
+    Scale di un seme con i valori presenti nella maschera a 13 bit, come
+    tuple (carte, jolly, inizio, lunghezza). Vedi
+    logic.itera_combinazioni_maschera per le regole; l'ordine è quello in
+    cui le tabelle le memorizzano.
+    """
+    if not valori & (valori - 1):
+        return  # meno di due carte nel seme
+    visti = set()
+    # Posizioni 0..13: la 13 è l'asso alto (Q-K-A); niente giro K-A-2
+    presente = [valori >> (p % N_VALORI) & 1 for p in range(N_VALORI + 1)]
+    for i in range(N_VALORI + 1):
+        if not presente[i]:
+            continue
+        carte = 0
+        naturali = 0
+        buchi = 0
+        for j in range(i, N_VALORI + 1):
+            if i == 0 and j == N_VALORI:
+                break  # lo stesso asso non può stare ai due estremi
+            if not presente[j]:
+                buchi += 1
+                if buchi > max_jolly:
+                    break
+                continue
+            carte |= 1 << (j % N_VALORI)
+            naturali += 1
+            if naturali < 2:
+                continue  # come nei tris, almeno due carte naturali
+            campata = j - i + 1
+            # Posizioni libere agli estremi senza uscire da A..K..A: un jolly
+            # non prende il posto di una carta in mano, che la finestra più
+            # ampia contiene già
+            libere_alto = 0
+            fine = N_VALORI - 1 if i == 0 else N_VALORI
+            while j + libere_alto < fine and not presente[j + libere_alto + 1]:
+                libere_alto += 1
+            libere_basso = 0
+            inizio_minimo = 1 if j == N_VALORI else 0
+            while i - libere_basso > inizio_minimo and not presente[i - libere_basso - 1]:
+                libere_basso += 1
+            massimo_extra = max_jolly - buchi if superflui else min(max_jolly - buchi, max(0, 3 - campata))
+            for extra in range(0, massimo_extra + 1):
+                lunghezza = campata + extra
+                if lunghezza < 3 or lunghezza > N_VALORI:
+                    continue
+                if extra > libere_alto + libere_basso:
+                    break
+                if (carte, buchi + extra) in visti:
+                    continue
+                visti.add((carte, buchi + extra))
+                # I jolly in coda, se non c'è posto in coda vanno in testa
+                inizio = i - max(0, extra - libere_alto)
+                yield carte, buchi + extra, inizio, lunghezza
+
+
+class TabellaScale:
+    """
+    Scale di ogni maschera di seme per un (max_jolly, superflui):
+    voci[indici[m]:indici[m + 1]] sono le scale della maschera m codificate
+    a 32 bit, migliore[m] i punti massimi di scale disgiunte del seme usando
+    in tutto al più max_jolly jolly.
+    """
+
+    __slots__ = ("max_jolly", "superflui", "indici", "voci", "migliore")
+
+    def __init__(self, max_jolly, superflui, indici, voci, migliore):
+        self.max_jolly = max_jolly
+        self.superflui = superflui
+        self.indici = indici
+        self.voci = voci
+        self.migliore = migliore
+
+    @classmethod
+    def costruisci(cls, max_jolly, superflui=False):
+        indici = array.array("I", [0])
+        voci = array.array("I")
+        for m in range(N_MASCHERE):
+            for carte, jolly, inizio, lunghezza in scale_seme(m, max_jolly, superflui):
+                voci.append(codifica(carte, jolly, inizio, lunghezza, punti_maschera(carte)))
+            indici.append(len(voci))
+        tabella = cls(max_jolly, superflui, indici, voci, None)
+        tabella.migliore = tabella._calcola_migliore()
+        return tabella
+
+    def _calcola_migliore(self):
+        # migliore[j][m]: togliendo la carta più bassa o usandola in una scala
+        # che la contiene; le maschere rimaste sono sempre più piccole di m
+        migliore = [array.array("B", bytes(N_MASCHERE)) for _ in range(self.max_jolly + 1)]
+        for m in range(1, N_MASCHERE):
+            basso = m & -m
+            scale = [decodifica(v) for v in self.scale(m) if v & basso]
+            for j in range(self.max_jolly + 1):
+                valore = migliore[j][m & ~basso]
+                for carte, jolly, _, _, punti in scale:
+                    if jolly <= j:
+                        valore = max(valore, punti + migliore[j - jolly][m & ~carte])
+                migliore[j][m] = valore
+        return migliore[self.max_jolly]
+
+    def scale(self, valori):
+        """Voci codificate delle scale della maschera di seme."""
+        return self.voci[self.indici[valori]:self.indici[valori + 1]]
+
+    def memoria(self):
+        return sum(a.itemsize * len(a) for a in (self.indici, self.voci, self.migliore))
+
+
+_TABELLE = {}
+_STATISTICHE = {"costruzione_s": 0.0, "caricamento_s": 0.0, "costruite": 0, "caricate": 0}
+_FILE_LETTO = False
+
+
+def _little_endian(a):
+    if sys.byteorder != "little":
+        a = array.array(a.typecode, a)
+        a.byteswap()
+    return a
+
+
+def salva_tabelle(percorso=FILE_TABELLE, chiavi=TABELLE_SALVATE):
+    """Scrive le tabelle indicate nel file binario (compresso con zlib)."""
+    blocchi = [_MAGIC, bytes([VERSIONE, len(chiavi)])]
+    for max_jolly, superflui in chiavi:
+        tabella = tabella_scale(max_jolly, superflui)
+        blocchi.append(bytes([max_jolly, superflui]))
+        blocchi.append(len(tabella.voci).to_bytes(4, "little"))
+        for a in (tabella.indici, tabella.voci, tabella.migliore):
+            blocchi.append(_little_endian(a).tobytes())
+    with open(percorso, "wb") as f:
+        f.write(zlib.compress(b"".join(blocchi), 9))
+
+
+def carica_tabelle(percorso=FILE_TABELLE):
+    """
+    Legge il file binario e registra le tabelle che contiene. Restituisce
+    il numero di tabelle lette; 0 se il file manca o non è valido.
+    """
+    try:
+        with open(percorso, "rb") as f:
+            dati = zlib.decompress(f.read())
+    except (OSError, zlib.error):
+        return 0
+    if dati[:4] != _MAGIC or dati[4] != VERSIONE:
+        return 0
+    n = dati[5]
+    pos = 6
+    lette = {}
+    try:
+        for _ in range(n):
+            max_jolly, superflui = dati[pos], bool(dati[pos + 1])
+            n_voci = int.from_bytes(dati[pos + 2:pos + 6], "little")
+            pos += 6
+            parti = []
+            for typecode, lunghezza in (("I", N_MASCHERE + 1), ("I", n_voci), ("B", N_MASCHERE)):
+                a = array.array(typecode)
+                fine = pos + lunghezza * a.itemsize
+                a.frombytes(dati[pos:fine])
+                if len(a) != lunghezza:
+                    return 0
+                parti.append(_little_endian(a))
+                pos = fine
+            lette[max_jolly, superflui] = TabellaScale(max_jolly, superflui, *parti)
+    except IndexError:
+        return 0
+    _TABELLE.update(lette)
+    return len(lette)
+
+
+def tabella_scale(max_jolly, superflui=False):
+    """
+    Tabella per (max_jolly, superflui): dal file alla prima richiesta,
+    altrimenti costruita e tenuta in memoria. None oltre MAX_JOLLY_TABELLA.
+    """
+    global _FILE_LETTO
+    chiave = (max_jolly, bool(superflui))
+    tabella = _TABELLE.get(chiave)
+    if tabella is not None:
+        return tabella
+    if max_jolly > MAX_JOLLY_TABELLA:
+        return None
+    if not _FILE_LETTO:
+        _FILE_LETTO = True
+        inizio = time.perf_counter()
+        _STATISTICHE["caricate"] += carica_tabelle()
+        _STATISTICHE["caricamento_s"] += time.perf_counter() - inizio
+        tabella = _TABELLE.get(chiave)
+        if tabella is not None:
+            return tabella
+    inizio = time.perf_counter()
+    tabella = _TABELLE[chiave] = TabellaScale.costruisci(max_jolly, superflui)
+    _STATISTICHE["costruzione_s"] += time.perf_counter() - inizio
+    _STATISTICHE["costruite"] += 1
+    return tabella
+
+
+def migliore_scale(valori, jolly):
+    """Punti massimi con scale disgiunte di un seme (maschera a 13 bit) e al più `jolly` jolly."""
+    tabella = tabella_scale(min(jolly, MAX_JOLLY_TABELLA))
+    return tabella.migliore[valori]
+
+
+def statistiche_tabelle():
+    """Tempi di caricamento/costruzione, tabelle in memoria e byte occupati."""
+    return dict(
+        _STATISTICHE,
+        tabelle=sorted(_TABELLE),
+        byte=sum(t.memoria() for t in _TABELLE.values()),
+    )
+
+
+def main():
+    inizio = time.perf_counter()
+    for max_jolly, superflui in TABELLE_SALVATE:
+        _TABELLE[max_jolly, superflui] = TabellaScale.costruisci(max_jolly, superflui)
+    costruzione = time.perf_counter() - inizio
+    salva_tabelle()
+    _TABELLE.clear()
+    inizio = time.perf_counter()
+    n = carica_tabelle()
+    caricamento = time.perf_counter() - inizio
+    memoria = sum(t.memoria() for t in _TABELLE.values())
+    print(f"{n} tabelle costruite in {costruzione:.2f} s, caricate in {caricamento * 1000:.1f} ms")
+    print(f"{os.path.getsize(FILE_TABELLE)} byte su disco, {memoria} byte in memoria")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# taratura.py – Taratura automatica di FASE_PESI e COEFFICIENTI dello scarto
+#
+#   python -m src.taratura [--candidati 16] [--generazioni 3] [--workers 4] [--cache taratura.json]
+#
+# Ogni candidato è un vettore di pesi (FASE_PESI per fase più i
+# COEFFICIENTI di logic_log) che gioca contro la strategia con i pesi
+# attuali. Per generazione si estraggono candidati attorno al migliore e si
+# fa successive halving: a ogni giro tutti giocano gli stessi blocchi di
+# partite (numeri casuali comuni), la metà peggiore esce e chi resta gioca
+# il doppio dei blocchi. I risultati per (candidato, blocco) restano su
+# disco, così una taratura interrotta o ripetuta non rigioca nulla.
+
+import argparse
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.logic_log import FASE_PESI, COEFFICIENTI
+from src.state import gioca_partita
+from src.strategy import StrategiaBase
+
+VOCI_FASE = ("valore", "strategia", "rischio")
+# Nomi dei parametri nell'ordine del vettore
+PARAMETRI = [f"{fase}.{voce}" for fase in FASE_PESI for voce in VOCI_FASE] + list(COEFFICIENTI)
+
+
+def vettore_predefinito():
+    return tuple(float(FASE_PESI[f][v]) for f in FASE_PESI for v in VOCI_FASE) + tuple(
+        float(x) for x in COEFFICIENTI.values())
+
+
+def parametri_da_vettore(vettore):
+    """Vettore -> {'fase_pesi', 'coefficienti'} per StrategiaBase(parametri=...)."""
+    valori = iter(vettore)
+    fase_pesi = {f: {v: next(valori) for v in VOCI_FASE} for f in FASE_PESI}
+    coefficienti = {k: next(valori) for k in COEFFICIENTI}
+    return {"fase_pesi": fase_pesi, "coefficienti": coefficienti}
+
+
+def perturba(vettore, sigma, rng):
+    """Moltiplica ogni peso per un fattore log-normale (i pesi restano positivi)."""
+    return tuple(round(x * math.exp(rng.gauss(0.0, sigma)), 3) for x in vettore)
+
+
+def chiave(vettore):
+    return ",".join(f"{x:g}" for x in vettore)
+
+
+def gioca_blocco(vettore, seed, blocco, n_partite):
+    """
+    Gioca n_partite del candidato contro i pesi attuali, alternando i posti,
+    con seed deterministico per (seed, blocco, partita): ogni candidato vede
+    le stesse mani. Restituisce (vettore, blocco, punti, partite) con 1
+    punto per vittoria e mezzo per partita senza vincitore.
+    """
+    candidato = StrategiaBase(parametri=parametri_da_vettore(vettore))
+    riferimento = StrategiaBase()
+    punti = 0.0
+    for i in range(n_partite):
+        posto = i % 2
+        giocatori = [candidato, riferimento] if posto == 0 else [riferimento, candidato]
+        ris = gioca_partita(giocatori, rng=random.Random(f"{seed}-{blocco}-{i}"))
+        if ris["vincitore"] is None:
+            punti += 0.5
+        elif ris["vincitore"] == posto:
+            punti += 1.0
+    return vettore, blocco, punti, n_partite
+
+
+class CacheRisultati:
+    """
+    Risultati per (candidato, blocco) in un file JSON, riscritto per intero
+    a ogni salvataggio come i checkpoint di src.torneo. Senza percorso la
+    cache vive solo in memoria.
+    """
+
+    def __init__(self, percorso, config):
+        self.percorso = percorso
+        self.config = config
+        self.risultati = {}
+        if percorso and os.path.exists(percorso):
+            with open(percorso, encoding="utf-8") as f:
+                dati = json.load(f)
+            if dati.get("config") != config:
+                raise ValueError(f"La cache {percorso} appartiene a una taratura diversa")
+            self.risultati = dati["risultati"]
+
+    def get(self, vettore, blocco):
+        return self.risultati.get(chiave(vettore), {}).get(str(blocco))
+
+    def put(self, vettore, blocco, punti, partite):
+        self.risultati.setdefault(chiave(vettore), {})[str(blocco)] = [punti, partite]
+
+    def salva(self):
+        if not self.percorso:
+            return
+        temporaneo = self.percorso + ".tmp"
+        with open(temporaneo, "w", encoding="utf-8") as f:
+            json.dump({"config": self.config, "risultati": self.risultati}, f)
+        os.replace(temporaneo, self.percorso)
+
+
+def valuta(candidati, blocchi, cache, seed, partite_blocco, pool=None):
+    """
+    Porta ogni candidato a `blocchi` blocchi giocati (solo quelli mancanti
+    dalla cache) e restituisce {vettore: (media, errore standard, partite)}.
+    La cache si salva dopo ogni blocco, come il checkpoint di src.torneo.
+    """
+    mancanti = [(v, b) for v in candidati for b in range(blocchi) if cache.get(v, b) is None]
+    if pool is None:
+        for v, b in mancanti:
+            cache.put(*gioca_blocco(v, seed, b, partite_blocco))
+            cache.salva()
+    else:
+        futuri = [pool.submit(gioca_blocco, v, seed, b, partite_blocco) for v, b in mancanti]
+        for futuro in as_completed(futuri):
+            cache.put(*futuro.result())
+            cache.salva()
+
+    stime = {}
+    for v in candidati:
+        punti = partite = 0
+        for b in range(blocchi):
+            p, n = cache.get(v, b)
+            punti += p
+            partite += n
+        media = punti / partite
+        stime[v] = (media, math.sqrt(max(media * (1 - media), 1e-9) / partite), partite)
+    return stime
+
+
+def dimezza(candidati, cache, seed, partite_blocco, blocchi_iniziali=2, eta=2, pool=None):
+    """
+    Successive halving: a ogni giro resta 1/eta dei candidati, e chi resta
+    gioca eta volte i blocchi. Esce prima anche chi è chiaramente peggiore
+    del migliore (oltre due errori standard sotto). Restituisce (migliore,
+    stime dell'ultimo giro).
+    """
+    vivi = list(dict.fromkeys(candidati))
+    blocchi = blocchi_iniziali
+    while True:
+        stime = valuta(vivi, blocchi, cache, seed, partite_blocco, pool)
+        vivi.sort(key=lambda v: -stime[v][0])
+        if len(vivi) == 1:
+            return vivi[0], stime
+        migliore, errore, _ = stime[vivi[0]]
+        tenuti = max(1, math.ceil(len(vivi) / eta))
+        vivi = [v for v in vivi[:tenuti] if stime[v][0] + 2 * stime[v][1] >= migliore - 2 * errore]
+        blocchi *= eta
+
+
+def tara(candidati=16, generazioni=3, sigma=0.3, eta=2, blocchi_iniziali=2, partite_blocco=50,
+         seed=0, workers=None, percorso_cache=None):
+    """
+    Cerca i pesi migliori contro quelli attuali; con workers=0 tutto gira in
+    questo processo. Restituisce un dict con parametri, punteggio e storia
+    per generazione.
+    """
+    config = {"seed": seed, "partite_blocco": partite_blocco}
+    cache = CacheRisultati(percorso_cache, config)
+    rng = random.Random(seed)
+    centro = vettore_predefinito()
+    storia = []
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+    try:
+        for generazione in range(generazioni):
+            gruppo = [centro] + [perturba(centro, sigma, rng) for _ in range(candidati - 1)]
+            vincitore, stime = dimezza(gruppo, cache, seed, partite_blocco, blocchi_iniziali, eta, pool)
+            media, errore, partite = stime[vincitore]
+            storia.append({"generazione": generazione, "punteggio": media, "errore": errore,
+                           "partite": partite, "vettore": list(vincitore)})
+            centro = vincitore
+            sigma *= 0.7
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {
+        "parametri": parametri_da_vettore(centro),
+        "punteggio": storia[-1]["punteggio"] if storia else 0.5,
+        "storia": storia,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Taratura dei pesi di scarto su partite simulate")
+    parser.add_argument("--candidati", type=int, default=16)
+    parser.add_argument("--generazioni", type=int, default=3)
+    parser.add_argument("--sigma", type=float, default=0.3, help="ampiezza log-normale delle perturbazioni")
+    parser.add_argument("--eta", type=int, default=2, help="fattore di riduzione per giro")
+    parser.add_argument("--blocchi", type=int, default=2, help="blocchi iniziali per candidato")
+    parser.add_argument("--partite-blocco", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="0 = tutto in questo processo")
+    parser.add_argument("--cache", default=None, help="file JSON dei risultati per candidato e blocco")
+    args = parser.parse_args(argv)
+
+    risultato = tara(args.candidati, args.generazioni, args.sigma, args.eta, args.blocchi,
+                     args.partite_blocco, args.seed, args.workers, args.cache)
+    print(json.dumps(risultato, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# tavolo.py – Combinazioni calate, indicizzate per carta
+#
+# Le combinazioni hanno la forma di src.state (scala: seme, inizio, fine;
+# tris: valore, semi; carte con i jolly al loro posto). Per ogni carta il
+# Tavolo sa subito a quali combinazioni si attacca e quali jolly libera,
+# senza scorrere il tavolo: gli indici si aggiornano solo per la
+# combinazione che cambia.
+
+from src.core import N_VALORI, N_CARTE
+
+# Come in src.state, che importa questo modulo
+JOLLY_ID = N_CARTE
+POSIZIONE_ASSO_ALTO = N_VALORI
+
+
+def estremi(combo):
+    """Carte naturali che si attaccano alla combinazione: estremi liberi della scala o semi mancanti del tris."""
+    if combo["tipo"] == "tris":
+        if len(combo["carte"]) >= 4:
+            return []
+        return [s * N_VALORI + combo["valore"] for s in range(N_CARTE // N_VALORI) if not combo["semi"] >> s & 1]
+    base = combo["seme"] * N_VALORI
+    carte = []
+    if combo["inizio"] > 0:
+        carte.append(base + (combo["inizio"] - 1) % N_VALORI)
+    # L'asso alto chiude la scala, non si gira su 2
+    if combo["fine"] < POSIZIONE_ASSO_ALTO and not (combo["fine"] + 1 == POSIZIONE_ASSO_ALTO and combo["inizio"] == 0):
+        carte.append(base + (combo["fine"] + 1) % N_VALORI)
+    return list(dict.fromkeys(carte))  # scala di 12 carte: i due estremi sono lo stesso asso
+
+
+def posti_jolly(combo):
+    """Coppie (carta, posizione in combo['carte']) delle carte naturali che prendono il posto di un jolly."""
+    posti = []
+    for k, c in enumerate(combo["carte"]):
+        if c != JOLLY_ID:
+            continue
+        if combo["tipo"] == "tris":
+            # Il jolly del tris vale per uno qualsiasi dei semi mancanti
+            posti.extend((s * N_VALORI + combo["valore"], k)
+                         for s in range(N_CARTE // N_VALORI) if not combo["semi"] >> s & 1)
+        else:
+            posti.append((combo["seme"] * N_VALORI + (combo["inizio"] + k) % N_VALORI, k))
+    return posti
+
+
+class Tavolo:
+    """
+    Lista delle combinazioni calate con due indici per carta naturale:
+    - attacchi[c]: indici delle combinazioni a cui c si attacca
+    - jolly[c]: coppie (indice, posizione) dei jolly che c può sostituire
+    Si scorre e si indicizza come la lista di combinazioni.
+    """
+
+    __slots__ = ("combinazioni", "attacchi", "jolly")
+
+    def __init__(self, combinazioni=()):
+        self.combinazioni = []
+        self.attacchi = {}
+        self.jolly = {}
+        for combo in combinazioni:
+            self.aggiungi(dict(combo, carte=combo["carte"][:]))
+
+    def clona(self):
+        nuovo = Tavolo.__new__(Tavolo)
+        nuovo.combinazioni = [dict(c, carte=c["carte"][:]) for c in self.combinazioni]
+        # I valori degli indici sono tuple: basta copiare i dizionari
+        nuovo.attacchi = dict(self.attacchi)
+        nuovo.jolly = dict(self.jolly)
+        return nuovo
+
+    def __len__(self):
+        return len(self.combinazioni)
+
+    def __iter__(self):
+        return iter(self.combinazioni)
+
+    def __getitem__(self, indice):
+        return self.combinazioni[indice]
+
+    # === Indici ===
+
+    def _indicizza(self, indice, segno):
+        """Aggiunge (segno=1) o toglie (segno=-1) la combinazione dagli indici."""
+        combo = self.combinazioni[indice]
+        for c in estremi(combo):
+            voci = self.attacchi.get(c, ())
+            voci = tuple(sorted(voci + (indice,))) if segno > 0 else tuple(i for i in voci if i != indice)
+            if voci:
+                self.attacchi[c] = voci
+            else:
+                del self.attacchi[c]
+        for c, k in posti_jolly(combo):
+            voci = self.jolly.get(c, ())
+            voci = tuple(sorted(voci + ((indice, k),))) if segno > 0 else tuple(v for v in voci if v[0] != indice)
+            if voci:
+                self.jolly[c] = voci
+            else:
+                del self.jolly[c]
+
+    def attaccabili(self, c):
+        """Indici delle combinazioni a cui la carta naturale c si attacca, in ordine."""
+        return self.attacchi.get(c, ())
+
+    def recuperabili(self, c):
+        """Coppie (indice, posizione) dei jolly che la carta naturale c può sostituire."""
+        return self.jolly.get(c, ())
+
+    def mosse(self, mano):
+        """
+        Mosse sul tavolo per le carte di una mano (interi di src.state):
+        ("attacco", c, indice) e ("jolly", c, indice, posizione).
+        """
+        for c in dict.fromkeys(mano):
+            for indice in self.attacchi.get(c, ()):
+                yield ("attacco", c, indice)
+            for indice, posizione in self.jolly.get(c, ()):
+                yield ("jolly", c, indice, posizione)
+
+    # === Modifiche ===
+
+    def aggiungi(self, combo):
+        """Aggiunge una combinazione calata e ne restituisce l'indice."""
+        self.combinazioni.append(combo)
+        indice = len(self.combinazioni) - 1
+        self._indicizza(indice, 1)
+        return indice
+
+    def attacca(self, c, indice):
+        """Attacca c alla combinazione indicata; False se non si attacca."""
+        if indice not in self.attacchi.get(c, ()):
+            return False
+        self._indicizza(indice, -1)
+        combo = self.combinazioni[indice]
+        if combo["tipo"] == "tris":
+            combo["semi"] |= 1 << (c // N_VALORI)
+            combo["carte"].append(c)
+        elif c % N_VALORI == (combo["inizio"] - 1) % N_VALORI and combo["inizio"] > 0:
+            combo["inizio"] -= 1
+            combo["carte"].insert(0, c)
+        else:
+            combo["fine"] += 1
+            combo["carte"].append(c)
+        self._indicizza(indice, 1)
+        return True
+
+    def sostituisci_jolly(self, c, indice, posizione):
+        """Mette c al posto del jolly indicato; False se non può sostituirlo."""
+        if (indice, posizione) not in self.jolly.get(c, ()):
+            return False
+        self._indicizza(indice, -1)
+        combo = self.combinazioni[indice]
+        combo["carte"][posizione] = c
+        if combo["tipo"] == "tris":
+            combo["semi"] |= 1 << (c // N_VALORI)
+        self._indicizza(indice, 1)
+        return True
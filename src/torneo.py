@@ -0,0 +1,158 @@
+# torneo.py – Tornei multi-processo tra strategie sul motore headless
+
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src import logic
+from src.state import gioca_partita
+from src.strategy import StrategiaBase
+from src.traccia import aggiungi_opzioni_profilo, profila
+
+# Le strategie viaggiano verso i worker per nome: ogni processo le ricrea
+STRATEGIE = {
+    "logic_log": lambda: StrategiaBase(),
+    "logic": lambda: StrategiaBase(scarto=logic.suggerisci_scarto),
+    "logic_semplice": lambda: StrategiaBase(scarto=logic.suggerisci_scarto_semplice),
+}
+
+
+def _statistiche_vuote():
+    return {
+        "partite": 0,
+        "vittorie": 0,
+        "aperture": 0,
+        "somma_turni_apertura": 0,
+        "somma_punti_residui": 0,
+    }
+
+
+def _unisci(totali, parziali):
+    for nome, stats in parziali.items():
+        dest = totali.setdefault(nome, _statistiche_vuote())
+        for k, v in stats.items():
+            dest[k] += v
+
+
+def gioca_blocco(nomi, seed, blocco, n_partite):
+    """
+    Gioca n_partite con seed deterministico per (seed, blocco, partita) e
+    restituisce solo le statistiche aggregate per strategia. I posti a
+    tavola ruotano a ogni partita.
+    """
+    strategie = [STRATEGIE[n]() for n in nomi]
+    totali = {n: _statistiche_vuote() for n in nomi}
+    for i in range(n_partite):
+        rotazione = i % len(nomi)
+        ordine = nomi[rotazione:] + nomi[:rotazione]
+        giocatori = strategie[rotazione:] + strategie[:rotazione]
+        ris = gioca_partita(giocatori, rng=random.Random(f"{seed}-{blocco}-{i}"))
+        for posto, nome in enumerate(ordine):
+            stats = totali[nome]
+            stats["partite"] += 1
+            stats["vittorie"] += ris["vincitore"] == posto
+            if ris["turno_apertura"][posto] is not None:
+                stats["aperture"] += 1
+                stats["somma_turni_apertura"] += ris["turno_apertura"][posto]
+            stats["somma_punti_residui"] += ris["punti_residui"][posto]
+    return blocco, totali
+
+
+def _leggi_checkpoint(percorso, config):
+    if not percorso or not os.path.exists(percorso):
+        return set(), {}
+    with open(percorso, encoding="utf-8") as f:
+        dati = json.load(f)
+    if dati.get("config") != config:
+        raise ValueError(f"Il checkpoint {percorso} appartiene a un torneo diverso")
+    return set(dati["blocchi"]), dati["totali"]
+
+
+def _scrivi_checkpoint(percorso, config, completati, totali):
+    temporaneo = percorso + ".tmp"
+    with open(temporaneo, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "blocchi": sorted(completati), "totali": totali}, f)
+    os.replace(temporaneo, percorso)
+
+
+def riepilogo(totali):
+    """Tasso di vittoria, turni medi all'apertura e punti residui medi per strategia."""
+    righe = {}
+    for nome, s in totali.items():
+        righe[nome] = {
+            "partite": s["partite"],
+            "tasso_vittoria": s["vittorie"] / s["partite"] if s["partite"] else 0.0,
+            "turni_medi_apertura": s["somma_turni_apertura"] / s["aperture"] if s["aperture"] else None,
+            "punti_residui_medi": s["somma_punti_residui"] / s["partite"] if s["partite"] else 0.0,
+        }
+    return righe
+
+
+def esegui_torneo(nomi=("logic_log", "logic"), partite=1000, seed=0, workers=None,
+                  dimensione_blocco=250, checkpoint=None):
+    """
+    Distribuisce le partite in blocchi su un ProcessPoolExecutor. I worker
+    restituiscono solo aggregati; dopo ogni blocco il checkpoint (se dato)
+    viene riscritto, e un nuovo avvio con la stessa configurazione riprende
+    dai blocchi mancanti. Con workers=0 i blocchi girano in questo
+    processo (per profilare), con lo stesso risultato.
+    """
+    nomi = list(nomi)
+    for n in nomi:
+        if n not in STRATEGIE:
+            raise ValueError(f"Strategia sconosciuta: {n}")
+    config = {"nomi": nomi, "partite": partite, "seed": seed, "blocco": dimensione_blocco}
+    completati, totali = _leggi_checkpoint(checkpoint, config)
+
+    blocchi = []
+    for b, inizio in enumerate(range(0, partite, dimensione_blocco)):
+        if b not in completati:
+            blocchi.append((b, min(dimensione_blocco, partite - inizio)))
+
+    if blocchi and workers == 0:
+        for b, n in blocchi:
+            _, parziali = gioca_blocco(nomi, seed, b, n)
+            _unisci(totali, parziali)
+            completati.add(b)
+            if checkpoint:
+                _scrivi_checkpoint(checkpoint, config, completati, totali)
+    elif blocchi:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuri = [pool.submit(gioca_blocco, nomi, seed, b, n) for b, n in blocchi]
+            for futuro in as_completed(futuri):
+                b, parziali = futuro.result()
+                _unisci(totali, parziali)
+                completati.add(b)
+                if checkpoint:
+                    _scrivi_checkpoint(checkpoint, config, completati, totali)
+
+    return riepilogo(totali)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Torneo tra strategie di scarto")
+    parser.add_argument("strategie", nargs="*", default=["logic_log", "logic"],
+                        help="nomi tra: " + ", ".join(sorted(STRATEGIE)))
+    parser.add_argument("--partite", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="0 = tutto in questo processo")
+    parser.add_argument("--blocco", type=int, default=250)
+    parser.add_argument("--checkpoint", default=None)
+    aggiungi_opzioni_profilo(parser)
+    args = parser.parse_args(argv)
+
+    if args.profilo:
+        # Il profilatore vede solo questo processo: i blocchi girano qui
+        risultato = profila(esegui_torneo, args.strategie, args.partite, args.seed, 0,
+                            args.blocco, args.checkpoint,
+                            modalita=args.profilo, output=args.profilo_output)
+    else:
+        risultato = esegui_torneo(args.strategie, args.partite, args.seed, args.workers,
+                                  args.blocco, args.checkpoint)
+    print(json.dumps(risultato, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
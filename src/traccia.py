@@ -0,0 +1,95 @@
+# traccia.py – Strumentazione facoltativa dell'analisi e modalità di profilazione
+#
+# Le funzioni di analisi accettano traccia=None: senza traccia non fanno
+# nulla di più di un confronto con None. Con una Traccia registrano tempi
+# per fase e contatori (candidati, nodi del risolutore, hit della cache).
+
+import sys
+import time
+
+MODALITA_PROFILO = ("cprofile", "pyinstrument")
+
+
+class Traccia:
+    """
+    Tempi cumulati per fase (secondi) e contatori, nell'ordine in cui
+    compaiono. Una stessa traccia può raccogliere più analisi.
+    """
+
+    __slots__ = ("tempi", "conteggi")
+
+    def __init__(self):
+        self.tempi = {}
+        self.conteggi = {}
+
+    def segna(self, nome, inizio):
+        """Aggiunge a `nome` il tempo da `inizio` (perf_counter) e restituisce l'istante attuale."""
+        adesso = time.perf_counter()
+        self.tempi[nome] = self.tempi.get(nome, 0.0) + adesso - inizio
+        return adesso
+
+    def conta(self, nome, n=1):
+        self.conteggi[nome] = self.conteggi.get(nome, 0) + n
+
+    def unisci(self, statistiche, prefisso=""):
+        """Somma ai contatori un dict di statistiche (es. {'nodi', 'potati'} del risolutore)."""
+        for nome, n in statistiche.items():
+            self.conta(prefisso + nome, n)
+
+    def come_dict(self):
+        return {
+            "tempi_ms": {nome: round(t * 1000, 3) for nome, t in self.tempi.items()},
+            "conteggi": dict(self.conteggi),
+        }
+
+    def righe(self):
+        """Righe di testo per il pannello informazioni della GUI."""
+        righe = [f"⏱️ {nome}: {t * 1000:.2f} ms" for nome, t in self.tempi.items()]
+        righe += [f"🔢 {nome}: {n}" for nome, n in self.conteggi.items()]
+        return righe
+
+
+def profila(funzione, *args, modalita="cprofile", output=None, righe=25, **kwargs):
+    """
+    Esegue funzione(*args, **kwargs) sotto profilatore e ne restituisce il
+    risultato. Il riepilogo va su stderr; con output il profilo completo
+    va su file (.prof di cProfile, oppure HTML di pyinstrument).
+    pyinstrument è facoltativo: se manca si ricade su cProfile.
+    """
+    if modalita == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️ pyinstrument non installato, uso cProfile", file=sys.stderr)
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return funzione(*args, **kwargs)
+            finally:
+                profiler.stop()
+                if output:
+                    with open(output, "w", encoding="utf-8") as f:
+                        f.write(profiler.output_html())
+                print(profiler.output_text(unicode=True), file=sys.stderr)
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return funzione(*args, **kwargs)
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(righe)
+
+
+def aggiungi_opzioni_profilo(parser):
+    """Opzioni --profilo e --profilo-output per gli argparse dei runner."""
+    parser.add_argument("--profilo", choices=MODALITA_PROFILO, default=None,
+                        help="esegue sotto profilatore (riepilogo su stderr)")
+    parser.add_argument("--profilo-output", default=None,
+                        help="file per il profilo completo (.prof o .html)")
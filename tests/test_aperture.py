@@ -0,0 +1,52 @@
+from src import aperture
+from src.cache import CacheAnalisi, analizza_apertura
+from src.logic import genera_combinazioni, scegli_apertura
+from src.state import mano_a_tuple
+from src.traccia import Traccia
+
+
+def _scrivi_corpus(percorso, mani):
+    percorso.write_text("\n".join(" ".join("JOLLY" if v == "JOLLY" else v + s for v, s in m) for m in mani) + "\n",
+                        encoding="utf-8")
+
+
+def _tabella(monkeypatch, percorso):
+    monkeypatch.setattr(aperture, "FILE_APERTURE", str(percorso))
+    monkeypatch.setattr(aperture, "_TABELLA", None)
+    monkeypatch.setattr(aperture, "_TABELLA_LETTA", False)
+    return aperture.tabella_aperture()
+
+
+def test_tabella_consultata_solo_con_quota_misurata(tmp_path, monkeypatch):
+    mani = [mano_a_tuple(m) for m in aperture.mani_del_blocco(7, 0, 30)]
+    corpus = tmp_path / "mani.txt"
+    _scrivi_corpus(corpus, mani)
+    output = tmp_path / "aperture.bin"
+    n, _ = aperture.costruisci(dimensione_blocco=8, workers=0, output=str(output), corpus=str(corpus))
+    assert 0 < n <= len(mani)
+
+    # Appena costruita la tabella non è misurata, quindi non si consulta
+    assert aperture.TabellaAperture(str(output)).quota_hit is None
+    assert _tabella(monkeypatch, output) is None
+
+    # Mani casuali nuove: nessun hit, la tabella resta spenta
+    risultati = aperture.misura(str(output), mani=50, registra=True)
+    assert risultati["nuove"]["hit"] == 0
+    assert risultati["presenti"]["quota_hit"] == 1.0
+    assert _tabella(monkeypatch, output) is None
+
+    # Mani registrate che si ripetono: la tabella si consulta e dà le aperture del risolutore
+    risultati = aperture.misura(str(output), mani=50, corpus=str(corpus), registra=True)
+    assert risultati["nuove"]["quota_hit"] == 1.0
+    assert _tabella(monkeypatch, output) is not None
+    traccia = Traccia()
+    trovate = [analizza_apertura(mano, cache=CacheAnalisi(), traccia=traccia) for mano in mani]
+    assert traccia.conteggi["tabella_aperture_hit"] == len(mani)
+    aperture.tabella_aperture().chiudi()
+    monkeypatch.setattr(aperture, "_TABELLA", None)
+    for mano, trovata in zip(mani, trovate):
+        risolta = analizza_apertura(mano, cache=CacheAnalisi())
+        attesa = scegli_apertura(genera_combinazioni(mano), mano)
+        assert {k: v for k, v in trovata.items() if k != "statistiche"} == \
+            {k: v for k, v in risolta.items() if k != "statistiche"}
+        assert (trovata["puo_aprire"], trovata["punti"]) == (attesa["puo_aprire"], attesa["punti"])
@@ -0,0 +1,114 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from src.avversario import COMPAGNE, FATTORE_SEGNALE, SEGNALE_RACCOLTA, SEGNALE_SCARTO, Tracciatore
+from src.core import N_CARTE
+from src.state import CARTE_IN_MANO, JOLLY_ID, N_JOLLY, N_MAZZI, nuovo_mazzo
+
+
+class _DaZero:
+    """Le stime del Tracciatore ricalcolate a ogni domanda dalla storia della partita."""
+
+    def __init__(self):
+        self.viste = Counter()  # copie uscite dalle ignote
+        self.note = Counter()  # copie raccolte dall'avversario e non ancora giocate
+        self.carte_avversario = CARTE_IN_MANO
+        self.segnali = []
+
+    def gioca(self, c):
+        self.carte_avversario -= 1
+        if self.note[c]:
+            self.note[c] -= 1
+        else:
+            self.viste[c] += 1
+
+    def ignote(self, c):
+        return (N_JOLLY if c == JOLLY_ID else N_MAZZI) - self.viste[c]
+
+    def p_tiene(self, c):
+        if self.note[c]:
+            return 1.0
+        totale = sum(self.ignote(x) for x in range(N_CARTE + 1))
+        sconosciute = self.carte_avversario - sum(self.note.values())
+        # Ipergeometrica: nessuna delle copie ignote tra le sue carte non note
+        return 1.0 - math.comb(totale - self.ignote(c), sconosciute) / math.comb(totale, sconosciute)
+
+    def bisogno(self, c):
+        if c == JOLLY_ID:
+            return 1.0
+        base = 1.0 - math.prod(1.0 - peso * self.p_tiene(x) for x, peso in COMPAGNE[c])
+        if base <= 0.0 or base >= 1.0:
+            return base
+        segnale = sum(delta for x, delta in self.segnali if x == c or c in dict(COMPAGNE[x]))
+        quote = base / (1.0 - base) * FATTORE_SEGNALE ** segnale
+        return quote / (1.0 + quote)
+
+
+def _stime(stato, carte):
+    return [stato.p_tiene(c) for c in carte] + [stato.bisogno(c) for c in carte]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_tracciatore_incrementale_come_da_zero(seed):
+    rng = random.Random(seed)
+    mazzo = nuovo_mazzo(rng)
+    mano, avversario, mazzo = mazzo[:CARTE_IN_MANO], mazzo[CARTE_IN_MANO:2 * CARTE_IN_MANO], mazzo[26:]
+    tracciatore = Tracciatore.da_osservazioni(mano)
+    atteso = _DaZero()
+    atteso.viste.update(mano)
+    carte = rng.sample(range(N_CARTE), 12) + [JOLLY_ID]
+    copia = stime_copia = None
+
+    for turno in range(40):
+        if not mazzo:
+            break
+        # Noi: peschiamo e scartiamo una carta che l'avversario può raccogliere
+        pescata = mazzo.pop()
+        mano.append(pescata)
+        tracciatore.vista(pescata)
+        atteso.viste[pescata] += 1
+        scartata = mano.pop(rng.randrange(len(mano)))
+
+        # L'avversario: raccoglie il nostro scarto o pesca, cala a volte, scarta
+        if rng.random() < 0.3 and scartata != JOLLY_ID:
+            avversario.append(scartata)
+            tracciatore.raccolta_avversario(scartata)
+            atteso.carte_avversario += 1
+            atteso.note[scartata] += 1
+            atteso.segnali.append((scartata, SEGNALE_RACCOLTA))
+        elif mazzo:
+            avversario.append(mazzo.pop())
+            tracciatore.pesca_avversario()
+            atteso.carte_avversario += 1
+        if rng.random() < 0.15 and len(avversario) > 4:
+            calate = [avversario.pop(rng.randrange(len(avversario))) for _ in range(3)]
+            tracciatore.calata_avversario(calate)
+            for c in calate:
+                atteso.gioca(c)
+        c = avversario.pop(rng.randrange(len(avversario)))
+        tracciatore.scarto_avversario(c)
+        atteso.gioca(c)
+        if c != JOLLY_ID:
+            atteso.segnali.append((c, SEGNALE_SCARTO))
+
+        assert tracciatore.carte_avversario == atteso.carte_avversario == len(avversario)
+        for x in range(N_CARTE + 1):
+            assert (tracciatore.ignote[x], tracciatore.note[x]) == (atteso.ignote(x), atteso.note[x])
+            assert tracciatore.copie_rimaste(x) == atteso.ignote(x) + atteso.note[x]
+        stime = _stime(tracciatore, carte)
+        assert stime == pytest.approx(_stime(atteso, carte))
+
+        # vista seguita da nascosta non lascia traccia
+        prova = tracciatore.copia()
+        x = next(x for x in carte if atteso.ignote(x))
+        prova.vista(x)
+        prova.nascosta(x)
+        assert _stime(prova, carte) == stime
+        if turno == 10:
+            copia, stime_copia = tracciatore.copia(), stime
+
+    # La copia non risente degli eventi successivi
+    assert _stime(copia, carte) == stime_copia
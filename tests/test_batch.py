@@ -0,0 +1,52 @@
+# test_batch.py – valuta_mani contro il percorso scalare di logic_log
+
+import random
+
+import numpy as np
+
+from src import batch, logic, logic_log
+from src.core import N_CARTE, bit_carta, tutte_le_carte
+
+FASI = ["inizio", "centrale", "finale", "sconosciuta"]
+
+
+def _mani(n, seed):
+    rng = random.Random(seed)
+    mazzo = tutte_le_carte() * 2 + [("JOLLY", "J0"), ("JOLLY", "J1")]
+    mani = [rng.sample(mazzo, rng.choice([1, 3, 8, 13, 14])) for _ in range(n)]
+    giocate = [rng.sample(tutte_le_carte(), rng.randint(0, 8)) for _ in range(n)]
+    fasi = [rng.choice(FASI) for _ in range(n)]
+    return mani, giocate, fasi
+
+
+def test_punteggi_e_scarto_come_logic_log():
+    mani, giocate, fasi = _mani(2000, seed=5)
+    r = batch.valuta_mani(batch.mani_a_matrice(mani), giocate=batch.mani_a_matrice(giocate), fase=fasi,
+                          posizioni=batch.posizioni_in_mano(mani))
+    punteggi = r["punteggi"].reshape(len(mani), N_CARTE)
+    for i, mano in enumerate(mani):
+        for carta, score, _ in logic_log.valuta_carte(mano, giocate[i], fasi[i], spiega=False):
+            if carta[0] != "JOLLY":
+                assert punteggi[i, bit_carta(carta)] == score
+        if any(c[0] != "JOLLY" for c in mano):
+            scarto, _ = logic_log.suggerisci_scarto(mano, carte_giocate=giocate[i], fase=fasi[i], spiega=False)
+            assert r["scarto"][i] == bit_carta(scarto)
+        else:
+            assert r["scarto"][i] == -1
+
+
+def test_limite_apertura_e_maggiorante():
+    mani, _, _ = _mani(300, seed=6)
+    r = batch.valuta_mani(batch.mani_a_matrice(mani))
+    for i, mano in enumerate(mani):
+        apertura = logic.scegli_apertura(logic.genera_combinazioni(mano), mano)
+        assert apertura["punti"] <= r["limite_apertura"][i]
+
+
+def test_senza_posizioni_vince_il_bit_piu_basso():
+    mani, _, _ = _mani(300, seed=7)
+    r = batch.valuta_mani(batch.mani_a_matrice(mani))
+    piatti = np.nan_to_num(r["punteggi"].reshape(len(mani), N_CARTE), nan=-np.inf)
+    for i in range(len(mani)):
+        if r["scarto"][i] >= 0:
+            assert r["scarto"][i] == np.flatnonzero(piatti[i] == piatti[i].max())[0]
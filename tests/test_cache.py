@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+
+from src import cache, logic_log
+from src.avversario import Tracciatore
+from src.core import SEMI
+from src.logic import genera_combinazioni, scegli_apertura
+from src.state import mano_a_tuple, nuovo_mazzo
+
+
+def _mani(seed, n):
+    """Mani casuali di due mazzi, ognuna seguita da una copia con semi permutati e ordine mescolato."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        mano = mano_a_tuple(nuovo_mazzo(rng)[:rng.randint(1, 14)])
+        semi = dict(zip(SEMI, rng.sample(SEMI, len(SEMI))))
+        permutata = [c if c[0] == "JOLLY" else (c[0], semi[c[1]]) for c in mano]
+        rng.shuffle(permutata)
+        yield rng, mano
+        yield rng, permutata
+
+
+def test_apertura_in_cache_come_senza():
+    analisi = cache.CacheAnalisi()
+    for _, mano in _mani(1, 300):
+        trovata = cache.analizza_apertura(mano, cache=analisi)
+        attesa = scegli_apertura(genera_combinazioni(mano), mano)
+        assert trovata["puo_aprire"] == attesa["puo_aprire"]
+        if not trovata["puo_aprire"]:
+            assert trovata["carte_rimaste"] == mano
+            continue
+        calate = [carta for c in trovata["combinazioni"] for carta in c["carte"]]
+        # Aperture equivalenti: stessi punti, combinazioni e jolly
+        assert (trovata["punti"], len(trovata["combinazioni"]), Counter(c[0] for c in calate)["JOLLY"]) == \
+            (attesa["punti"], len(attesa["combinazioni"]),
+             sum(carta[0] == "JOLLY" for c in attesa["combinazioni"] for carta in c["carte"]))
+        assert Counter(calate) + Counter(trovata["carte_rimaste"]) == Counter(mano)
+    assert analisi.statistiche()["hit"] > 0
+
+
+def test_scarto_in_cache_come_senza():
+    analisi = cache.CacheAnalisi()
+    tracciatore = Tracciatore.da_osservazioni([0, 5, 9, 30], [3, 4, 17])
+    for i, (rng, mano) in enumerate(_mani(2, 200)):
+        giocate = mano_a_tuple(rng.sample(range(52), rng.randint(0, 8)))
+        fase = rng.choice(list(logic_log.FASE_PESI))
+        opzioni = {"carte_giocate": giocate, "fase": fase, "tracciatore": tracciatore if i % 3 == 0 else None}
+        scarto, log = cache.suggerisci_scarto(mano, cache=analisi, **opzioni)
+        atteso, log_atteso = logic_log.suggerisci_scarto(mano, **opzioni)
+        assert scarto == atteso
+        assert list(log) == list(log_atteso)
+        assert cache.suggerisci_scarto(mano, cache=analisi, spiega=False, **opzioni) == (atteso, None)
+    assert analisi.statistiche()["hit"] > 0
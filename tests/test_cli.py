@@ -0,0 +1,40 @@
+# test_cli.py – Righe di input non valide diventano errori, non eccezioni
+
+import pytest
+
+from src.cli import MAX_CARTE, analizza_riga, leggi_carte, main
+
+
+@pytest.mark.parametrize("riga", [
+    '{"mano": 5}',
+    '{"mano": [5]}',
+    '{"mano": [["7", 5]]}',
+    '{"mano": "7♥", "giocate": [null]}',
+    "A♠ A♠ A♠",
+    "JOLLY JOLLY JOLLY JOLLY JOLLY",
+    "7♥ X♥",
+    " ".join(["7♥", "7♠"] * 8),
+])
+def test_righe_non_valide(riga):
+    assert "errore" in analizza_riga(1, riga)
+
+
+def test_forme_della_mano():
+    attese = [("7", "♥"), ("8", "♥"), ("JOLLY", "J0")]
+    assert leggi_carte("7♥ 8♥ JOLLY") == attese
+    assert leggi_carte(["7♥", ["8", "♥"], "JOLLY"]) == attese
+    assert len(leggi_carte(" ".join(["A♠", "A♠"] + ["JOLLY"] * 4))) == 6
+    giocate = " ".join(f"{v}♣ {v}♣" for v in "23456789")
+    assert len(giocate.split()) > MAX_CARTE
+    assert len(leggi_carte(giocate, massimo=None)) == len(giocate.split())
+
+
+def test_file_mancante_o_non_scrivibile(tmp_path, capsys):
+    mancante = str(tmp_path / "mancante.jsonl")
+    assert main([mancante]) == 2
+    assert mancante in capsys.readouterr().err
+    mani = tmp_path / "mani.txt"
+    mani.write_text("7♥ 8♥ 9♥\n", encoding="utf-8")
+    assert main([str(mani), "--output", str(tmp_path / "manca" / "out.jsonl")]) == 2
+    assert "out.jsonl" in capsys.readouterr().err
+    assert main([str(mani), "--output", str(tmp_path / "out.jsonl")]) == 0
@@ -0,0 +1,6 @@
+from bench import importtime
+
+
+def test_import_entro_i_budget(capsys):
+    esito = importtime.main(["--ripetizioni", "3"])
+    assert esito == 0, capsys.readouterr().err
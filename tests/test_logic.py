@@ -0,0 +1,123 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.core import N_VALORI, carte_a_maschere, punti_maschera
+from src.logic import Mano, genera_combinazioni, genera_combinazioni_maschera, scegli_apertura
+from src.state import JOLLY_ID, mano_a_maschera, mano_a_tuple, nuovo_mazzo
+from src.tabelle import MAX_JOLLY_TABELLA, scale_seme, tabella_scale, decodifica
+
+
+def _mano_stretta(rng):
+    """Mano di due mazzi su pochi valori e semi, con doppioni e 0-2 jolly."""
+    basso = rng.randrange(N_VALORI - 5)
+    semi = rng.sample(range(4), rng.randint(2, 3))
+    carte = [s * N_VALORI + (basso + v) % N_VALORI for s in semi for v in range(6)] * 2
+    return mano_a_tuple(rng.sample(carte, rng.randint(8, 11)) + [JOLLY_ID] * rng.randint(0, 2))
+
+
+def _apertura_forza_bruta(combinazioni, mano):
+    """(-punti, combinazioni, jolly) del miglior multinsieme di combinazioni calabili, o None."""
+    copie = Counter(c for c in mano if c[0] != "JOLLY")
+    n_jolly = len(mano) - sum(copie.values())
+    candidati = []
+    for c in combinazioni:
+        naturali = Counter(carta for carta in c["carte"] if carta[0] != "JOLLY")
+        if max(naturali.values()) == 1:
+            candidati.append((naturali, len(c["carte"]) - len(naturali), c["punti"]))
+
+    migliore = None
+
+    def esplora(inizio, usate, jolly, punti, n):
+        nonlocal migliore
+        if n and punti >= 40 and (migliore is None or (-punti, n, jolly) < migliore):
+            migliore = (-punti, n, jolly)
+        for j in range(inizio, len(candidati)):
+            naturali, jolly_c, punti_c = candidati[j]
+            if jolly + jolly_c <= n_jolly and all(usate[carta] < copie[carta] for carta in naturali):
+                # Da j e non da j + 1: la stessa combinazione può tornare se le copie bastano
+                esplora(j, usate + naturali, jolly + jolly_c, punti + punti_c, n + 1)
+
+    esplora(0, Counter(), 0, 0, 0)
+    return migliore
+
+
+def test_apertura_come_la_forza_bruta():
+    rng = random.Random(11)
+    aperte = 0
+    for _ in range(150):
+        mano = _mano_stretta(rng)
+        combinazioni = genera_combinazioni(mano)
+        trovata = scegli_apertura(combinazioni, mano)
+        attesa = _apertura_forza_bruta(combinazioni, mano)
+        assert trovata["puo_aprire"] == (attesa is not None)
+        if attesa is None:
+            assert trovata["carte_rimaste"] == mano
+            continue
+        aperte += 1
+        calate = [carta for c in trovata["combinazioni"] for carta in c["carte"]]
+        jolly = sum(carta[0] == "JOLLY" for carta in calate)
+        assert (-trovata["punti"], len(trovata["combinazioni"]), jolly) == attesa
+        assert trovata["punti"] == sum(c["punti"] for c in trovata["combinazioni"])
+        # Ogni carta, jolly compresi, finisce in una combinazione o resta in mano
+        assert Counter(calate) + Counter(trovata["carte_rimaste"]) == Counter(mano)
+    assert aperte > 30
+
+
+def test_combinazioni_con_memo_come_senza():
+    rng = random.Random(5)
+    memo = {}
+    for _ in range(300):
+        maschera, _ = mano_a_maschera(nuovo_mazzo(rng)[:rng.randint(2, 14)])
+        for opzioni in ({}, {"max_jolly": 2, "superflui": True}):
+            assert genera_combinazioni_maschera(maschera, memo=memo, **opzioni) == \
+                genera_combinazioni_maschera(maschera, **opzioni)
+
+
+def _migliore_forza_bruta(scale, valori, jolly):
+    """Punti massimi di scale disgiunte di un seme con al più `jolly` jolly."""
+    migliore = 0
+    for carte, jolly_c, _, _ in scale:
+        if jolly_c <= jolly and carte & valori == carte:
+            punti = punti_maschera(carte) + _migliore_forza_bruta(scale, valori & ~carte, jolly - jolly_c)
+            migliore = max(migliore, punti)
+    return migliore
+
+
+@pytest.mark.parametrize("max_jolly", range(MAX_JOLLY_TABELLA + 1))
+@pytest.mark.parametrize("superflui", [False, True])
+def test_tabella_scale_come_scale_seme(max_jolly, superflui):
+    tabella = tabella_scale(max_jolly, superflui)
+    for valori in range(1 << N_VALORI):
+        scale = list(scale_seme(valori, max_jolly, superflui))
+        assert [decodifica(v)[:4] for v in tabella.scale(valori)] == scale
+        if not superflui and valori % 61 == 0:
+            assert tabella.migliore[valori] == _migliore_forza_bruta(scale, valori, max_jolly)
+
+
+def _ordinate(combinazioni):
+    return sorted((c["tipo"], sorted(c["carte"], key=str), c["punti"]) for c in combinazioni)
+
+
+def test_mano_incrementale_come_la_lista():
+    rng = random.Random(9)
+    mazzo = mano_a_tuple(list(range(52)) * 2) + [("JOLLY", f"J{k}") for k in range(4)]
+    mano = Mano()
+    carte = []
+    for passo in range(400):
+        if carte and (len(carte) > 16 or rng.random() < 0.45):
+            carta = carte.pop(rng.randrange(len(carte)))
+            mano.remove(carta)
+        else:
+            carta = rng.choice([c for c in mazzo if Counter(carte)[c] < Counter(mazzo)[c]])
+            carte.append(carta)
+            mano.add(carta)
+        assert Counter(mano) == Counter(carte) and len(mano) == len(carte)
+        maschera, doppie, jolly = carte_a_maschere(carte)
+        assert (mano.maschera, mano.doppie, sorted(mano.jolly)) == (maschera, doppie, sorted(jolly))
+        opzioni = {"max_jolly": 2, "superflui": True} if passo % 2 else {}
+        # Le combinazioni in cache della Mano sono quelle generate da zero
+        assert _ordinate(genera_combinazioni(mano, **opzioni)) == \
+            _ordinate(genera_combinazioni(carte, **opzioni))
+        assert genera_combinazioni_maschera(mano, **opzioni) == genera_combinazioni_maschera(maschera, **opzioni)
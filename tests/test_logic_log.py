@@ -0,0 +1,29 @@
+import random
+
+from src import logic_log
+from src.avversario import Tracciatore
+from src.core import tutte_le_carte
+
+
+def _righe_da_voci(spiegazione):
+    righe = [logic_log.intestazione_carta(spiegazione.carta, spiegazione.fase)]
+    righe += [logic_log.testo_voce(v) for v in spiegazione.voci()]
+    if not spiegazione.riga[logic_log.punteggi.JOLLY]:
+        righe.append(f"  => Punteggio finale: {spiegazione.score:.1f}")
+    return righe
+
+
+def test_log_composto_una_volta_come_le_voci():
+    rng = random.Random(3)
+    mazzo = tutte_le_carte() * 2
+    tracciatore = Tracciatore.da_osservazioni([0, 5, 9, 30], [3, 4])
+    for i in range(200):
+        mano = rng.sample(mazzo, rng.randint(1, 14)) + [("JOLLY", "J0")] * (i % 3 == 0)
+        giocate = rng.sample(mazzo, rng.randint(0, 8))
+        _, log = logic_log.suggerisci_scarto(mano, carte_giocate=giocate, fase=rng.choice(list(logic_log.FASE_PESI)),
+                                             tracciatore=tracciatore if i % 2 else None)
+        for _, _, spiegazione in log.valutazioni:
+            righe = spiegazione.righe()
+            assert righe == _righe_da_voci(spiegazione)
+            assert spiegazione.righe() is righe
+        assert list(log)[1:] == ["\n".join(s.righe()) for _, _, s in log.valutazioni]
@@ -0,0 +1,26 @@
+# test_montecarlo.py – Il limite di tempo non favorisce le prime candidate
+
+import types
+
+from src import montecarlo
+from src.core import carte_da_testo
+from src.state import tupla_a_carta
+
+
+def test_vince_la_candidata_migliore_anche_se_ultima(monkeypatch):
+    mano = carte_da_testo("2♣ 5♦ 9♠ J♥ K♣")
+    migliore = tupla_a_carta(("K", "♣"))  # l'ultima candidata
+
+    # Orologio finto: ogni simulazione dura 1 ms, qualunque sia il carico della macchina
+    orologio = [0.0]
+
+    def simula(mano, avversario, mazzo, scarto, seed, orizzonte, strategie):
+        orologio[0] += 0.001
+        return 10.0 if scarto == migliore else 0.0
+
+    monkeypatch.setattr(montecarlo, "_simula", simula)
+    monkeypatch.setattr(montecarlo, "time", types.SimpleNamespace(perf_counter=lambda: orologio[0]))
+    for budget in (12, 17, 23, 31):
+        scarto, _, stime = montecarlo.suggerisci_scarto(mano, budget_ms=budget, seed=1)
+        assert scarto == ("K", "♣")
+        assert len({s["simulazioni"] for s in stime.values()}) == 1
@@ -0,0 +1,45 @@
+import asyncio
+
+from src.servizio import Servizio
+
+
+def _servizio(**opzioni):
+    servizio = Servizio(workers=0, **opzioni)
+    servizio.avvia()
+    return servizio
+
+
+def test_richieste_identiche_unite_in_un_calcolo():
+    async def prova():
+        servizio = _servizio()
+        dati = {"mano": "7♥ 8♥ 9♥ 10♥ J♥ Q♥ K♥ 2♣ 5♠"}
+        risposte = await asyncio.gather(*(servizio.rispondi("apertura", dati) for _ in range(5)))
+        dopo = await servizio.rispondi("apertura", dati)
+        return servizio, risposte, dopo
+
+    servizio, risposte, dopo = asyncio.run(prova())
+    assert [stato for stato, _ in risposte] == [200] * 5
+    assert all(corpo == risposte[0][1] for _, corpo in risposte)
+    assert risposte[0][1]["puo_aprire"]
+    assert dopo == risposte[0]
+    conteggi = servizio.statistiche()
+    assert (conteggi["richieste"], conteggi["calcolate"], conteggi["unite"], conteggi["cache"]) == (6, 1, 4, 1)
+    assert conteggi["in_corso"] == 0
+
+
+def test_oltre_max_attesa_risponde_503():
+    async def prova():
+        servizio = _servizio(max_attesa=2)
+        mani = ["7♥ 8♥ 9♥", "2♣ 3♣ 4♣", "5♠ 6♠ 7♠", "7♥ 8♥ 9♥"]
+        risposte = await asyncio.gather(*(servizio.rispondi("combinazioni", {"mano": m}) for m in mani))
+        # Finiti i calcoli in corso c'è di nuovo posto
+        dopo = await servizio.rispondi("combinazioni", {"mano": mani[2]})
+        return servizio, risposte, dopo
+
+    servizio, risposte, dopo = asyncio.run(prova())
+    # La quarta è identica alla prima: si unisce al suo calcolo invece di essere rifiutata
+    assert [stato for stato, _ in risposte] == [200, 200, 503, 200]
+    assert risposte[2][1] == {"errore": "occupato"}
+    assert dopo[0] == 200
+    conteggi = servizio.statistiche()
+    assert (conteggi["rifiutate"], conteggi["unite"], conteggi["calcolate"]) == (1, 1, 3)
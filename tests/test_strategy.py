@@ -0,0 +1,46 @@
+# test_strategy.py – Combinazioni e scarto di StrategiaBase
+
+from collections import Counter
+
+from src import logic_log
+from src.core import bit_carta
+from src.state import JOLLY_ID, Partita, gioca_turno, mano_a_tuple, tupla_a_carta
+from src.strategy import StrategiaBase, fase_partita
+
+
+def _partita(carte):
+    mano = [JOLLY_ID if c == "JOLLY" else bit_carta((c[:-1], c[-1])) for c in carte.split()]
+    return Partita.da_mani([mano, []], mazzo=[], scarti=[], aperto=[True, False])
+
+
+def test_carte_doppie_formano_una_seconda_combinazione():
+    partita = _partita("7♥ 8♥ 9♥ 7♥ 8♥ 9♥ 2♣ 5♠")
+    scelte = StrategiaBase().combinazioni(partita)
+    assert sorted(sorted(c) for c in scelte) == [[("7", "♥"), ("8", "♥"), ("9", "♥")]] * 2
+    assert partita.cala(scelte)
+    assert len(partita.mani[0]) == 2
+
+
+def test_resta_una_carta_e_non_si_usano_copie_in_piu():
+    partita = _partita("7♥ 8♥ 9♥ 7♥ 8♥ 9♥ JOLLY")
+    scelte = StrategiaBase().combinazioni(partita)
+    usate = Counter(tupla_a_carta(carta) for c in scelte for carta in c)
+    assert sum(usate.values()) < len(partita.mani[0])
+    assert all(usate[k] <= n for k, n in Counter(partita.mani[0]).items())
+    assert not usate - Counter(partita.mani[0])
+
+
+def test_scarto_come_logic_log():
+    strategia = StrategiaBase()
+    for seed in range(40):
+        partita = Partita(seed=seed)
+        while not partita.finita:
+            g = partita.giocatore
+            if any(c != JOLLY_ID for c in partita.mani[g]):
+                aperto = any(a for i, a in enumerate(partita.aperto) if i != g)
+                atteso, _ = logic_log.suggerisci_scarto(
+                    mano_a_tuple(partita.mani[g]),
+                    carte_giocate=mano_a_tuple([c for c in partita.scarti if c != JOLLY_ID]),
+                    fase=fase_partita(partita), tavolo=partita.tavolo if aperto else None, spiega=False)
+                assert strategia.scarto(partita) == tupla_a_carta(atteso)
+            gioca_turno(partita, strategia)
@@ -0,0 +1,51 @@
+# test_tabelle.py – Scale di un seme senza jolly superflui
+
+import pytest
+
+from src.core import INDICE_VALORE, N_VALORI
+from src.tabelle import scale_seme, tabella_scale, decodifica
+
+
+def _valori(testo):
+    return sum(1 << INDICE_VALORE[v] for v in testo.split())
+
+
+def _riferimento(valori, max_jolly, superflui):
+    """(carte, jolly) di ogni finestra di almeno 3 posizioni, per forza bruta."""
+    presente = [valori >> (p % N_VALORI) & 1 for p in range(N_VALORI + 1)]
+    attese = set()
+    for a in range(N_VALORI + 1):
+        for b in range(a + 2, N_VALORI + 1):
+            if a == 0 and b == N_VALORI:
+                continue
+            carte = sum(1 << (p % N_VALORI) for p in range(a, b + 1) if presente[p])
+            naturali = bin(carte).count("1")
+            jolly = b - a + 1 - naturali
+            if naturali < 2 or jolly > max_jolly:
+                continue
+            if not superflui and b - a + 1 > 3 and not (presente[a] and presente[b]):
+                continue
+            attese.add((carte, jolly))
+    return attese
+
+
+@pytest.mark.parametrize("max_jolly", [0, 1, 2, 3])
+@pytest.mark.parametrize("superflui", [False, True])
+def test_come_la_forza_bruta(max_jolly, superflui):
+    for valori in range(0, 1 << N_VALORI, 7):
+        scale = list(scale_seme(valori, max_jolly, superflui))
+        assert len(scale) == len({(c, j) for c, j, _, _ in scale})
+        assert {(c, j) for c, j, _, _ in scale} == _riferimento(valori, max_jolly, superflui)
+        presente = [valori >> (p % N_VALORI) & 1 for p in range(N_VALORI + 1)]
+        for carte, _, inizio, lunghezza in scale:
+            # I jolly non coprono carte in mano
+            assert sum(presente[inizio:inizio + lunghezza]) == bin(carte).count("1")
+
+
+@pytest.mark.parametrize("testo, attese", [
+    ("10 J K", {("10 J K", 1), ("10 J", 1), ("J K", 1)}),
+    ("K A", {("K A", 1)}),
+])
+def test_due_jolly_solo_dove_servono(testo, attese):
+    voci = {decodifica(v)[:2] for v in tabella_scale(2, False).scale(_valori(testo))}
+    assert voci == {(_valori(carte), jolly) for carte, jolly in attese}
@@ -0,0 +1,28 @@
+import pytest
+
+from src import taratura
+
+
+def test_cache_salvata_dopo_ogni_blocco(tmp_path, monkeypatch):
+    giocati = []
+
+    def gioca_blocco(vettore, seed, blocco, n_partite):
+        if len(giocati) == 3:
+            raise RuntimeError("interrotta")
+        giocati.append((vettore, blocco))
+        return vettore, blocco, 1.0, n_partite
+
+    monkeypatch.setattr(taratura, "gioca_blocco", gioca_blocco)
+    percorso = str(tmp_path / "taratura.json")
+    config = {"seed": 0, "partite_blocco": 2}
+    candidati = [(1.0,), (2.0,)]
+    with pytest.raises(RuntimeError):
+        taratura.valuta(candidati, 2, taratura.CacheRisultati(percorso, config), 0, 2)
+
+    # I tre blocchi finiti prima dell'interruzione sono su disco e non si rigiocano
+    cache = taratura.CacheRisultati(percorso, config)
+    assert all(cache.get(v, b) == [1.0, 2] for v, b in giocati)
+    giocati.clear()
+    stime = taratura.valuta(candidati, 2, cache, 0, 2)
+    assert len(giocati) == 1
+    assert stime[(2.0,)] == (0.5, pytest.approx(0.25), 4)
@@ -0,0 +1,8 @@
+from src import torneo
+
+
+def test_ogni_strategia_registrata_gioca():
+    nomi = sorted(torneo.STRATEGIE)
+    assert "logic_semplice" in nomi
+    _, totali = torneo.gioca_blocco(nomi, 0, 0, len(nomi))
+    assert all(totali[n]["partite"] == len(nomi) for n in nomi)